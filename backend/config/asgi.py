@@ -12,5 +12,13 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+# The sync views are served here too. Set ASYNC_VIEWS=True for the native async views of users/async_views.py only
+# when this server faces slow clients; with fast clients they cost more CPU per request than the sync views
+# (python manage.py benchmark async compares both). Set before the settings load, WSGI servers never see it.
+os.environ["DJANGO_ASGI"] = "True"
 
 application = get_asgi_application()
+
+from users.helpers.rank_table import rebuild_rank_table_on_start  # noqa: E402
+
+rebuild_rank_table_on_start()
@@ -0,0 +1,92 @@
+import os
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.utils.asyncio import async_unsafe
+
+try:
+    from psycopg_pool import ConnectionPool
+except ImportError:
+    ConnectionPool = None
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend borrowing its connections from a psycopg ``ConnectionPool``, one per alias and process.
+
+    ``OPTIONS["pool"]`` holds the pool arguments, e.g. ``min_size``, ``max_size``, ``timeout``, ``max_idle`` and
+    ``max_lifetime``. Closing the connection, which Django does after every request as pooled databases need
+    ``CONN_MAX_AGE = 0``, gives it back to the pool. With ``CONN_HEALTH_CHECKS`` the pool checks every connection
+    before lending it and replaces broken ones.
+    """
+
+    _connection_pools = {}
+    _connection_pools_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        # Pool threads do not survive a fork and the test runner renames the database, both get a pool of their own.
+        key = (os.getpid(), self.alias, self.settings_dict["NAME"])
+        pool = self._connection_pools.get(key)
+        if pool is None:
+            with self._connection_pools_lock:
+                pool = self._connection_pools.get(key)
+                if pool is None:
+                    pool = self._connection_pools[key] = self.create_pool()
+        return pool
+
+    def create_pool(self):
+        if ConnectionPool is None:
+            raise ImproperlyConfigured("Pooled PostgreSQL connections need the psycopg-pool package.")
+        if self.settings_dict["CONN_MAX_AGE"]:
+            raise ImproperlyConfigured("Pooled connections go back after every request, set CONN_MAX_AGE to 0.")
+        conn_params = self.get_connection_params()
+        # Django sets autocommit itself whenever it borrows a connection, pooled ones are kept idle in autocommit.
+        conn_params["autocommit"] = True
+        return ConnectionPool(
+            kwargs=conn_params,
+            check=ConnectionPool.check_connection if self.settings_dict["CONN_HEALTH_CHECKS"] else None,
+            name=self.alias,
+            open=True,
+            **self.settings_dict["OPTIONS"].get("pool", {}),
+        )
+
+    def pool_stats(self):
+        """Return the statistics of this process' pool, empty while no connection has been borrowed."""
+        pool = self._connection_pools.get((os.getpid(), self.alias, self.settings_dict["NAME"]))
+        return pool.get_stats() if pool is not None else {}
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop("pool", None)
+        return conn_params
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        # Connections to the maintenance database, e.g. to create the test database, are not pooled.
+        if self.alias == NO_DB_ALIAS:
+            return super().get_new_connection(conn_params)
+        isolation_level = self.settings_dict["OPTIONS"].get("isolation_level")
+        try:
+            self.isolation_level = base.IsolationLevel(isolation_level or base.IsolationLevel.READ_COMMITTED)
+        except ValueError:
+            raise ImproperlyConfigured(
+                f"Invalid transaction isolation level {isolation_level} specified. "
+                f"Use one of the psycopg.IsolationLevel values."
+            )
+        self._borrowed_from = self.pool
+        connection = self._borrowed_from.getconn()
+        if isolation_level is not None:
+            connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        if self.connection is None or self.alias == NO_DB_ALIAS:
+            return super()._close()
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # Closed in a transaction the wrapper keeps its connection until the rollback, so it cannot be lent
+                # again; the pool replaces closed connections.
+                self.connection.close()
+            self._borrowed_from.putconn(self.connection)
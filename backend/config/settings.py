@@ -49,6 +49,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "users.middleware.MetricsMiddleware",
+    "users.middleware.ServerTimingMiddleware",
+    "users.middleware.ReplicaPinningMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -89,11 +92,21 @@ DATABASES = {
     }
 }
 
-DATABASE_URL = os.environ.get("DB_CONNECTION_STRING")
-db_config = dj_database_url.config(default=DATABASE_URL, conn_max_age=60, ssl_require=False)
+# Native async views for the I/O bound endpoints under ASGI, only worth it behind slow clients (see config/asgi.py).
+# config.asgi sets DJANGO_ASGI, so WSGI servers sharing the environment ignore ASYNC_VIEWS and serve the sync views
+ASYNC_VIEWS = os.environ.get("ASYNC_VIEWS", "False") == "True" and os.environ.get("DJANGO_ASGI") == "True"
+
+# Without DB_CONNECTION_STRING the SQLite database next to manage.py is used
+DATABASE_URL = os.environ.get("DB_CONNECTION_STRING") or f"sqlite:///{DATABASES['default']['NAME']}"
+# Async requests run their queries in a thread of their own, so persistent connections would pile up under ASGI
+db_config = dj_database_url.config(default=DATABASE_URL, conn_max_age=0 if ASYNC_VIEWS else 60, ssl_require=False)
 
 DATABASES["default"] = db_config
 
+# Trigram lookups of the player search
+if DATABASES["default"].get("ENGINE") == "django.db.backends.postgresql":
+    INSTALLED_APPS.append("django.contrib.postgres")
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -161,9 +174,10 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.AllowAny",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "EXCEPTION_HANDLER": "users.exceptions.exception_handler",
 }
 
 SPECTACULAR_SETTINGS = {
@@ -199,3 +213,147 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_LIFETIME": timedelta(minutes=5),
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=1),
 }
+
+# Nick allocation
+# Bloom filter of taken usernames is rebuilt after this many seconds to see users created by other processes.
+NICK_FILTER_REBUILD_SECONDS = int(os.environ.get("NICK_FILTER_REBUILD_SECONDS", 300))
+
+# Email outbox drained by the send_outbox_emails management command
+EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get("EMAIL_OUTBOX_BATCH_SIZE", 100))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get("EMAIL_OUTBOX_MAX_ATTEMPTS", 5))
+EMAIL_OUTBOX_RETRY_BACKOFF_SECONDS = int(os.environ.get("EMAIL_OUTBOX_RETRY_BACKOFF_SECONDS", 30))
+# A claimed batch is retried by other workers after this many seconds, it must outlast sending a whole batch
+EMAIL_OUTBOX_LEASE_SECONDS = int(os.environ.get("EMAIL_OUTBOX_LEASE_SECONDS", 300))
+
+# Shared-memory leaderboard, defaults to /dev/shm/devmeup_rank_table_<hash of the checkout and database>.
+# Rebuilt from the database when a server starts, run rebuild_rank_table after writes which bypass the models
+RANK_TABLE_PATH = os.environ.get("RANK_TABLE_PATH")
+
+# Password checks of the token endpoint run in a process pool, logins beyond workers + queue get 503
+LOGIN_POOL_WORKERS = int(os.environ.get("LOGIN_POOL_WORKERS", 2))
+LOGIN_POOL_QUEUE_SIZE = int(os.environ.get("LOGIN_POOL_QUEUE_SIZE", 16))
+LOGIN_POOL_TIMEOUT = int(os.environ.get("LOGIN_POOL_TIMEOUT", 10))
+LOGIN_POOL_RETRY_AFTER = int(os.environ.get("LOGIN_POOL_RETRY_AFTER", 1))
+
+# Users authenticated by JWT are cached per process, entries expire after JWT_USER_CACHE_TTL seconds
+JWT_USER_CACHE_SIZE = int(os.environ.get("JWT_USER_CACHE_SIZE", 10000))
+JWT_USER_CACHE_TTL = int(os.environ.get("JWT_USER_CACHE_TTL", 60))
+# Authorize read-only requests of views using ClaimsJWTAuthentication from token claims without any user lookup
+JWT_CLAIMS_AUTH_FOR_READS = os.environ.get("JWT_CLAIMS_AUTH_FOR_READS", "False") == "True"
+
+# Guests get signed tokens, the rows of persisted guests inactive for ANONYMOUS_USER_TTL_DAYS are purged
+GUEST_TOKEN_MAX_AGE = int(os.environ.get("GUEST_TOKEN_MAX_AGE", 60 * 60 * 24 * 30))
+ANONYMOUS_USER_TTL_DAYS = int(os.environ.get("ANONYMOUS_USER_TTL_DAYS", 30))
+
+# Users without a heartbeat for PRESENCE_TIMEOUT seconds are offline, is_online is written every flush interval.
+# Last heartbeats and the online counts of the workers are shared through the PRESENCE_CACHE, which must be a shared
+# backend (Redis, Memcached) when running several workers; the online count sums the counts of the last flushes
+PRESENCE_TIMEOUT = int(os.environ.get("PRESENCE_TIMEOUT", 30))
+PRESENCE_FLUSH_INTERVAL = int(os.environ.get("PRESENCE_FLUSH_INTERVAL", 10))
+PRESENCE_CACHE = "presence"
+
+# Matchmaking: rank window starts at MATCHMAKING_BASE_WINDOW and widens by MATCHMAKING_WINDOW_GROWTH per second.
+# The queue lives in the memory of one process: run a single worker, or route every /users/matchmaking/ request to
+# one dedicated worker. Players queued on different workers never meet and a poll landing on another worker than
+# its player's queue answers 404; sticky routing per player only avoids the 404s, it still splits the pool
+MATCHMAKING_BUCKET_SIZE = int(os.environ.get("MATCHMAKING_BUCKET_SIZE", 50))
+MATCHMAKING_BASE_WINDOW = int(os.environ.get("MATCHMAKING_BASE_WINDOW", 100))
+MATCHMAKING_WINDOW_GROWTH = int(os.environ.get("MATCHMAKING_WINDOW_GROWTH", 25))
+MATCHMAKING_MAX_WINDOW = int(os.environ.get("MATCHMAKING_MAX_WINDOW", 1000))
+MATCHMAKING_BOT_TIMEOUT = int(os.environ.get("MATCHMAKING_BOT_TIMEOUT", 30))
+# Matches which are not picked up within MATCHMAKING_MATCH_TTL seconds are dropped
+MATCHMAKING_MATCH_TTL = int(os.environ.get("MATCHMAKING_MATCH_TTL", 60))
+# Players can only submit results of matches issued by matchmaking, once and within MATCH_RESULT_TIMEOUT seconds.
+# Issued matches are kept in the ISSUED_MATCH_CACHE, which must be shared by all workers
+ISSUED_MATCH_CACHE = "matches"
+MATCH_RESULT_TIMEOUT = int(os.environ.get("MATCH_RESULT_TIMEOUT", 60 * 60 * 2))
+
+# Class computing new ranks from a match result, see users.helpers.rating.RatingFormula
+RATING_FORMULA = os.environ.get("RATING_FORMULA", "users.helpers.rating.EloRating")
+
+# On databases other than PostgreSQL player search uses a per-process trie, rebuilt in a background thread every
+# this many seconds; searches use a prefix query until the first build completes
+PLAYER_SEARCH_REBUILD_SECONDS = int(os.environ.get("PLAYER_SEARCH_REBUILD_SECONDS", 300))
+
+# Admin changelists show the PostgreSQL row estimate instead of running COUNT(*) for results above this size
+ADMIN_EXACT_COUNT_LIMIT = int(os.environ.get("ADMIN_EXACT_COUNT_LIMIT", 100000))
+
+# Serialized user details are cached in the USER_RESPONSE_CACHE alias; use a shared backend with several workers
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "responses": {
+        "BACKEND": os.environ.get("RESPONSE_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("RESPONSE_CACHE_LOCATION", "responses"),
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 100000))},
+    },
+    "presence": {
+        "BACKEND": os.environ.get("PRESENCE_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("PRESENCE_CACHE_LOCATION", "presence"),
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("PRESENCE_CACHE_MAX_ENTRIES", 1000000))},
+    },
+    "matches": {
+        "BACKEND": os.environ.get("ISSUED_MATCH_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("ISSUED_MATCH_CACHE_LOCATION", "matches"),
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("ISSUED_MATCH_CACHE_MAX_ENTRIES", 1000000))},
+    },
+    "replica_pins": {
+        "BACKEND": os.environ.get("DB_REPLICA_PIN_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("DB_REPLICA_PIN_CACHE_LOCATION", "replica_pins"),
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("DB_REPLICA_PIN_CACHE_MAX_ENTRIES", 1000000))},
+    },
+}
+USER_RESPONSE_CACHE = "responses"
+USER_RESPONSE_CACHE_TIMEOUT = int(os.environ.get("USER_RESPONSE_CACHE_TIMEOUT", 300))
+# Seconds other workers wait for the one computing a cold entry before computing it themselves
+USER_RESPONSE_CACHE_LEASE_TIMEOUT = int(os.environ.get("USER_RESPONSE_CACHE_LEASE_TIMEOUT", 2))
+
+# Server-Timing headers with DB, auth and render time; requests slower than SERVER_TIMING_SLOW_MS are logged
+SERVER_TIMING_ENABLED = os.environ.get("SERVER_TIMING_ENABLED", "False") == "True"
+SERVER_TIMING_SLOW_MS = int(os.environ.get("SERVER_TIMING_SLOW_MS", 500))
+SERVER_TIMING_SLOW_QUERIES = int(os.environ.get("SERVER_TIMING_SLOW_QUERIES", 5))
+
+# Prometheus metrics at /metrics, summed over all workers through per-process files in METRICS_DIRECTORY
+# (defaults to /dev/shm/devmeup_metrics, clear it when restarting the server); scrapes need METRICS_TOKEN if set
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "False") == "True"
+METRICS_DIRECTORY = os.environ.get("METRICS_DIRECTORY")
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# Seconds between copies of the game stats, response cache and connection counters of a worker to its file
+METRICS_COLLECT_SECONDS = int(os.environ.get("METRICS_COLLECT_SECONDS", 5))
+
+# Pooled PostgreSQL connections, one psycopg pool per worker process and database instead of persistent ones
+DB_POOL = os.environ.get("DB_POOL", "False") == "True"
+DB_POOL_OPTIONS = {
+    "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+    "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+    # Seconds a request waits for a free connection before failing
+    "timeout": int(os.environ.get("DB_POOL_TIMEOUT", 10)),
+    "max_idle": int(os.environ.get("DB_POOL_MAX_IDLE", 600)),
+    "max_lifetime": int(os.environ.get("DB_POOL_MAX_LIFETIME", 3600)),
+}
+# Check connections before lending them out of the pool or reusing persistent ones
+DB_HEALTH_CHECKS = os.environ.get("DB_HEALTH_CHECKS", "True") == "True"
+
+# Read replicas for the read-only views, space separated connection strings in the format of DB_CONNECTION_STRING.
+# Clients which wrote keep reading from the primary for DB_REPLICA_PIN_SECONDS, which must outlast the replica lag.
+# Pins of authenticated users are kept in the DB_REPLICA_PIN_CACHE, which must be shared by all workers: with
+# replicas configured, ReplicaPinningMiddleware refuses to start on the default per-process LocMemCache
+DB_REPLICA_URLS = os.environ.get("DB_REPLICA_URLS", "").split()
+DB_REPLICA_PIN_SECONDS = int(os.environ.get("DB_REPLICA_PIN_SECONDS", 10))
+DB_REPLICA_PIN_CACHE = "replica_pins"
+for index, replica_url in enumerate(DB_REPLICA_URLS):
+    DATABASES[f"replica_{index}"] = dj_database_url.parse(
+        replica_url,
+        conn_max_age=DATABASES["default"]["CONN_MAX_AGE"],
+        ssl_require=False,
+        # Tests read the replicas' data from the test database
+        test_options={"MIRROR": "default"},
+    )
+DATABASE_ROUTERS = ["users.routers.ReplicaRouter"]
+
+for database in DATABASES.values():
+    database["CONN_HEALTH_CHECKS"] = DB_HEALTH_CHECKS
+    if DB_POOL and database.get("ENGINE") == "django.db.backends.postgresql":
+        database.update(ENGINE="config.db_backends.postgresql_pool", CONN_MAX_AGE=0)
+        database.setdefault("OPTIONS", {})["pool"] = DB_POOL_OPTIONS
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_wsgi_application()
+
+from users.helpers.rank_table import rebuild_rank_table_on_start  # noqa: E402
+
+rebuild_rank_table_on_start()
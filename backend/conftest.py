@@ -1 +1,54 @@
 import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework.test import APIClient
+
+from users.authentication import user_cache
+from users.models import UserProfile
+from users.serializers import PooledTokenObtainPairSerializer
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches(settings):
+    """Per-process caches outlive the test database rollback, every test starts with empty ones."""
+    user_cache._data.clear()
+    for alias in settings.CACHES:
+        caches[alias].clear()
+    yield
+    user_cache._data.clear()
+
+
+@pytest.fixture(autouse=True)
+def fast_password_hashing(settings):
+    settings.PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def make_user(db):
+    """Create an active user with a profile, ``make_user("alice", rank=1200)``."""
+
+    def make(username, is_active=True, **profile):
+        user = get_user_model().objects.create_user(
+            email=f"{username}@example.com", username=username, password="test-password-1", is_active=is_active
+        )
+        UserProfile.objects.create(user=user, **profile)
+        return user
+
+    return make
+
+
+@pytest.fixture
+def auth_client(api_client):
+    """Return ``api_client`` authenticated with an access token of the given user, as issued by ``token/``."""
+
+    def authenticate(user):
+        token = PooledTokenObtainPairSerializer.get_token(user).access_token
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return api_client
+
+    return authenticate
@@ -1,19 +1,51 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.base_user import BaseUserManager
+from django.core.exceptions import ObjectDoesNotExist
 from django.urls import reverse
 from django.utils.html import format_html
 
-from .models import AnonymousUser, UserProfile
+from .helpers.player_search import filter_username_prefix
+from .models import AnonymousUser, MatchResult, OutboxEmail, UserProfile
+from .pagination import EstimatedCountPaginator
 
 User = get_user_model()
 
 
+class LargeTableAdminMixin:
+    """Changelist settings for tables with millions of rows.
+
+    Counts come from :class:`users.pagination.EstimatedCountPaginator` and the unfiltered total is not counted.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class IndexedUserSearchMixin(LargeTableAdminMixin):
+    """Search box matching a whole email or a username prefix, both index lookups, instead of ``icontains`` scans.
+
+    ``user_lookup`` is the path from the admin's model to the user, empty for the user model itself.
+    """
+
+    user_lookup = ""
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if "@" in search_term:
+            email = BaseUserManager.normalize_email(search_term)
+            return queryset.filter(**{f"{self.user_lookup}email": email}), False
+        return filter_username_prefix(queryset, search_term, f"{self.user_lookup}username"), False
+
+
 class UserProfileAdminInline(admin.StackedInline):
     model = UserProfile
 
 
-class UserAdminConfig(UserAdmin):
+class UserAdminConfig(IndexedUserSearchMixin, UserAdmin):
     """Customized configuration for admin panel prepared for :class:`users.models.CustomUser` model.
     If order of fields in admin panel is not to your liking
     it can be changed in list_display class field.
@@ -22,33 +54,38 @@ class UserAdminConfig(UserAdmin):
     inlines = [UserProfileAdminInline]
     model = User
     search_fields = ("email", "username")
-    list_filter = ("email", "username", "is_active", "is_staff")
+    search_help_text = "Whole email or beginning of the username."
+    list_filter = ("is_active", "is_staff")
     ordering = ("-last_login",)
     list_display = ("email", "username", "is_active", "is_staff", "user_profile_link")
+    list_select_related = ("profile",)
     readonly_fields = ("date_joined",)
 
     def user_profile_link(self, obj):
         try:
-            profile = obj.profile.all()[0]
-            profile_url = reverse(f"admin:{profile._meta.app_label}_{'userprofile'}_change", args=[profile.pk])
-            return format_html(f'<a href="{profile_url}">{profile}</a>')
-        except IndexError:
+            profile = obj.profile
+        except ObjectDoesNotExist:
             return None
+        profile_url = reverse(f"admin:{profile._meta.app_label}_{'userprofile'}_change", args=[profile.pk])
+        return format_html(f'<a href="{profile_url}">{profile}</a>')
 
     user_profile_link.short_description = "User Profile"
 
 
-class AnonymousUserAdminConfig(admin.ModelAdmin):
+class AnonymousUserAdminConfig(LargeTableAdminMixin, admin.ModelAdmin):
     model = AnonymousUser
     list_display = ("id", "created_at")
     ordering = ("-created_at",)
     list_filter = ("created_at",)
 
 
-class UserProfileAdminConfig(admin.ModelAdmin):
+class UserProfileAdminConfig(IndexedUserSearchMixin, admin.ModelAdmin):
+    user_lookup = "user__"
     fields = ("user", "rank", "is_bot", "is_online", "is_search_visible", "is_rank_visible")
+    autocomplete_fields = ("user",)
     list_display = (
         "pk",
+        "user",
         "rank",
         "games_played",
         "games_won",
@@ -58,11 +95,31 @@ class UserProfileAdminConfig(admin.ModelAdmin):
         "is_search_visible",
         "is_rank_visible",
     )
-    search_fields = ("is_bot",)
+    list_select_related = ("user",)
+    search_fields = ("user__email", "user__username")
+    search_help_text = "Whole email or beginning of the username of the player."
     list_filter = ("is_bot", "is_online")
-    ordering = ("-rank",)
+    ordering = ("-rank", "-id")
+
+
+class MatchResultAdminConfig(LargeTableAdminMixin, admin.ModelAdmin):
+    model = MatchResult
+    list_display = ("pk", "player_one", "player_two", "winner", "created_at")
+    list_select_related = ("player_one", "player_two", "winner")
+    raw_id_fields = ("player_one", "player_two", "winner")
+    ordering = ("-created_at",)
+
+
+class OutboxEmailAdminConfig(admin.ModelAdmin):
+    model = OutboxEmail
+    list_display = ("subject", "recipient", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
+    ordering = ("-created_at",)
+    readonly_fields = ("created_at", "sent_at", "last_error")
 
 
 admin.site.register(User, UserAdminConfig)
 admin.site.register(AnonymousUser, AnonymousUserAdminConfig)
 admin.site.register(UserProfile, UserProfileAdminConfig)
+admin.site.register(OutboxEmail, OutboxEmailAdminConfig)
+admin.site.register(MatchResult, MatchResultAdminConfig)
@@ -0,0 +1,180 @@
+"""Native async versions of the I/O bound endpoints, served instead of the sync ones when ``ASYNC_VIEWS`` is on.
+
+Turn it on under ASGI only behind slow clients, see ``config/asgi.py``. Every view subclasses its sync counterpart
+from ``users/views.py``, so authentication, permissions and serializers stay shared and only the handlers differ.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.http import Http404
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from rest_framework import exceptions, status
+from rest_framework.response import Response
+
+from . import serializers, views
+from .exceptions import ServiceUnavailable
+from .helpers.conditional import auser_last_modified
+from .helpers.nick_allocator import NicksExhausted, nick_allocator
+from .helpers.outbox import aenqueue_mail
+
+
+class AsyncAPIViewMixin:
+    """Runs DRF's request cycle in the event loop for views whose handlers are coroutines.
+
+    Authenticators with an ``aauthenticate`` coroutine are awaited, other ones run in a thread. Content
+    negotiation, permissions, throttles and exception handling are DRF's own sync code, none of which does I/O.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            # OPTIONS is answered by DRF's sync handler.
+            if asyncio.iscoroutine(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+        request.version, request.versioning_scheme = self.determine_version(request, *args, **kwargs)
+
+        await self.aperform_authentication(request)
+        self.check_permissions(request)
+        self.check_throttles(request)
+
+    async def aperform_authentication(self, request):
+        """``Request._authenticate`` awaiting the authenticators, so ``request.user`` never queries lazily."""
+        for authenticator in request.authenticators:
+            authenticate = getattr(authenticator, "aauthenticate", None) or sync_to_async(authenticator.authenticate)
+            try:
+                user_auth_tuple = await authenticate(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
+
+
+class CreateAnonymousUserAPIView(AsyncAPIViewMixin, views.CreateAnonymousUserAPIView):
+    async def post(self, request):
+        # Issuing a guest token only signs it, there is nothing to await.
+        return super().post(request)
+
+
+class GetUserAPIView(AsyncAPIViewMixin, views.GetUserAPIView):
+    async def get(self, request, *args, **kwargs):
+        last_modified = await auser_last_modified(kwargs["pk"])
+        if last_modified is None:
+            raise Http404
+
+        etag, response = self.conditional_response(request, kwargs["pk"], last_modified)
+        if response is None:
+            # Cache backends and serializers are sync, a cache miss loads the user within the same thread hop.
+            response = Response(await sync_to_async(self.cached_payload)(request, kwargs["pk"], last_modified))
+        return self.add_validators(response, etag, last_modified)
+
+
+class UserActivationView(AsyncAPIViewMixin, views.UserActivationView):
+    async def get(self, request, uid, token):
+        user_id = force_str(urlsafe_base64_decode(uid))
+
+        try:
+            user = await get_user_model().objects.aget(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return Response({"detail": "Invalid activation link."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not default_token_generator.check_token(user, token):
+            return Response({"detail": "Invalid activation link."}, status=status.HTTP_400_BAD_REQUEST)
+
+        user.is_active = True
+        await user.asave()
+        return Response({"detail": "Account activated successfully."}, status=status.HTTP_200_OK)
+
+
+class CustomNickAPIView(AsyncAPIViewMixin, views.CustomNickAPIView):
+    async def get(self, request):
+        serializer = serializers.CustomNickQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        try:
+            nick = await nick_allocator.aallocate(serializer.validated_data["count"])
+        except NicksExhausted:
+            raise ServiceUnavailable(views.NICKS_EXHAUSTED)
+        return Response(nick, status=status.HTTP_200_OK)
+
+
+class PasswordReminderView(AsyncAPIViewMixin, views.PasswordReminderView):
+    async def post(self, request):
+        serializer = serializers.PasswordReminderEmailSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = await get_user_model().objects.filter(email=serializer.validated_data["email"]).afirst()
+        if user is None:
+            raise exceptions.ValidationError({"email": [serializer.UNKNOWN_EMAIL]})
+
+        uid = urlsafe_base64_encode(force_bytes(user.pk))
+        token = default_token_generator.make_token(user)
+        reset_link = f"http://0.0.0.0:8000/api/v1/users/password-reset/{uid}/{token}/"
+
+        await aenqueue_mail(
+            subject="Password Reset",
+            message=f"Please click the following link to reset your password: {reset_link}",
+            from_email="noreply@email.com",
+            recipient=user.email,
+        )
+
+        return Response({"detail": "Password reset link sent to your email."}, status=status.HTTP_200_OK)
+
+
+class PasswordResetView(AsyncAPIViewMixin, views.PasswordResetView):
+    async def post(self, request, uid, token):
+        user_id = force_str(urlsafe_base64_decode(uid))
+
+        try:
+            user = await get_user_model().objects.aget(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return Response({"detail": "Invalid password reset link."}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = serializers.PasswordResetSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        if not default_token_generator.check_token(user, token):
+            return Response({"detail": "Invalid password reset link."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Hashing takes tens of milliseconds of CPU; off the event loop and outside the thread the ORM shares.
+        await sync_to_async(user.set_password, thread_sensitive=False)(serializer.validated_data["password"])
+        await user.asave(update_fields=["password"])
+
+        return Response({"detail": "Password has been successfully reset."}, status=status.HTTP_200_OK)
+
+
+class PooledTokenObtainPairView(AsyncAPIViewMixin, views.PooledTokenObtainPairView):
+    async def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        # Field validation only, the credentials are checked by the awaited password pool.
+        attrs = serializer.to_internal_value(request.data)
+        return Response(await serializer.avalidate(attrs), status=status.HTTP_200_OK)
@@ -0,0 +1,106 @@
+import copy
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .helpers.request_timing import timed
+from .helpers.ttl_cache import TTLCache
+from .routers import identify_user
+
+user_cache = TTLCache(maxsize=settings.JWT_USER_CACHE_SIZE, ttl=settings.JWT_USER_CACHE_TTL)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication which keeps authenticated users in a per-process TTL/LRU cache keyed by user id.
+
+    Entries are dropped by ``post_save``/``post_delete`` signals of the user model. Other processes only
+    notice a change once their entry expires, so ``JWT_USER_CACHE_TTL`` bounds how long it can be stale.
+    """
+
+    def authenticate(self, request):
+        with timed("auth"):
+            return super().authenticate(request)
+
+    async def aauthenticate(self, request):
+        """:meth:`authenticate` for async views, users missing from the cache are loaded with the async ORM."""
+        with timed("auth"):
+            header = self.get_header(request)
+            raw_token = self.get_raw_token(header) if header is not None else None
+            if raw_token is None:
+                return None
+            validated_token = self.get_validated_token(raw_token)
+            return await self.aget_user(validated_token), validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        identify_user(user_id)
+        user = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+        # Every request gets its own copy, so changes made by a view never leak into the cache.
+        return copy.copy(user)
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        identify_user(user_id)
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            if not user.is_active:
+                raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+            user_cache.set(user_id, user)
+        return copy.copy(user)
+
+
+class ClaimsJWTAuthentication(CachedJWTAuthentication):
+    """Authorizes safe requests from token claims alone when ``JWT_CLAIMS_AUTH_FOR_READS`` is enabled.
+
+    The user is then a :class:`rest_framework_simplejwt.models.TokenUser` whose ``is_active``, ``is_staff``
+    and ``is_superuser`` come from the token, so changes to them apply only to newly issued tokens; tokens
+    without these claims are rejected.
+    """
+
+    def authenticate(self, request):
+        self.claims_only = settings.JWT_CLAIMS_AUTH_FOR_READS and request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    async def aauthenticate(self, request):
+        self.claims_only = settings.JWT_CLAIMS_AUTH_FOR_READS and request.method in SAFE_METHODS
+        return await super().aauthenticate(request)
+
+    def get_user(self, validated_token):
+        if not self.claims_only:
+            return super().get_user(validated_token)
+        return self.get_token_user(validated_token)
+
+    async def aget_user(self, validated_token):
+        if not self.claims_only:
+            return await super().aget_user(validated_token)
+        return self.get_token_user(validated_token)
+
+    def get_token_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        # Tokens issued without the claims cannot prove the user is still active, they need a database lookup.
+        if "is_active" not in validated_token:
+            raise InvalidToken(_("Token contained no user status claims"))
+        if not validated_token["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return api_settings.TOKEN_USER_CLASS(validated_token)
@@ -0,0 +1,92 @@
+"""Performance benchmarks run with ``python manage.py benchmark <name>``.
+
+Every benchmark module exposes ``HELP``, ``add_arguments(parser)`` and ``run(options)``;
+``run`` returns a JSON serializable dict with the measured results.
+"""
+import random
+import statistics
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, connections, transaction
+
+from users.routers import replica_aliases
+
+BENCHMARKS = {
+    "nick": "users.benchmarks.nick_generator",
+    "leaderboard": "users.benchmarks.leaderboard",
+    "uuid": "users.benchmarks.uuid_keys",
+    "matchmaking": "users.benchmarks.matchmaking",
+    "matches": "users.benchmarks.match_results",
+    "search": "users.benchmarks.player_search",
+    "admin": "users.benchmarks.admin",
+    "endpoints": "users.benchmarks.endpoints",
+    "async": "users.benchmarks.async_views",
+}
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """Run the block against a throwaway test database so benchmarks never touch real data.
+
+    Read replicas mirror the test database meanwhile, like ``TEST["MIRROR"]`` does for the test runner.
+    """
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    replicas = {alias: settings.DATABASES[alias] for alias in replica_aliases()}
+    _use_database_settings(dict.fromkeys(replicas, connection.settings_dict))
+    try:
+        yield
+    finally:
+        _use_database_settings(replicas)
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+
+def _use_database_settings(settings_dicts):
+    # Wrappers of other threads are created later from settings.DATABASES.
+    for alias, settings_dict in settings_dicts.items():
+        connections[alias].close()
+        settings.DATABASES[alias] = connections[alias].settings_dict = settings_dict
+
+
+def seed_profiles(count, batch_size=10000, seed=0, nicks=False):
+    """Bulk insert ``count`` users with profiles spread over ranks 0-5000; about 5% of them are bots.
+
+    Usernames are ``bench<n>`` unless ``nicks`` is set, then they are drawn from the nick generator.
+    """
+    from users.helpers.nick_generator import generate_nicks
+    from users.models import UserProfile
+
+    User = get_user_model()
+    rng = random.Random(seed)
+    offset = User.objects.count()
+
+    for start in range(offset, offset + count, batch_size):
+        stop = min(start + batch_size, offset + count)
+        usernames = (
+            generate_nicks(stop - start, seed=rng.random()) if nicks else [f"bench{i}" for i in range(start, stop)]
+        )
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                User(email=f"bench{i}@example.com", username=username, password="!", is_active=True)
+                for i, username in zip(range(start, stop), usernames)
+            )
+            UserProfile.objects.bulk_create(
+                UserProfile(
+                    user=user,
+                    rank=rng.randint(0, 5000),
+                    is_bot=rng.random() < 0.05,
+                    is_search_visible=rng.random() < 0.9,
+                    is_rank_visible=rng.random() < 0.9,
+                )
+                for user in users
+            )
+
+
+def percentiles(samples):
+    """Return p50, p95 and p99 of ``samples`` in milliseconds, given samples in seconds."""
+    if len(samples) < 2:
+        samples = list(samples) * 2
+    cut_points = statistics.quantiles(samples, n=100, method="inclusive")
+    return {f"p{p}_ms": round(cut_points[p - 1] * 1000, 3) for p in (50, 95, 99)}
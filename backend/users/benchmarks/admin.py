@@ -0,0 +1,65 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from users.models import UserProfile
+
+from . import benchmark_database, percentiles, seed_profiles
+
+HELP = "Measure latency and query counts of the user and profile admin changelists on a seeded table."
+
+
+def add_arguments(parser):
+    parser.add_argument("--profiles", type=int, default=1_000_000, help="Number of seeded users with profiles.")
+    parser.add_argument("--repeat", type=int, default=10, help="Measured requests per page.")
+    parser.add_argument("--keepdb", action="store_true", help="Reuse the seeded benchmark database.")
+
+
+def _time_page(client, url, repeat):
+    samples = []
+    for _ in range(repeat):
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(url)
+            samples.append(time.perf_counter() - start)
+        assert response.status_code == 200, f"{url} returned {response.status_code}"
+    return {**percentiles(samples), "queries": len(queries)}
+
+
+def run(options):
+    with benchmark_database(keepdb=options["keepdb"]):
+        if UserProfile.objects.count() < options["profiles"]:
+            seed_profiles(options["profiles"] - UserProfile.objects.count(), nicks=True)
+
+        User = get_user_model()
+        admin_user = User.objects.filter(email="admin@example.com").first() or User.objects.create_superuser(
+            email="admin@example.com", username="admin", password="!", is_active=True
+        )
+        client = Client()
+        client.force_login(admin_user)
+        some_user = User.objects.filter(profile__isnull=False).order_by("-pk").first()
+
+        pages = {
+            "user_list": "/admin/users/customuser/",
+            "users_middle_page": f"/admin/users/customuser/?p={User.objects.count() // 200}",
+            "users_active": "/admin/users/customuser/?is_active__exact=1",
+            "users_search_username": f"/admin/users/customuser/?q={some_user.username[:5]}",
+            "users_search_email": f"/admin/users/customuser/?q={some_user.email}",
+            "profile_list": "/admin/users/userprofile/",
+            "profiles_search_username": f"/admin/users/userprofile/?q={some_user.username[:5]}",
+            "user_autocomplete": (
+                "/admin/autocomplete/?app_label=users&model_name=userprofile&field_name=user"
+                f"&term={some_user.username[:5]}"
+            ),
+            "user_change": f"/admin/users/customuser/{some_user.pk}/change/",
+            "profile_change": f"/admin/users/userprofile/{some_user.profile.pk}/change/",
+        }
+        return {
+            "vendor": connection.vendor,
+            "profiles": UserProfile.objects.count(),
+            **{name: _time_page(client, url, options["repeat"]) for name, url in pages.items()},
+        }
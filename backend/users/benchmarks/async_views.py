@@ -0,0 +1,285 @@
+import asyncio
+import importlib
+import io
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlencode
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.urls import clear_url_caches
+from django.utils import timezone
+
+from . import benchmark_database, percentiles, seed_profiles
+from .endpoints import SCENARIOS, Dataset, _temporary_rank_table
+
+HELP = (
+    "Compare how many concurrent connections one worker serves with the async views on ASGI "
+    "and with the sync views on WSGI behind a thread pool."
+)
+ROUTES = (
+    "create_anonymous_user",
+    "get_user",
+    "activate_user",
+    "generate_nick",
+    "password_reminder",
+    "password_reset",
+    "token_obtain_pair",
+)
+# Hashing a password takes most of a CPU second, it would drown the I/O the benchmark is about.
+DEFAULT_ROUTES = [route for route in ROUTES if route not in ("password_reset", "token_obtain_pair")]
+HOST = "testserver"
+
+
+def add_arguments(parser):
+    parser.add_argument("--profiles", type=int, default=10_000, help="Number of seeded users with profiles.")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per mode and concurrency level.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128], help="Open connections.")
+    parser.add_argument("--threads", type=int, default=8, help="Threads of the WSGI worker, as gunicorn --threads.")
+    parser.add_argument("--routes", nargs="+", choices=ROUTES, default=DEFAULT_ROUTES, help="Routes in the mix.")
+    parser.add_argument(
+        "--db-latency-ms", type=float, default=0, help="Added to every query, emulates a database across the network."
+    )
+    parser.add_argument(
+        "--client-delay-ms", type=float, default=0, help="Time a request takes to arrive, emulates slow clients."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keepdb", action="store_true", help="Reuse the seeded benchmark database.")
+
+
+@contextmanager
+def _serving(async_views):
+    """Route the converted endpoints to the async or the sync views, as config/asgi.py and config/wsgi.py do."""
+    import config.urls
+    import users.urls
+
+    def reload_urls():
+        importlib.reload(users.urls)
+        importlib.reload(config.urls)
+        clear_url_caches()
+
+    with override_settings(ASYNC_VIEWS=async_views, ALLOWED_HOSTS=[HOST]):
+        reload_urls()
+        try:
+            yield
+        finally:
+            reload_urls()
+
+
+@contextmanager
+def _database_latency(seconds):
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def add_delay(sender, connection, **kwargs):
+        connection.execute_wrappers.append(delay)
+
+    if not seconds:
+        yield
+        return
+    # Connections are per thread, every thread serving requests opens its own one.
+    connection_created.connect(add_delay)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(add_delay)
+
+
+def _body(call):
+    if call.method == "get" or call.data is None:
+        return b""
+    return json.dumps(call.data).encode()
+
+
+def _query_string(call):
+    return urlencode(call.data) if call.method == "get" and call.data else ""
+
+
+def _authorization(data, call):
+    return f"Bearer {data.access_token(call.user)}" if call.user else None
+
+
+def _wsgi_request(application, call, authorization, client_delay):
+    # A sync worker thread is busy for as long as a slow client takes to send its request.
+    time.sleep(client_delay)
+    body = _body(call)
+    environ = {
+        "REQUEST_METHOD": call.method.upper(),
+        "SCRIPT_NAME": "",
+        "PATH_INFO": call.path,
+        "QUERY_STRING": _query_string(call),
+        "SERVER_NAME": HOST,
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": HOST,
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.url_scheme": "http",
+        "wsgi.errors": io.StringIO(),
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    if authorization:
+        environ["HTTP_AUTHORIZATION"] = authorization
+
+    statuses = []
+    response = application(environ, lambda status, headers, exc_info=None: statuses.append(int(status.split()[0])))
+    try:
+        b"".join(response)
+    finally:
+        response.close()
+    return statuses[0]
+
+
+async def _asgi_request(application, call, authorization, client_delay):
+    body = _body(call)
+    headers = [
+        (b"host", HOST.encode()),
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    if authorization:
+        headers.append((b"authorization", authorization.encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": call.method.upper(),
+        "scheme": "http",
+        "path": call.path,
+        "raw_path": call.path.encode(),
+        "query_string": _query_string(call).encode(),
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 0),
+        "server": (HOST, 80),
+    }
+    sent_body = False
+    statuses = []
+
+    async def receive():
+        nonlocal sent_body
+        if sent_body:
+            # The client stays connected until the response is sent.
+            await asyncio.Event().wait()
+        sent_body = True
+        if client_delay:
+            await asyncio.sleep(client_delay)
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    await application(scope, receive, send)
+    return statuses[0]
+
+
+async def _load(serve, calls, concurrency):
+    """Serve ``calls`` from ``concurrency`` clients which each send their next request once answered."""
+    pending = iter(calls)
+    samples, unexpected = [], []
+
+    async def client():
+        for call, authorization in pending:
+            start = time.perf_counter()
+            status = await serve(call, authorization)
+            samples.append(time.perf_counter() - start)
+            if status not in call.statuses:
+                unexpected.append(status)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests_per_second": round(len(samples) / elapsed, 1),
+        **percentiles(samples),
+        "errors": len(unexpected),
+        "error_statuses": sorted(set(unexpected)),
+    }
+
+
+def _calls(data, routes, count):
+    # Calls are prepared up front, scenarios create the users that activations and resets consume.
+    calls = []
+    for index in range(count):
+        call = SCENARIOS[routes[index % len(routes)]](data)
+        calls.append((call, _authorization(data, call)))
+    return calls
+
+
+def _run_wsgi(data, options, concurrency):
+    application = WSGIHandler()
+    client_delay = options["client_delay_ms"] / 1000
+    with ThreadPoolExecutor(max_workers=options["threads"]) as worker:
+
+        async def serve(call, authorization):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(worker, _wsgi_request, application, call, authorization, client_delay)
+
+        return asyncio.run(_load(serve, _calls(data, options["routes"], options["requests"]), concurrency))
+
+
+def _run_asgi(data, options, concurrency):
+    application = ASGIHandler()
+    client_delay = options["client_delay_ms"] / 1000
+
+    async def serve(call, authorization):
+        return await _asgi_request(application, call, authorization, client_delay)
+
+    return asyncio.run(_load(serve, _calls(data, options["routes"], options["requests"]), concurrency))
+
+
+@contextmanager
+def _quiet_request_errors():
+    # Failed requests are counted per level; SQLite fails concurrent writes with "database table is locked".
+    logger = logging.getLogger("django.request")
+    level = logger.level
+    logger.setLevel(logging.CRITICAL)
+    try:
+        yield
+    finally:
+        logger.setLevel(level)
+
+
+def run(options):
+    levels = {}
+    with benchmark_database(keepdb=options["keepdb"]), _temporary_rank_table(), _quiet_request_errors():
+        from users.models import UserProfile
+
+        if UserProfile.objects.count() < options["profiles"]:
+            seed_profiles(options["profiles"] - UserProfile.objects.count(), nicks=True)
+        data = Dataset(options["seed"])
+
+        with _database_latency(options["db_latency_ms"] / 1000):
+            for concurrency in options["concurrency"]:
+                with _serving(async_views=False):
+                    wsgi = _run_wsgi(data, options, concurrency)
+                with _serving(async_views=True):
+                    asgi = _run_asgi(data, options, concurrency)
+                levels[concurrency] = {
+                    "wsgi": wsgi,
+                    "asgi": asgi,
+                    "asgi_speedup": round(asgi["requests_per_second"] / wsgi["requests_per_second"], 2),
+                }
+
+    return {
+        "vendor": connection.vendor,
+        "finished_at": timezone.now().isoformat(),
+        "profiles": options["profiles"],
+        "requests": options["requests"],
+        "wsgi_threads": options["threads"],
+        "routes": options["routes"],
+        "db_latency_ms": options["db_latency_ms"],
+        "client_delay_ms": options["client_delay_ms"],
+        "concurrency": levels,
+    }
@@ -0,0 +1,353 @@
+import json
+import math
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users import urls
+from users.helpers.guest_tokens import issue_guest_token
+from users.helpers.matchmaking import matchmaking_queue
+from users.helpers.nick_allocator import nick_allocator
+from users.helpers.player_search import player_search_index
+from users.helpers.rank_table import rank_table, rebuild_rank_table
+from users.models import UserProfile
+
+from . import benchmark_database, percentiles, seed_profiles
+
+HELP = (
+    "Call every named route of users/urls.py on a seeded dataset, record latency, allocations and queries "
+    "and report routes over their budget."
+)
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), "endpoint_budgets.json")
+# Headroom of budgets written with --write-budgets over the measured values; query counts get none.
+# Latency budgets never go below LATENCY_FLOOR_MS, so scheduler noise does not fail sub-millisecond routes.
+# Latency depends on the machine, so it is only checked with --latency-budgets, e.g. on a dedicated runner.
+LATENCY_HEADROOM = 3
+LATENCY_FLOOR_MS = 25
+ALLOCATION_HEADROOM = 2
+
+Call = namedtuple("Call", ("method", "path", "data", "user", "statuses"))
+
+
+def add_arguments(parser):
+    parser.add_argument("--profiles", type=int, default=10_000, help="Number of seeded users with profiles.")
+    parser.add_argument("--repeat", type=int, default=20, help="Measured requests per route.")
+    parser.add_argument("--routes", nargs="*", help="Only these route names.")
+    parser.add_argument("--budgets", default=BUDGETS_PATH, help="JSON file with the budget of every route.")
+    parser.add_argument("--write-budgets", action="store_true", help="Store the measured values as new budgets.")
+    parser.add_argument(
+        "--latency-budgets",
+        action="store_true",
+        help="Also fail on p95 latency over budget, only meaningful on the machine the budgets were written on.",
+    )
+    parser.add_argument("--output", help="Also write the results to this JSON file, e.g. for trend tracking.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keepdb", action="store_true", help="Reuse the seeded benchmark database.")
+
+
+class Dataset:
+    """Seeded users plus helpers creating the throwaway users that destructive routes need."""
+
+    PASSWORD = "benchmark-password"
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.counter = 0
+        User = get_user_model()
+        self.players = list(
+            UserProfile.objects.filter(user__is_active=True).values_list("user_id", "user__username", "user__email")
+        )
+        self.admin = User.objects.filter(email="admin@example.com").first() or User.objects.create_superuser(
+            email="admin@example.com", username="admin", password=self.PASSWORD, is_active=True
+        )
+        self.login_user = User.objects.filter(email="login@example.com").first() or User.objects.create_user(
+            email="login@example.com", username="login", password=self.PASSWORD, is_active=True
+        )
+        self._tokens = {}
+
+    def player(self):
+        return self.rng.choice(self.players)
+
+    def player_user(self):
+        return get_user_model()(pk=self.player()[0])
+
+    def unique(self, prefix):
+        self.counter += 1
+        return f"{prefix}{self.counter}-{time.monotonic_ns()}"
+
+    def fresh_user(self, is_active=True):
+        name = self.unique("fresh")
+        user = get_user_model().objects.create_user(email=f"{name}@example.com", username=name, is_active=is_active)
+        UserProfile.objects.create(user=user)
+        return user
+
+    def access_token(self, user):
+        if user.pk not in self._tokens:
+            self._tokens[user.pk] = str(RefreshToken.for_user(user).access_token)
+        return self._tokens[user.pk]
+
+    def registration(self):
+        name = self.unique("new")
+        return {"email": f"{name}@example.com", "username": name, "password": self.PASSWORD}
+
+
+def _uid_and_token(user):
+    return urlsafe_base64_encode(force_bytes(user.pk)), default_token_generator.make_token(user)
+
+
+def _activate_user(data):
+    user = data.fresh_user(is_active=False)
+    uid, token = _uid_and_token(user)
+    return Call("get", reverse("activate_user", kwargs={"uid": uid, "token": token}), None, None, {200})
+
+
+def _password_reset(data):
+    user = data.fresh_user()
+    uid, token = _uid_and_token(user)
+    password = {"password": data.PASSWORD, "confirm_password": data.PASSWORD}
+    return Call("post", reverse("password_reset", kwargs={"uid": uid, "token": token}), password, None, {200})
+
+
+def _persist_anonymous_user(data):
+    _, _, token = issue_guest_token()
+    return Call("post", reverse("persist_anonymous_user"), {"token": token}, None, {201})
+
+
+def _get_user(data):
+    user = data.player_user()
+    return Call("get", reverse("get_user", kwargs={"pk": user.pk}), None, user, {200})
+
+
+def _update_user(data):
+    return Call("patch", reverse("update_user"), {"first_name": data.unique("Name")[:30]}, data.player_user(), {200})
+
+
+def _delete_user(data):
+    user = data.fresh_user()
+    return Call("delete", reverse("delete_user", kwargs={"pk": user.pk}), None, user, {204})
+
+
+def _deactivate_user(data):
+    user = data.fresh_user()
+    return Call("post", reverse("deactivate_user", kwargs={"pk": user.pk}), None, user, {200})
+
+
+def _search_players(data):
+    query = data.player()[1][: data.rng.randint(1, 6)]
+    return Call("get", reverse("search_players"), {"q": query}, None, {200})
+
+
+def _matchmaking(data):
+    user = data.player_user()
+    matchmaking_queue.dequeue(user.pk)
+    return Call("post", reverse("matchmaking"), None, user, {200, 202})
+
+
+def _submit_match_result(data):
+    (player_one_id, *_), (player_two_id, *_) = data.rng.sample(data.players, 2)
+    result = {"player_one_id": player_one_id, "player_two_id": player_two_id, "winner_id": player_one_id}
+    return Call("post", reverse("submit_match_result"), result, data.admin, {201})
+
+
+def _leaderboard_position(data):
+    _, user_id = data.rng.choice(rank_table.top(1000))
+    return Call("get", reverse("leaderboard_position", kwargs={"user_id": user_id}), None, None, {200})
+
+
+def _token_refresh(data):
+    return Call("post", reverse("token_refresh"), {"refresh": str(RefreshToken.for_user(data.login_user))}, None, {200})
+
+
+SCENARIOS = {
+    "create_user": lambda data: Call("post", reverse("create_user"), data.registration(), None, {201}),
+    "create_user_with_profile": lambda data: Call(
+        "post", reverse("create_user_with_profile"), data.registration(), None, {201}
+    ),
+    "register_user": lambda data: Call("post", reverse("register_user"), data.registration(), None, {201}),
+    "activate_user": _activate_user,
+    "create_anonymous_user": lambda data: Call("post", reverse("create_anonymous_user"), None, None, {201}),
+    "persist_anonymous_user": _persist_anonymous_user,
+    "get_user": _get_user,
+    "update_user": _update_user,
+    "search_players": _search_players,
+    "generate_nick": lambda data: Call("get", reverse("generate_nick"), {"count": 5}, None, {200}),
+    "delete_user": _delete_user,
+    "deactivate_user": _deactivate_user,
+    "password_reminder": lambda data: Call(
+        "post", reverse("password_reminder"), {"email": data.player()[2]}, None, {200}
+    ),
+    "password_reset": _password_reset,
+    "heartbeat": lambda data: Call("post", reverse("heartbeat"), None, data.player_user(), {204}),
+    "online_count": lambda data: Call("get", reverse("online_count"), None, None, {200}),
+    "user_response_cache": lambda data: Call("get", reverse("user_response_cache"), None, data.admin, {200}),
+    "matchmaking": _matchmaking,
+    "submit_match_result": _submit_match_result,
+    "leaderboard": lambda data: Call("get", reverse("leaderboard"), None, None, {200}),
+    "leaderboard_top": lambda data: Call("get", reverse("leaderboard_top"), {"limit": 10}, None, {200}),
+    "leaderboard_position": _leaderboard_position,
+    "token_obtain_pair": lambda data: Call(
+        "post", reverse("token_obtain_pair"), {"email": "login@example.com", "password": data.PASSWORD}, None, {200}
+    ),
+    "token_refresh": _token_refresh,
+}
+
+
+def route_names():
+    return [pattern.name for pattern in urls.urlpatterns if pattern.name]
+
+
+@contextmanager
+def _temporary_rank_table():
+    """Point the shared rank table at a scratch file, so the benchmark never rewrites the live leaderboard."""
+    live_path = rank_table.path
+    with tempfile.TemporaryDirectory() as directory:
+        rank_table.path, rank_table._mmap = os.path.join(directory, "rank_table"), None
+        try:
+            yield
+        finally:
+            rank_table.path, rank_table._mmap = live_path, None
+
+
+@contextmanager
+def _fresh_indexes():
+    """Start from indexes of the benchmark database and drop them afterwards, they would outlive it otherwise.
+
+    The nick filter and the player search trie are built up front, otherwise the first requests race their
+    background builds.
+    """
+    player_search_index.reset()
+    if connection.vendor != "postgresql":
+        player_search_index.build()
+    nick_allocator.reset()
+    nick_allocator._get_filter()
+    if nick_allocator._builder is not None:
+        nick_allocator._builder.join()
+    try:
+        yield
+    finally:
+        player_search_index.reset()
+        nick_allocator.reset()
+
+
+def _request(client, data, call):
+    client.credentials(**({"HTTP_AUTHORIZATION": f"Bearer {data.access_token(call.user)}"} if call.user else {}))
+    if call.method == "get":
+        return client.get(call.path, call.data)
+    return getattr(client, call.method)(call.path, call.data, format="json")
+
+
+def _measure(name, data, repeat):
+    client = APIClient()
+    scenario = SCENARIOS[name]
+    unexpected = []
+
+    def call_once():
+        call = scenario(data)
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = _request(client, data, call)
+            seconds = time.perf_counter() - start
+        if response.status_code not in call.statuses:
+            unexpected.append(response.status_code)
+        return seconds, len(queries)
+
+    call_once()
+    samples, query_counts = zip(*(call_once() for _ in range(repeat)))
+
+    tracemalloc.start()
+    try:
+        call_once()
+        _, allocated = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        **percentiles(samples),
+        "queries": max(query_counts),
+        "allocated_kib": math.ceil(allocated / 1024),
+        "unexpected_statuses": sorted(set(unexpected)),
+    }
+
+
+def _violations(name, result, budget, metrics):
+    if budget is None:
+        return [f"{name}: no budget, add one to the budgets file or run with --write-budgets"]
+    violations = []
+    if result["unexpected_statuses"]:
+        violations.append(f"{name}: unexpected status codes {result['unexpected_statuses']}")
+    for metric in metrics:
+        if result[metric] > budget[metric]:
+            violations.append(f"{name}: {metric} {result[metric]} over budget {budget[metric]}")
+    return violations
+
+
+def _budget(result):
+    return {
+        "queries": result["queries"],
+        "p95_ms": max(math.ceil(result["p95_ms"] * LATENCY_HEADROOM), LATENCY_FLOOR_MS),
+        "allocated_kib": math.ceil(result["allocated_kib"] * ALLOCATION_HEADROOM),
+    }
+
+
+def run(options):
+    names = options["routes"] or route_names()
+    missing = [name for name in names if name not in SCENARIOS]
+    if missing:
+        return {"violations": [f"{name}: no scenario in users/benchmarks/endpoints.py" for name in missing]}
+
+    budgets = {}
+    if os.path.exists(options["budgets"]):
+        with open(options["budgets"]) as budgets_file:
+            budgets = json.load(budgets_file)
+
+    # The test client sends requests to "testserver", which the deployment's ALLOWED_HOSTS does not list.
+    with benchmark_database(keepdb=options["keepdb"]), _temporary_rank_table(), override_settings(
+        ALLOWED_HOSTS=["testserver"]
+    ):
+        if UserProfile.objects.count() < options["profiles"]:
+            seed_profiles(options["profiles"] - UserProfile.objects.count(), nicks=True)
+        rebuild_rank_table()
+        data = Dataset(options["seed"])
+
+        with _fresh_indexes():
+            routes = {name: _measure(name, data, options["repeat"]) for name in names}
+
+    metrics = ("queries", "allocated_kib", "p95_ms") if options["latency_budgets"] else ("queries", "allocated_kib")
+    violations = [
+        violation for name in names for violation in _violations(name, routes[name], budgets.get(name), metrics)
+    ]
+    if options["write_budgets"]:
+        budgets.update({name: _budget(routes[name]) for name in names})
+        with open(options["budgets"], "w") as budgets_file:
+            json.dump(dict(sorted(budgets.items())), budgets_file, indent=2)
+            budgets_file.write("\n")
+        violations = [violation for violation in violations if "unexpected status" in violation]
+
+    result = {
+        "vendor": connection.vendor,
+        "finished_at": timezone.now().isoformat(),
+        "profiles": options["profiles"],
+        "repeat": options["repeat"],
+        "routes": routes,
+        "violations": violations,
+    }
+    if options["output"]:
+        with open(options["output"], "w") as output_file:
+            json.dump({"benchmark": "endpoints", **result}, output_file, indent=2)
+    return result
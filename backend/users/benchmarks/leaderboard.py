@@ -0,0 +1,71 @@
+import time
+
+from rest_framework.test import APIRequestFactory
+
+from users.models import UserProfile
+from users.views import LeaderboardAPIView
+
+from . import benchmark_database, percentiles, seed_profiles
+
+HELP = "Compare keyset and OFFSET pagination of the leaderboard on a seeded profile table."
+
+
+def add_arguments(parser):
+    parser.add_argument("--profiles", type=int, default=1_000_000, help="Number of seeded profiles.")
+    parser.add_argument("--page", type=int, default=10_000, help="Deep page number to compare with the first page.")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20, help="Measured requests per page.")
+    parser.add_argument("--keepdb", action="store_true", help="Reuse the seeded benchmark database.")
+
+
+def _time_requests(view, request_factory, query, repeat):
+    samples = []
+    for _ in range(repeat):
+        request = request_factory.get("/api/v1/leaderboard/", query)
+        start = time.perf_counter()
+        response = view(request)
+        response.render()
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def _time_offset_queries(offset, page_size, repeat):
+    queryset = UserProfile.objects.filter(is_rank_visible=True, is_bot=False).select_related("user")
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(queryset.order_by("-rank", "-pk")[offset:][:page_size])
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def run(options):
+    page_size, repeat = options["page_size"], options["repeat"]
+    offset = (options["page"] - 1) * page_size
+
+    with benchmark_database(keepdb=options["keepdb"]):
+        if UserProfile.objects.count() < options["profiles"]:
+            seed_profiles(options["profiles"] - UserProfile.objects.count())
+
+        view = LeaderboardAPIView.as_view()
+        request_factory = APIRequestFactory()
+        paginator = LeaderboardAPIView.pagination_class()
+
+        deep_cursor = {}
+        if offset:
+            last_row = (
+                UserProfile.objects.filter(is_rank_visible=True, is_bot=False)
+                .order_by("-rank", "-pk")
+                .values_list("rank", "pk")[offset - 1]
+            )
+            deep_cursor = {"cursor": paginator.encode_cursor(*last_row)}
+
+        return {
+            "profiles": options["profiles"],
+            "page_size": page_size,
+            "deep_page": options["page"],
+            "keyset_first_page": _time_requests(view, request_factory, {"page_size": page_size}, repeat),
+            "keyset_deep_page": _time_requests(view, request_factory, {"page_size": page_size, **deep_cursor}, repeat),
+            "offset_first_page_query": _time_offset_queries(0, page_size, repeat),
+            "offset_deep_page_query": _time_offset_queries(offset, page_size, repeat),
+        }
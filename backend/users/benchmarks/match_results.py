@@ -0,0 +1,72 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import OperationalError, close_old_connections, connection
+from django.db.models import Sum
+
+from users.helpers.match_results import record_match_result
+from users.models import MatchResult, UserProfile
+
+from . import benchmark_database, seed_profiles
+
+HELP = "Submit match results concurrently and verify that no game counter updates were lost."
+
+
+def add_arguments(parser):
+    parser.add_argument("--players", type=int, default=20, help="A small pool makes submissions contend for rows.")
+    parser.add_argument("--submissions", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--retries", type=int, default=100, help="Retries of a submission failing on a lock.")
+    parser.add_argument("--keepdb", action="store_true")
+
+
+def _submit(player_ids, seed, retries):
+    """Submit one random match, retrying lock errors. Return the number of attempts or ``None`` if all failed."""
+    rng = random.Random(seed)
+    player_one_id, player_two_id = rng.sample(player_ids, 2)
+    winner_id = rng.choice((player_one_id, player_two_id, None))
+    try:
+        for attempt in range(1, retries + 2):
+            try:
+                record_match_result(player_one_id, player_two_id, winner_id)
+                return attempt
+            except OperationalError:
+                # SQLite locks whole tables, so concurrent writers have to back off and retry.
+                time.sleep(rng.uniform(0, 0.01 * attempt))
+        return None
+    finally:
+        close_old_connections()
+
+
+def run(options):
+    with benchmark_database(keepdb=options["keepdb"]):
+        seed_profiles(options["players"])
+        player_ids = list(UserProfile.objects.values_list("user_id", flat=True))
+        profiles_before = UserProfile.objects.aggregate(played=Sum("games_played"), won=Sum("games_won"))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["threads"]) as executor:
+            attempts = list(
+                executor.map(lambda seed: _submit(player_ids, seed, options["retries"]), range(options["submissions"]))
+            )
+        seconds = time.perf_counter() - start
+        succeeded = sum(1 for attempt in attempts if attempt is not None)
+        retried = sum(attempt - 1 for attempt in attempts if attempt is not None)
+
+        profiles_after = UserProfile.objects.aggregate(played=Sum("games_played"), won=Sum("games_won"))
+        results = MatchResult.objects.count()
+        decided = MatchResult.objects.filter(winner__isnull=False).count()
+        played = profiles_after["played"] - profiles_before["played"]
+        won = profiles_after["won"] - profiles_before["won"]
+        consistent = results == succeeded and played == 2 * results and won == decided
+
+        return {
+            "vendor": connection.vendor,
+            "submissions": options["submissions"],
+            "succeeded": succeeded,
+            "failed": options["submissions"] - succeeded,
+            "submissions_per_second": round(succeeded / seconds),
+            "retries": retried,
+            "consistent": consistent,
+        }
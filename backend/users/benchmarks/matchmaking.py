@@ -0,0 +1,108 @@
+import random
+import time
+
+from users.helpers.matchmaking import MatchmakingQueue
+
+from . import percentiles
+
+HELP = "Simulate players joining the matchmaking queue and report match latency percentiles."
+
+
+def add_arguments(parser):
+    parser.add_argument("--players", type=int, default=50_000)
+    parser.add_argument(
+        "--queued",
+        type=int,
+        default=50_000,
+        help="Players queued up front on ranks too far apart to be paired, they wait for their bot timeout.",
+    )
+    parser.add_argument("--arrival-rate", type=float, default=5000.0, help="Players joining per simulated second.")
+    parser.add_argument("--tick", type=float, default=0.1, help="Simulated seconds between queue ticks.")
+    parser.add_argument("--bucket-size", type=int, default=50)
+    parser.add_argument("--base-window", type=int, default=100)
+    parser.add_argument("--window-growth", type=int, default=25)
+    parser.add_argument("--max-window", type=int, default=1000)
+    parser.add_argument("--bot-timeout", type=float, default=30.0)
+    parser.add_argument("--match-ttl", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run(options):
+    rng = random.Random(options["seed"])
+    clock = SimulatedClock()
+    queue = MatchmakingQueue(
+        bucket_size=options["bucket_size"],
+        base_window=options["base_window"],
+        window_growth=options["window_growth"],
+        max_window=options["max_window"],
+        bot_timeout=options["bot_timeout"],
+        match_ttl=options["match_ttl"],
+        bot_finder=lambda rank: -1,
+        match_issuer=lambda player_id, opponent_id: None,
+        clock=clock,
+    )
+
+    joined_at, waits = {}, []
+    bot_matches, peak_queued = 0, 0
+    enqueue_seconds, tick_seconds, ticks = 0.0, 0.0, 0
+    players_per_tick = options["arrival_rate"] * options["tick"]
+    arrived, user_id = 0.0, 0
+
+    def record(match):
+        # Only arriving players count towards the waits, the queued ones all wait for their bot timeout.
+        for player_id in (match.player_id,) if match.is_bot else (match.player_id, match.opponent_id):
+            if player_id in joined_at:
+                waits.append(clock.now - joined_at.pop(player_id))
+
+    # Queued players are out of reach of each other and of the arriving players, ranked around 1500.
+    spacing = 2 * (options["max_window"] + options["bucket_size"])
+    first_queued_rank = 5000 + spacing
+    start = time.perf_counter()
+    for index in range(options["queued"]):
+        queue.enqueue(options["players"] + index, first_queued_rank + index * spacing)
+    seed_seconds = time.perf_counter() - start
+
+    while user_id < options["players"] or len(queue):
+        arrived = min(arrived + players_per_tick, options["players"])
+        start = time.perf_counter()
+        while user_id < arrived:
+            joined_at[user_id] = clock.now
+            match = queue.enqueue(user_id, max(0, int(rng.gauss(1500, 400))))
+            if match is not None:
+                record(match)
+            user_id += 1
+        enqueue_seconds += time.perf_counter() - start
+        peak_queued = max(peak_queued, len(queue))
+
+        clock.now += options["tick"]
+        start = time.perf_counter()
+        matches = queue.tick()
+        tick_seconds += time.perf_counter() - start
+        ticks += 1
+        for match in matches:
+            bot_matches += match.is_bot
+            record(match)
+
+    violations = []
+    if peak_queued < options["queued"]:
+        violations.append(f"peak_queued {peak_queued} < {options['queued']} queued players")
+    return {
+        "players": options["players"],
+        "queued": options["queued"],
+        "peak_queued": peak_queued,
+        "bot_matches": bot_matches,
+        "simulated_seconds": round(clock.now, 1),
+        "match_wait_seconds": {name.replace("_ms", "_s"): value / 1000 for name, value in percentiles(waits).items()},
+        "enqueue_us_per_player": round(enqueue_seconds / max(options["players"], 1) * 1_000_000, 2),
+        "enqueue_us_per_queued_player": round(seed_seconds / max(options["queued"], 1) * 1_000_000, 2),
+        "tick_ms": round(tick_seconds / ticks * 1000, 3),
+        "violations": violations,
+    }
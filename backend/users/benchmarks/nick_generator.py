@@ -0,0 +1,57 @@
+import os
+import random
+import timeit
+
+from users.helpers import nick_generator
+
+HELP = "Compare the preloaded nick generator with the previous per-call implementation."
+
+
+def legacy_generate_nick(num_results=5):
+    """Previous implementation which read both word files on every call, kept as the baseline."""
+    directory_path = os.path.dirname(nick_generator.__file__)
+    adjectives, nouns = [], []
+    with open(os.path.join(directory_path, "nick_generator_files", "adjectives.txt"), "r") as file_adjective:
+        with open(os.path.join(directory_path, "nick_generator_files", "nouns.txt"), "r") as file_noun:
+            for line in file_adjective:
+                adjectives.append(line.strip())
+            for line in file_noun:
+                nouns.append(line.strip())
+
+    usernames = []
+    for _ in range(num_results):
+        adjective = random.choice(adjectives)
+        noun = random.choice(nouns).capitalize()
+        num = str(random.randrange(1, 100))
+        usernames.append(adjective + noun + num)
+
+    return usernames
+
+
+def add_arguments(parser):
+    parser.add_argument("--calls", type=int, default=2000, help="Number of calls per measured implementation.")
+    parser.add_argument("--count", type=int, default=5, help="Nicks generated per call.")
+    parser.add_argument("--batch", type=int, default=10000, help="Size of the single batch draw.")
+
+
+def _per_call_microseconds(func, calls):
+    return timeit.timeit(func, number=calls) / calls * 1_000_000
+
+
+def run(options):
+    calls, count, batch = options["calls"], options["count"], options["batch"]
+    nick_generator.load_words()
+
+    legacy = _per_call_microseconds(lambda: legacy_generate_nick(count), calls)
+    preloaded = _per_call_microseconds(lambda: nick_generator.generate_nicks(count), calls)
+    batch_seconds = timeit.timeit(lambda: nick_generator.generate_nicks(batch, seed=0), number=1)
+
+    return {
+        "calls": calls,
+        "count": count,
+        "legacy_us_per_call": round(legacy, 2),
+        "preloaded_us_per_call": round(preloaded, 2),
+        "speedup": round(legacy / preloaded, 1),
+        "batch_size": batch,
+        "batch_ms": round(batch_seconds * 1000, 2),
+    }
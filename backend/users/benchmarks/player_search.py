@@ -0,0 +1,65 @@
+import random
+import time
+
+from django.db import connection
+
+from users.helpers.player_search import player_search_index, search_players
+from users.models import UserProfile
+
+from . import benchmark_database, percentiles, seed_profiles
+
+HELP = "Measure player search latency for prefix, exact and misspelled username queries."
+
+
+def add_arguments(parser):
+    parser.add_argument("--profiles", type=int, default=1_000_000, help="Number of seeded players.")
+    parser.add_argument("--queries", type=int, default=200, help="Measured queries per kind.")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keepdb", action="store_true", help="Reuse the seeded benchmark database.")
+
+
+def _misspell(username, rng):
+    position = rng.randrange(len(username))
+    return username[:position] + username[position:][1:]
+
+
+def run(options):
+    rng = random.Random(options["seed"])
+
+    with benchmark_database(keepdb=options["keepdb"]):
+        if UserProfile.objects.count() < options["profiles"]:
+            seed_profiles(options["profiles"] - UserProfile.objects.count(), nicks=True)
+        usernames = list(
+            UserProfile.objects.filter(is_search_visible=True)
+            .order_by("?")
+            .values_list("user__username", flat=True)[: options["queries"]]
+        )
+
+        player_search_index.reset()
+        start = time.perf_counter()
+        if connection.vendor != "postgresql":
+            # Requests search with a prefix query while this runs in a background thread.
+            player_search_index.build()
+        warmup_seconds = time.perf_counter() - start
+
+        queries = {
+            "prefix": [username[: rng.randint(1, 6)] for username in usernames],
+            "exact": usernames,
+            "misspelled": [_misspell(username, rng) for username in usernames],
+        }
+        results = {}
+        for kind, kind_queries in queries.items():
+            samples, found = [], 0
+            for query in kind_queries:
+                start = time.perf_counter()
+                found += bool(search_players(query, options["limit"]))
+                samples.append(time.perf_counter() - start)
+            results[kind] = {**percentiles(samples), "hit_rate": round(found / len(kind_queries), 3)}
+
+        return {
+            "vendor": connection.vendor,
+            "profiles": UserProfile.objects.count(),
+            "warmup_seconds": round(warmup_seconds, 3),
+            **results,
+        }
@@ -0,0 +1,64 @@
+import time
+import uuid
+
+from django.db import connection
+
+from users.helpers.uuid7 import uuid7
+
+from . import benchmark_database
+
+HELP = "Compare insert throughput and primary key index size of random (v4) and time-ordered (v7) UUID keys."
+
+GENERATORS = {"uuid4": uuid.uuid4, "uuid7": uuid7}
+
+
+def add_arguments(parser):
+    parser.add_argument("--rows", type=int, default=10_000_000, help="Rows inserted per key type.")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+
+
+def _create_table(cursor, table):
+    key_type = "uuid" if connection.vendor == "postgresql" else "char(32)"
+    cursor.execute(f"CREATE TABLE {table} (id {key_type} PRIMARY KEY, created_at timestamp NOT NULL)")
+
+
+def _key_value(key):
+    return key if connection.vendor == "postgresql" else key.hex
+
+
+def _index_size(cursor, table):
+    if connection.vendor == "postgresql":
+        cursor.execute("SELECT pg_relation_size(%s)", [f"{table}_pkey"])
+    elif connection.vendor == "sqlite":
+        cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name LIKE %s", [f"sqlite_autoindex_{table}%"])
+    else:
+        return None
+    return cursor.fetchone()[0]
+
+
+def _insert_rows(cursor, table, generator, rows, batch_size):
+    statement = f"INSERT INTO {table} (id, created_at) VALUES (%s, CURRENT_TIMESTAMP)"
+    start = time.perf_counter()
+    for batch_start in range(0, rows, batch_size):
+        batch = min(batch_size, rows - batch_start)
+        cursor.executemany(statement, [(_key_value(generator()),) for _ in range(batch)])
+    return time.perf_counter() - start
+
+
+def run(options):
+    results = {"vendor": connection.vendor, "rows": options["rows"]}
+
+    with benchmark_database(), connection.cursor() as cursor:
+        for name, generator in GENERATORS.items():
+            table = f"benchmark_{name}"
+            _create_table(cursor, table)
+            seconds = _insert_rows(cursor, table, generator, options["rows"], options["batch_size"])
+            index_size = _index_size(cursor, table)
+            results[name] = {
+                "seconds": round(seconds, 2),
+                "rows_per_second": round(options["rows"] / seconds),
+                "index_bytes": index_size,
+                "index_bytes_per_row": round(index_size / options["rows"], 1) if index_size else None,
+            }
+
+    return results
@@ -0,0 +1,27 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.views import exception_handler as default_exception_handler
+
+from .helpers.metrics import auth_failures
+
+
+class ServiceUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Service temporarily unavailable, try again later."
+    default_code = "service_unavailable"
+
+    def __init__(self, detail=None, code=None, wait=None):
+        super().__init__(detail, code)
+        # DRF exception handler turns ``wait`` into the ``Retry-After`` header.
+        self.wait = wait
+
+
+def exception_handler(exc, context):
+    """DRF's exception handler which also counts failed authentications, including token endpoint ones."""
+    if isinstance(exc, (AuthenticationFailed, NotAuthenticated)):
+        codes = exc.get_codes()
+        # simplejwt's InvalidToken carries the reason in the ``code`` item of a dict detail.
+        reason = codes.get("code", exc.default_code) if isinstance(codes, dict) else codes
+        resolver_match = context["request"].resolver_match
+        auth_failures.inc(view=resolver_match.view_name if resolver_match else "unmatched", reason=reason)
+    return default_exception_handler(exc, context)
@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+
+
+def _last_modified_query(user_id):
+    return get_user_model().objects.filter(pk=user_id).values_list("updated_at", "profile__updated_at")
+
+
+def _latest(row):
+    if row is None:
+        return None
+    return max(timestamp for timestamp in row if timestamp is not None)
+
+
+def user_last_modified(user_id):
+    """Return the later ``updated_at`` of the user and its profile with one query, ``None`` if there is no user."""
+    return _latest(_last_modified_query(user_id).first())
+
+
+async def auser_last_modified(user_id):
+    return _latest(await _last_modified_query(user_id).afirst())
+
+
+def user_etag(user_id, last_modified, representation=""):
+    """Quoted entity tag of a user representation, e.g. the renderer format, as of ``last_modified``."""
+    return f'"user-{user_id}-{int(last_modified.timestamp() * 1_000_000)}-{representation}"'
@@ -0,0 +1,34 @@
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+from ..models import AnonymousUser
+from .uuid7 import uuid7
+
+SALT = "users.guest"
+
+
+def issue_guest_token():
+    """Return a new guest id, its issue time and a signed token carrying both, without touching the database."""
+    guest_id = uuid7()
+    issued_at = timezone.now()
+    token = signing.dumps({"id": str(guest_id), "iat": int(issued_at.timestamp())}, salt=SALT)
+    return guest_id, issued_at, token
+
+
+def read_guest_token(token):
+    """Return the guest id and issue time of ``token``, raise ``signing.BadSignature`` if it is forged or expired."""
+    payload = signing.loads(token, salt=SALT, max_age=settings.GUEST_TOKEN_MAX_AGE)
+    try:
+        return uuid.UUID(payload["id"]), datetime.fromtimestamp(payload["iat"], tz=dt_timezone.utc)
+    except (KeyError, TypeError, ValueError):
+        raise signing.BadSignature("Malformed guest token.")
+
+
+def persist_guest(token):
+    """Store the guest of ``token`` the first time it needs a row. Return the guest and whether it was created."""
+    guest_id, _ = read_guest_token(token)
+    return AnonymousUser.objects.get_or_create(id=guest_id)
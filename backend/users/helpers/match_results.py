@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import MatchResult, UserProfile
+from .rank_table import rank_table
+from .rating import get_rating_formula
+from .response_cache import user_response_cache
+
+
+def _issued_match_key(player_one_id, player_two_id):
+    return "issued_match:{}:{}".format(*sorted((player_one_id, player_two_id)))
+
+
+def issue_match(player_one_id, player_two_id):
+    """Allow one result of a match between the players to be submitted within ``MATCH_RESULT_TIMEOUT`` seconds."""
+    cache, key = caches[settings.ISSUED_MATCH_CACHE], _issued_match_key(player_one_id, player_two_id)
+    if cache.add(key, 1, settings.MATCH_RESULT_TIMEOUT):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The key expired meanwhile.
+        cache.add(key, 1, settings.MATCH_RESULT_TIMEOUT)
+
+
+def claim_issued_match(player_one_id, player_two_id):
+    """Consume an issued match between the players, return ``False`` if there is none left to report."""
+    cache, key = caches[settings.ISSUED_MATCH_CACHE], _issued_match_key(player_one_id, player_two_id)
+    try:
+        remaining = cache.decr(key)
+    except ValueError:
+        return False
+    if remaining < 0:
+        cache.incr(key)
+        return False
+    return True
+
+
+def record_match_result(player_one_id, player_two_id, winner_id=None):
+    """Store the result of a match and update the statistics and ranks of both players in one transaction.
+
+    Profiles are locked in user id order, so concurrent submissions involving the same players cannot deadlock,
+    and the new ranks are computed from the locked rows. The counters are incremented with ``F()`` expressions in
+    the same ``UPDATE`` as the rank, so every player costs one row write. Raises ``UserProfile.DoesNotExist`` when
+    either player has no profile.
+    """
+    score_one = 0.5 if winner_id is None else float(winner_id == player_one_id)
+
+    with transaction.atomic():
+        profiles = {
+            profile.user_id: profile
+            for profile in UserProfile.objects.select_for_update()
+            .filter(user_id__in=[player_one_id, player_two_id])
+            .order_by("user_id")
+            .only("user_id", "rank", "is_bot", "is_rank_visible")
+        }
+        if len(profiles) != 2:
+            raise UserProfile.DoesNotExist("Both players need a profile.")
+        one, two = profiles[player_one_id], profiles[player_two_id]
+
+        new_rank_one, new_rank_two = get_rating_formula().rate(one.rank, two.rank, score_one)
+        now = timezone.now()
+        for profile, new_rank, score in ((one, new_rank_one, score_one), (two, new_rank_two, 1 - score_one)):
+            won, lost = int(score == 1), int(score == 0)
+            UserProfile.objects.filter(pk=profile.pk).update(
+                rank=new_rank,
+                games_played=F("games_played") + 1,
+                games_won=F("games_won") + won,
+                games_lost=F("games_lost") + lost,
+                updated_at=now,
+            )
+
+        result = MatchResult.objects.create(
+            player_one_id=player_one_id,
+            player_two_id=player_two_id,
+            winner_id=winner_id,
+            player_one_rank_change=new_rank_one - one.rank,
+            player_two_rank_change=new_rank_two - two.rank,
+        )
+
+        # ``update()`` sends no signals, so the shared rank table and the response cache are updated here.
+        transaction.on_commit(lambda: user_response_cache.invalidate(player_one_id, player_two_id))
+        for profile, new_rank in ((one, new_rank_one), (two, new_rank_two)):
+            previous_rank = profile.leaderboard_rank
+            profile.rank = new_rank
+            transaction.on_commit(
+                lambda profile=profile, previous_rank=previous_rank: rank_table.update(
+                    profile.user_id, profile.leaderboard_rank, previous_rank
+                )
+            )
+
+    return result
@@ -0,0 +1,232 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Abs
+
+from ..models import UserProfile
+from .match_results import issue_match
+
+Match = namedtuple("Match", ("player_id", "opponent_id", "is_bot", "waited", "matched_at"))
+
+
+class QueuedPlayer:
+    __slots__ = ("user_id", "rank", "bucket", "enqueued_at", "check_id")
+
+    def __init__(self, user_id, rank, bucket, enqueued_at):
+        self.user_id = user_id
+        self.rank = rank
+        self.bucket = bucket
+        self.enqueued_at = enqueued_at
+        self.check_id = None
+
+
+def find_bot_opponent(rank):
+    """Return the user id of the bot profile with the closest rank, ``None`` when there are no bots."""
+    return (
+        UserProfile.objects.filter(is_bot=True)
+        .order_by(Abs(F("rank") - rank))
+        .values_list("user_id", flat=True)
+        .first()
+    )
+
+
+class MatchmakingQueue:
+    """In-process matchmaking queue which pairs players of similar rank, only players queued in one process meet.
+
+    Players wait in rank buckets of ``bucket_size`` ranks, each an insertion ordered dict, so the longest waiting
+    player of a bucket is its first item. The search window starts at ``base_window`` ranks and widens by
+    ``window_growth`` ranks per second of waiting, up to ``max_window``. A heap of the times at which a waiting
+    player's window reaches the next bucket drives :meth:`tick`, so players are only re-checked when a new match
+    becomes possible. After ``bot_timeout`` seconds a player is matched with the bot ``bot_finder`` picks; the lookup
+    runs outside the queue lock. Matches which are not picked up within ``match_ttl`` seconds are dropped. Every new
+    match is passed to ``match_issuer`` after the lock is released, so that its result can be submitted.
+    Enqueue and dequeue cost O(log n) for the heap plus a scan of the buckets inside the window.
+    """
+
+    def __init__(
+        self,
+        bucket_size,
+        base_window,
+        window_growth,
+        max_window,
+        bot_timeout,
+        match_ttl,
+        bot_finder=find_bot_opponent,
+        match_issuer=issue_match,
+        clock=time.monotonic,
+    ):
+        self.bucket_size = bucket_size
+        self.base_window = base_window
+        self.window_growth = window_growth
+        self.max_window = max_window
+        self.bot_timeout = bot_timeout
+        self.match_ttl = match_ttl
+        self.bot_finder = bot_finder
+        self.match_issuer = match_issuer
+        self.clock = clock
+        self._buckets = defaultdict(OrderedDict)
+        self._players = {}
+        self._checks = []
+        self._check_ids = itertools.count()
+        self._matches = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._players)
+
+    def window(self, player, now):
+        return min(self.base_window + self.window_growth * (now - player.enqueued_at), self.max_window)
+
+    def _next_check_at(self, player, now):
+        """Time when the window of ``player`` reaches one more bucket, or its bot timeout if that comes first."""
+        bot_deadline = player.enqueued_at + self.bot_timeout
+        window = self.window(player, now)
+        if window >= self.max_window or not self.window_growth:
+            return bot_deadline
+        next_window = (window // self.bucket_size + 1) * self.bucket_size
+        return min(player.enqueued_at + (next_window - self.base_window) / self.window_growth, bot_deadline)
+
+    def _schedule_check(self, player, check_at):
+        player.check_id = next(self._check_ids)
+        heapq.heappush(self._checks, (check_at, player.check_id, player.user_id))
+
+    def _remove(self, player):
+        del self._players[player.user_id]
+        bucket = self._buckets[player.bucket]
+        del bucket[player.user_id]
+        if not bucket:
+            del self._buckets[player.bucket]
+
+    def _find_opponent(self, player, now):
+        """Return the longest waiting player within the window of ``player``."""
+        reach = int(self.window(player, now) // self.bucket_size)
+        opponent = None
+        for bucket_number in range(player.bucket - reach, player.bucket + reach + 1):
+            bucket = self._buckets.get(bucket_number)
+            if not bucket:
+                continue
+            candidate = next(iter(bucket.values()))
+            if candidate.user_id == player.user_id:
+                if len(bucket) == 1:
+                    continue
+                candidate = list(itertools.islice(bucket.values(), 2))[1]
+            if opponent is None or candidate.enqueued_at < opponent.enqueued_at:
+                opponent = candidate
+        return opponent
+
+    def _record_match(self, player, opponent_id, is_bot, now):
+        match = Match(player.user_id, opponent_id, is_bot, now - player.enqueued_at, now)
+        self._matches.pop(player.user_id, None)
+        self._matches[player.user_id] = match
+        return match
+
+    def _expire_matches(self, now):
+        while self._matches:
+            match = next(iter(self._matches.values()))
+            if now - match.matched_at < self.match_ttl:
+                break
+            self._matches.popitem(last=False)
+
+    def _pair(self, player, opponent, now):
+        self._remove(opponent)
+        self._record_match(opponent, player.user_id, False, now)
+        return self._record_match(player, opponent.user_id, False, now)
+
+    def enqueue(self, user_id, rank):
+        """Queue the player, return a :class:`Match` if an opponent is already waiting within the window."""
+        with self._lock:
+            now = self.clock()
+            self._matches.pop(user_id, None)
+            if user_id in self._players:
+                return None
+
+            player = QueuedPlayer(user_id, rank, rank // self.bucket_size, now)
+            opponent = self._find_opponent(player, now)
+            if opponent is None:
+                self._players[user_id] = player
+                self._buckets[player.bucket][user_id] = player
+                self._schedule_check(player, self._next_check_at(player, now))
+                return None
+            match = self._pair(player, opponent, now)
+        self._issue([match])
+        return match
+
+    def dequeue(self, user_id):
+        """Leave the queue. Stale heap entries of the player are skipped by :meth:`tick`."""
+        with self._lock:
+            player = self._players.get(user_id)
+            if player is None:
+                return False
+            self._remove(player)
+            return True
+
+    def tick(self):
+        """Match players whose window widened or whose bot timeout passed and return the new matches."""
+        matches, waiting_for_bot = [], []
+        with self._lock:
+            now = self.clock()
+            self._expire_matches(now)
+            while self._checks and self._checks[0][0] <= now:
+                _, check_id, user_id = heapq.heappop(self._checks)
+                player = self._players.get(user_id)
+                if player is None or player.check_id != check_id:
+                    continue
+
+                opponent = self._find_opponent(player, now)
+                if opponent is not None:
+                    self._remove(player)
+                    matches.append(self._pair(player, opponent, now))
+                elif now - player.enqueued_at >= self.bot_timeout:
+                    # The player stays queued, and can still be paired, while its bot is looked up.
+                    waiting_for_bot.append(player)
+                else:
+                    self._schedule_check(player, self._next_check_at(player, now))
+        if waiting_for_bot:
+            matches += self._match_bots(waiting_for_bot)
+        self._issue(matches)
+        return matches
+
+    def _issue(self, matches):
+        for match in matches:
+            self.match_issuer(match.player_id, match.opponent_id)
+
+    def _match_bots(self, players):
+        bot_ids = [self.bot_finder(player.rank) for player in players]
+        matches = []
+        with self._lock:
+            now = self.clock()
+            for player, bot_id in zip(players, bot_ids):
+                if self._players.get(player.user_id) is not player:
+                    continue
+                if bot_id is None:
+                    self._schedule_check(player, now + self.bot_timeout)
+                    continue
+                self._remove(player)
+                matches.append(self._record_match(player, bot_id, True, now))
+        return matches
+
+    def status(self, user_id):
+        """Return the :class:`Match` of the player, ``True`` while it waits or ``None`` if it is not queued."""
+        with self._lock:
+            if user_id in self._matches:
+                return self._matches[user_id]
+            return True if user_id in self._players else None
+
+    def pop_match(self, user_id):
+        with self._lock:
+            return self._matches.pop(user_id, None)
+
+
+matchmaking_queue = MatchmakingQueue(
+    bucket_size=settings.MATCHMAKING_BUCKET_SIZE,
+    base_window=settings.MATCHMAKING_BASE_WINDOW,
+    window_growth=settings.MATCHMAKING_WINDOW_GROWTH,
+    max_window=settings.MATCHMAKING_MAX_WINDOW,
+    bot_timeout=settings.MATCHMAKING_BOT_TIMEOUT,
+    match_ttl=settings.MATCHMAKING_MATCH_TTL,
+)
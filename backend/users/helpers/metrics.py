@@ -0,0 +1,336 @@
+import bisect
+import glob
+import json
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import weakref
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+
+from .response_cache import user_response_cache
+
+HEADER = struct.Struct("<8sQ")
+LENGTH = struct.Struct("<I")
+VALUE = struct.Struct("<d")
+MAGIC = b"DMUMETR1"
+INITIAL_SIZE = 64 * 1024
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+POOL_GAUGES = ("pool_min", "pool_max", "pool_size", "pool_available", "requests_waiting")
+POOL_COUNTERS = (
+    "requests_num",
+    "requests_queued",
+    "requests_wait_ms",
+    "requests_errors",
+    "returns_bad",
+    "connections_errors",
+    "connections_lost",
+)
+
+
+class MetricsFile:
+    """Sample values of one process in a memory-mapped file, keyed by JSON encoded ``(sample name, labels)``.
+
+    The file holds a header (magic, bytes in use) followed by entries of a key length, the key padded to 8 bytes
+    and a double. Only the owning process writes it and it publishes a new entry by bumping the bytes in use
+    after writing it, so other processes read the file without locking.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._offsets = {}
+        with open(path, "a+b") as metrics_file:
+            if os.fstat(metrics_file.fileno()).st_size < INITIAL_SIZE:
+                metrics_file.truncate(INITIAL_SIZE)
+            self._mmap = mmap.mmap(metrics_file.fileno(), 0)
+        magic, used = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            used = HEADER.size
+            HEADER.pack_into(self._mmap, 0, MAGIC, used)
+        # A process which got the pid of a dead one carries on with its counters.
+        for key, value_offset, _ in read_entries(self._mmap, used):
+            self._offsets[key] = value_offset
+        self._used = used
+
+    def _grow(self, size):
+        self._mmap.close()
+        with open(self.path, "r+b") as metrics_file:
+            metrics_file.truncate(size)
+            self._mmap = mmap.mmap(metrics_file.fileno(), 0)
+
+    def _offset(self, key):
+        offset = self._offsets.get(key)
+        if offset is None:
+            encoded = key.encode()
+            padded = len(encoded) + (-(LENGTH.size + len(encoded)) % 8)
+            end = self._used + LENGTH.size + padded + VALUE.size
+            if end > len(self._mmap):
+                self._grow(max(len(self._mmap) * 2, end))
+            start = self._used + LENGTH.size
+            stop = start + len(encoded)
+            LENGTH.pack_into(self._mmap, self._used, len(encoded))
+            self._mmap[start:stop] = encoded
+            offset = self._used + LENGTH.size + padded
+            VALUE.pack_into(self._mmap, offset, 0.0)
+            self._used = end
+            HEADER.pack_into(self._mmap, 0, MAGIC, end)
+            self._offsets[key] = offset
+        return offset
+
+    def add(self, key, amount):
+        offset = self._offset(key)
+        VALUE.pack_into(self._mmap, offset, VALUE.unpack_from(self._mmap, offset)[0] + amount)
+
+    def set(self, key, value):
+        VALUE.pack_into(self._mmap, self._offset(key), value)
+
+
+def read_entries(data, used):
+    """Yield ``(key, value offset, value)`` of the entries in the first ``used`` bytes of a metrics file."""
+    position = HEADER.size
+    while position + LENGTH.size <= used:
+        (length,) = LENGTH.unpack_from(data, position)
+        padded = length + (-(LENGTH.size + length) % 8)
+        offset = position + LENGTH.size + padded
+        if offset + VALUE.size > used:
+            return
+        start = position + LENGTH.size
+        stop = start + length
+        key = bytes(data[start:stop]).decode()
+        yield key, offset, VALUE.unpack_from(data, offset)[0]
+        position = offset + VALUE.size
+
+
+def process_is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MetricsStore:
+    """Metrics of all worker processes on a host, one :class:`MetricsFile` per process in ``directory``.
+
+    A scrape sums the files of all processes. Files of exited workers are kept, so counters do not drop when a
+    worker is restarted, while gauges only count live processes. Clear the directory when the whole server is
+    restarted. Disabled stores, see ``METRICS_ENABLED``, ignore all writes.
+    """
+
+    def __init__(self, directory, enabled=True):
+        self.directory = directory
+        self.enabled = enabled
+        self._file = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _process_file(self):
+        # Forked workers must not write the file of the process they were forked from.
+        if self._pid != os.getpid():
+            os.makedirs(self.directory, exist_ok=True)
+            self._pid = os.getpid()
+            self._file = MetricsFile(os.path.join(self.directory, f"metrics_{self._pid}.db"))
+        return self._file
+
+    def add(self, key, amount):
+        if self.enabled:
+            with self._lock:
+                self._process_file().add(key, amount)
+
+    def set(self, key, value):
+        if self.enabled:
+            with self._lock:
+                self._process_file().set(key, value)
+
+    def read(self, gauges):
+        """Return ``{key: value}`` summed over all processes, for ``gauges`` only over live ones."""
+        values = defaultdict(float)
+        for path in glob.glob(os.path.join(self.directory, "metrics_*.db")):
+            pid = int(os.path.basename(path).removeprefix("metrics_").removesuffix(".db"))
+            alive = pid == os.getpid() or process_is_alive(pid)
+            try:
+                with open(path, "rb") as metrics_file:
+                    data = metrics_file.read()
+            except FileNotFoundError:
+                continue
+            if len(data) < HEADER.size or data[:8] != MAGIC:
+                continue
+            for key, _, value in read_entries(data, HEADER.unpack_from(data)[1]):
+                if alive or json.loads(key)[0] not in gauges:
+                    values[key] += value
+        return values
+
+    def reset(self):
+        for path in glob.glob(os.path.join(self.directory, "metrics_*.db")):
+            os.unlink(path)
+        self._file, self._pid = None, None
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        registry.append(self)
+
+    def key(self, sample_name, labels):
+        return json.dumps([sample_name, [str(labels[name]) for name in self.labelnames]])
+
+    def set(self, value, **labels):
+        """Store the process' current value, also for counters kept elsewhere, e.g. by the game stats buffer."""
+        metrics_store.set(self.key(self.name, labels), value)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        metrics_store.add(self.key(self.name, labels), amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = [*buckets, math.inf]
+
+    def observe(self, value, **labels):
+        # Each bucket counts only its own observations, they are accumulated when rendered.
+        bucket = self.buckets[bisect.bisect_left(self.buckets, value)]
+        metrics_store.add(self.key(f"{self.name}_bucket", {**labels, "le": bucket}), 1)
+        metrics_store.add(self.key(f"{self.name}_sum", labels), value)
+        metrics_store.add(self.key(f"{self.name}_count", labels), 1)
+
+    def key(self, sample_name, labels):
+        if sample_name.endswith("_bucket"):
+            return json.dumps([sample_name, [*(str(labels[name]) for name in self.labelnames), labels["le"]]])
+        return super().key(sample_name, labels)
+
+
+def default_metrics_directory():
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "devmeup_metrics")
+
+
+registry = []
+metrics_store = MetricsStore(settings.METRICS_DIRECTORY or default_metrics_directory(), settings.METRICS_ENABLED)
+
+http_request_duration = Histogram(
+    "devmeup_http_request_duration_seconds", "Request latency by URL name.", ("view", "method")
+)
+http_responses = Counter("devmeup_http_responses_total", "Responses by URL name and status code.", ("view", "status"))
+auth_failures = Counter(
+    "devmeup_auth_failures_total", "Failed authentications and JWT validations by reason.", ("view", "reason")
+)
+db_connections_opened = Counter("devmeup_db_connections_opened_total", "Database connections opened.", ("alias",))
+db_connections_open = Gauge("devmeup_db_connections_open", "Open database connections.", ("alias",))
+db_pool = Gauge(
+    "devmeup_db_pool", "Connections and waiting requests of the psycopg pools, see DB_POOL.", ("alias", "stat")
+)
+db_pool_counters = Counter(
+    "devmeup_db_pool_total", "Requests, waits and connection errors of the psycopg pools.", ("alias", "stat")
+)
+response_cache_counters = Counter(
+    "devmeup_user_response_cache_total", "Lookups and invalidations of the user detail response cache.", ("counter",)
+)
+
+# Database wrappers are thread local, so open connections are counted over every wrapper which ever connected.
+database_wrappers = weakref.WeakSet()
+_last_collected = 0
+
+
+def track_database_connection(connection):
+    database_wrappers.add(connection)
+    db_connections_opened.inc(alias=connection.alias)
+
+
+def collect_pool_metrics(alias, stats):
+    # Pools leave out the counters which are still zero.
+    for stat in POOL_GAUGES:
+        db_pool.set(stats.get(stat, 0), alias=alias, stat=stat)
+    for stat in POOL_COUNTERS:
+        db_pool_counters.set(stats.get(stat, 0), alias=alias, stat=stat)
+
+
+def collect_process_metrics(force=False):
+    """Copy values kept by other components of this process to the store, at most every ``METRICS_COLLECT_SECONDS``."""
+    global _last_collected
+    if not metrics_store.enabled or (
+        not force and time.monotonic() - _last_collected < settings.METRICS_COLLECT_SECONDS
+    ):
+        return
+    _last_collected = time.monotonic()
+
+    open_connections = defaultdict(int)
+    for wrapper in list(database_wrappers):
+        open_connections[wrapper.alias] += wrapper.connection is not None
+    for alias in settings.DATABASES:
+        db_connections_open.set(open_connections[alias], alias=alias)
+        if hasattr(connections[alias], "pool_stats"):
+            collect_pool_metrics(alias, connections[alias].pool_stats())
+
+    for counter, value in user_response_cache.metrics().items():
+        if counter != "hit_ratio":
+            response_cache_counters.set(value, counter=counter)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _format_labels(labelnames, values):
+    if not labelnames:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labelnames, escaped)) + "}"
+
+
+def render_metrics():
+    """Return the metrics of all processes in the Prometheus text exposition format."""
+    collect_process_metrics(force=True)
+    values = metrics_store.read(gauges={metric.name for metric in registry if metric.kind == "gauge"})
+    samples = defaultdict(dict)
+    for key, value in values.items():
+        sample_name, label_values = json.loads(key)
+        samples[sample_name][tuple(label_values)] = value
+
+    lines = []
+    for metric in registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if metric.kind != "histogram":
+            for label_values, value in sorted(samples[metric.name].items()):
+                lines.append(f"{metric.name}{_format_labels(metric.labelnames, label_values)} {_format_value(value)}")
+            continue
+
+        bucket_counts = defaultdict(dict)
+        for (*label_values, le), count in samples[f"{metric.name}_bucket"].items():
+            bucket_counts[tuple(label_values)][float(le)] = count
+        labelnames = (*metric.labelnames, "le")
+        for label_values in sorted(samples[f"{metric.name}_count"]):
+            cumulative = 0
+            for bucket in metric.buckets:
+                cumulative += bucket_counts[label_values].get(bucket, 0)
+                labels = _format_labels(labelnames, (*label_values, _format_value(bucket)))
+                lines.append(f"{metric.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(metric.labelnames, label_values)
+            lines.append(f"{metric.name}_sum{labels} {_format_value(samples[f'{metric.name}_sum'][label_values])}")
+            lines.append(f"{metric.name}_count{labels} {_format_value(samples[f'{metric.name}_count'][label_values])}")
+    return "\n".join(lines) + "\n"
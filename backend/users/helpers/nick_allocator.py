@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+
+from .bloom_filter import BloomFilter
+from .nick_generator import generate_nicks
+
+logger = logging.getLogger(__name__)
+
+
+class NicksExhausted(Exception):
+    pass
+
+
+class NickAllocator:
+    """Hands out nicks which are not used as a username yet.
+
+    Candidates are checked against a per-process Bloom filter of existing usernames and only the filter hits,
+    which are either taken or false positives, are verified in the database with a single query.
+    The filter is rebuilt every ``NICK_FILTER_REBUILD_SECONDS`` to pick up users created by other processes.
+    Building it scans all usernames, so it happens in a background thread and the new filter replaces the old
+    one once complete; until the first one is ready all candidates are verified in the database.
+    """
+
+    MIN_CAPACITY = 1024
+    MAX_ATTEMPTS = 5
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._built_at = 0.0
+        self._builder = None
+        self._added_while_building = []
+
+    def _build_filter(self):
+        usernames = get_user_model().objects.values_list("username", flat=True)
+        bloom_filter = BloomFilter(capacity=max(self.MIN_CAPACITY, usernames.count() * 2))
+        for username in usernames.iterator(chunk_size=10000):
+            bloom_filter.add(username)
+        return bloom_filter
+
+    def _is_stale(self):
+        expired = time.monotonic() - self._built_at > settings.NICK_FILTER_REBUILD_SECONDS
+        return self._filter is None or expired or self._filter.is_full()
+
+    def _rebuild(self):
+        try:
+            bloom_filter = self._build_filter()
+        except Exception:
+            bloom_filter = None
+            logger.exception("Rebuilding the nick filter failed.")
+        finally:
+            connections.close_all()
+
+        with self._lock:
+            if bloom_filter is not None:
+                # Usernames registered while the usernames were read may be missing from the scan.
+                for username in self._added_while_building:
+                    bloom_filter.add(username)
+                self._filter = bloom_filter
+            self._built_at = time.monotonic()
+            self._added_while_building = []
+            self._builder = None
+
+    def _get_filter(self):
+        """Return the current filter, ``None`` before the first build, and start a rebuild when one is due."""
+        with self._lock:
+            if self._is_stale() and self._builder is None:
+                self._builder = threading.Thread(target=self._rebuild, name="nick-filter-builder", daemon=True)
+                self._builder.start()
+            return self._filter
+
+    def add(self, username):
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(username)
+            if self._builder is not None:
+                self._added_while_building.append(username)
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+
+    def _candidates(self, nicks, count, bloom_filter):
+        """Return new candidates and those of them which may be taken and have to be checked in the database."""
+        candidates = [nick for nick in dict.fromkeys(generate_nicks(count * 2)) if nick not in nicks]
+        if bloom_filter is None:
+            return candidates, candidates
+        return candidates, [nick for nick in candidates if nick in bloom_filter]
+
+    @staticmethod
+    def _enough(nicks, count):
+        if len(nicks) < count:
+            raise NicksExhausted(
+                f"Found only {len(nicks)} of {count} unused nicks in {NickAllocator.MAX_ATTEMPTS} attempts."
+            )
+        return nicks[:count]
+
+    def allocate(self, count):
+        """Return ``count`` unused nicks, raise :class:`NicksExhausted` when too many candidates were taken."""
+        bloom_filter = self._get_filter()
+        nicks = []
+
+        for _ in range(self.MAX_ATTEMPTS):
+            candidates, maybe_taken = self._candidates(nicks, count, bloom_filter)
+            taken = set()
+            if maybe_taken:
+                taken = set(
+                    get_user_model().objects.filter(username__in=maybe_taken).values_list("username", flat=True)
+                )
+            nicks.extend(nick for nick in candidates if nick not in taken)
+            if len(nicks) >= count:
+                break
+
+        return self._enough(nicks, count)
+
+    async def aallocate(self, count):
+        """:meth:`allocate` for async views."""
+        bloom_filter = self._get_filter()
+        nicks = []
+
+        for _ in range(self.MAX_ATTEMPTS):
+            candidates, maybe_taken = self._candidates(nicks, count, bloom_filter)
+            taken = set()
+            if maybe_taken:
+                usernames = get_user_model().objects.filter(username__in=maybe_taken).values_list("username", flat=True)
+                taken = {username async for username in usernames}
+            nicks.extend(nick for nick in candidates if nick not in taken)
+            if len(nicks) >= count:
+                break
+
+        return self._enough(nicks, count)
+
+
+nick_allocator = NickAllocator()
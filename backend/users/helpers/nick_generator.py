@@ -1,26 +1,38 @@
 import os
 import random
+from functools import lru_cache
+
+WORDS_DIRECTORY = os.path.join(os.path.dirname(__file__), "nick_generator_files")
+NICK_NUMBERS = range(1, 100)
+
+
+def _read_words(file_name):
+    with open(os.path.join(WORDS_DIRECTORY, file_name), "r") as words_file:
+        return [line.strip() for line in words_file if line.strip()]
+
+
+@lru_cache(maxsize=None)
+def load_words():
+    """Read the word lists once per process and keep them as immutable tuples."""
+    adjectives = tuple(_read_words("adjectives.txt"))
+    nouns = tuple(noun.capitalize() for noun in _read_words("nouns.txt"))
+    return adjectives, nouns
+
+
+def generate_nicks(count, seed=None):
+    """Draw ``count`` nick candidates at once. Passing ``seed`` makes the draw reproducible."""
+    adjectives, nouns = load_words()
+    rng = random.Random(seed) if seed is not None else random
+
+    return [
+        f"{adjective}{noun}{num}"
+        for adjective, noun, num in zip(
+            rng.choices(adjectives, k=count),
+            rng.choices(nouns, k=count),
+            rng.choices(NICK_NUMBERS, k=count),
+        )
+    ]
 
 
 def generate_nick(num_results=5):
-    directory_path = os.path.dirname(__file__)
-    adjectives, nouns = [], []
-    with open(
-        os.path.join(directory_path, "nick_generator_files", "adjectives.txt"), "r"
-    ) as file_adjective:
-        with open(
-            os.path.join(directory_path, "nick_generator_files", "nouns.txt"), "r"
-        ) as file_noun:
-            for line in file_adjective:
-                adjectives.append(line.strip())
-            for line in file_noun:
-                nouns.append(line.strip())
-
-    usernames = []
-    for _ in range(num_results):
-        adjective = random.choice(adjectives)
-        noun = random.choice(nouns).capitalize()
-        num = str(random.randrange(1, 100))
-        usernames.append(adjective + noun + num)
-
-    return usernames
+    return generate_nicks(num_results)
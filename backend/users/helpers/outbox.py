@@ -0,0 +1,91 @@
+from contextlib import suppress
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import OutboxEmail
+
+
+def enqueue_mail(subject, message, from_email, recipient):
+    """Store the email in the outbox. Call it inside the transaction which makes the email necessary."""
+    return OutboxEmail.objects.create(subject=subject, message=message, from_email=from_email, recipient=recipient)
+
+
+async def aenqueue_mail(subject, message, from_email, recipient):
+    return await OutboxEmail.objects.acreate(
+        subject=subject, message=message, from_email=from_email, recipient=recipient
+    )
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1))
+
+
+def _send(connection, email):
+    # Opening an already opened connection is a no-op, so a connection closed after an error is reopened here.
+    connection.open()
+    EmailMessage(
+        subject=email.subject,
+        body=email.message,
+        from_email=email.from_email,
+        to=[email.recipient],
+        connection=connection,
+    ).send()
+
+
+def _claim(batch_size):
+    """Lease a batch of due emails to this worker and count the attempt, in a transaction of its own."""
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.Status.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+            attempts=F("attempts") + 1, next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+        )
+    for email in emails:
+        email.attempts += 1
+    return emails
+
+
+def _record(email, **fields):
+    # A worker whose lease ran out must not overwrite the result of the worker which claimed the email next.
+    OutboxEmail.objects.filter(pk=email.pk, attempts=email.attempts).update(**fields)
+
+
+def drain_outbox(connection=None, batch_size=None, max_attempts=None):
+    """Send one batch of due outbox emails over ``connection`` and return the number of sent and failed emails.
+
+    The batch is claimed in a short transaction which locks rows with ``SKIP LOCKED`` where the database supports
+    it and leases them for ``EMAIL_OUTBOX_LEASE_SECONDS``, so several workers can drain the outbox. Emails are sent
+    outside of any transaction and every result is stored on its own, so a slow server holds no locks and a worker
+    dying halfway keeps the emails it sent marked as sent; the rest of its batch is retried once the lease ends.
+    Failed emails are retried with exponential backoff until ``max_attempts`` is reached.
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    max_attempts = max_attempts or settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+    connection = connection or get_connection()
+    sent, failed = 0, 0
+
+    for email in _claim(batch_size):
+        try:
+            _send(connection, email)
+        except Exception as error:
+            with suppress(Exception):
+                connection.close()
+            failed += 1
+            if email.attempts >= max_attempts:
+                _record(email, status=OutboxEmail.Status.FAILED, last_error=repr(error))
+            else:
+                _record(email, next_attempt_at=timezone.now() + _retry_delay(email.attempts), last_error=repr(error))
+        else:
+            sent += 1
+            _record(email, status=OutboxEmail.Status.SENT, sent_at=timezone.now())
+
+    return sent, failed
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+from .user_import import init_hashing_worker
+
+
+class PasswordPoolSaturated(Exception):
+    pass
+
+
+def verify_password(password, encoded):
+    """Check ``password`` against ``encoded`` and return the re-hashed password if the hasher parameters changed."""
+    rehashed = None
+
+    def setter(raw_password):
+        nonlocal rehashed
+        rehashed = make_password(raw_password)
+
+    return check_password(password, encoded, setter), rehashed
+
+
+class PasswordCheckPool:
+    """Process pool for password hashing with a bounded number of checks in flight.
+
+    A check is rejected with :class:`PasswordPoolSaturated` straight away instead of queueing when
+    ``LOGIN_POOL_WORKERS + LOGIN_POOL_QUEUE_SIZE`` checks are already running or waiting.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(settings.LOGIN_POOL_WORKERS + settings.LOGIN_POOL_QUEUE_SIZE)
+
+    def _get_executor(self):
+        with self._lock:
+            # A pool created before the server forked its workers is unusable in the children.
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=settings.LOGIN_POOL_WORKERS,
+                    initializer=init_hashing_worker,
+                    initargs=(os.environ["DJANGO_SETTINGS_MODULE"],),
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _submit(self, function, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordPoolSaturated()
+        try:
+            future = self._get_executor().submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def verify(self, password, encoded):
+        return self._submit(verify_password, password, encoded).result(timeout=settings.LOGIN_POOL_TIMEOUT)
+
+    def hash(self, password):
+        return self._submit(make_password, password).result(timeout=settings.LOGIN_POOL_TIMEOUT)
+
+    async def averify(self, password, encoded):
+        future = asyncio.wrap_future(self._submit(verify_password, password, encoded))
+        return await asyncio.wait_for(future, settings.LOGIN_POOL_TIMEOUT)
+
+    async def ahash(self, password):
+        future = asyncio.wrap_future(self._submit(make_password, password))
+        return await asyncio.wait_for(future, settings.LOGIN_POOL_TIMEOUT)
+
+
+password_pool = PasswordCheckPool()
@@ -0,0 +1,245 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.db.models.functions import Collate, Upper
+
+logger = logging.getLogger(__name__)
+
+FUZZY_MIN_LENGTH = 3
+TERMINAL = None
+
+
+class UsernameTrie:
+    """Trie of lower-cased usernames for prefix and edit distance lookups.
+
+    Every node is a dict of child nodes keyed by character; the ids of users whose username ends at a node are
+    kept under the ``None`` key. Usernames of the indexed users are kept in ``usernames`` to return and remove them.
+    """
+
+    def __init__(self):
+        self.root = {}
+        self.usernames = {}
+
+    def __len__(self):
+        return len(self.usernames)
+
+    def _node(self, key):
+        node = self.root
+        for character in key:
+            node = node.get(character)
+            if node is None:
+                return None
+        return node
+
+    def add(self, user_id, username):
+        self.remove(user_id)
+        node = self.root
+        for character in username.lower():
+            node = node.setdefault(character, {})
+        node.setdefault(TERMINAL, []).append(user_id)
+        self.usernames[user_id] = username
+
+    def remove(self, user_id):
+        username = self.usernames.pop(user_id, None)
+        if username is not None:
+            self._node(username.lower())[TERMINAL].remove(user_id)
+
+    def prefix(self, query, limit):
+        """Return up to ``limit`` ``(user_id, username)`` pairs starting with ``query`` in alphabetical order."""
+        node = self._node(query.lower())
+        results = []
+        stack = [node] if node is not None else []
+        while stack and len(results) < limit:
+            node = stack.pop()
+            results.extend((user_id, self.usernames[user_id]) for user_id in node.get(TERMINAL, ()))
+            stack.extend(node[character] for character in sorted(filter(None, node), reverse=True))
+        return results[:limit]
+
+    def fuzzy(self, query, max_distance, limit):
+        """Return up to ``limit`` pairs whose username is within ``max_distance`` edits of ``query``, closest first.
+
+        Walks the trie computing one Levenshtein row per node and skips subtrees whose row minimum exceeds
+        ``max_distance``, so only a thin slice of the trie is visited.
+        """
+        query = query.lower()
+        matches = []
+        stack = [(self.root, list(range(len(query) + 1)))]
+        while stack:
+            node, row = stack.pop()
+            for character, child in node.items():
+                if character is TERMINAL:
+                    if row[-1] <= max_distance:
+                        matches.extend((row[-1], self.usernames[user_id], user_id) for user_id in child)
+                    continue
+                next_row = [row[0] + 1]
+                for i, query_character in enumerate(query, start=1):
+                    next_row.append(min(next_row[i - 1] + 1, row[i] + 1, row[i - 1] + (query_character != character)))
+                if min(next_row) <= max_distance:
+                    stack.append((child, next_row))
+        matches.sort()
+        return [(user_id, username) for _, username, user_id in matches[:limit]]
+
+
+class PlayerSearchIndex:
+    """Per-process username trie of active, search-visible players, used when the database is not PostgreSQL.
+
+    The trie is rebuilt every ``PLAYER_SEARCH_REBUILD_SECONDS`` to pick up changes made by other processes; changes
+    made in this process are applied right away by the ``users`` signals. Building it scans all searchable users,
+    so it happens in a background thread and the new trie replaces the old one once complete; until the first one
+    is ready searches fall back to a prefix query. Users changed while the scan runs are read again before the swap.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._trie = None
+        self._built_at = 0.0
+        self._builder = None
+        self._changed_while_building = set()
+
+    def _build_trie(self):
+        trie = UsernameTrie()
+        players = _searchable_users().values_list("id", "username")
+        for user_id, username in players.iterator(chunk_size=10000):
+            trie.add(user_id, username)
+        return trie
+
+    @staticmethod
+    def _refresh(trie, user_ids):
+        searchable = dict(_searchable_users().filter(id__in=user_ids).values_list("id", "username"))
+        for user_id in user_ids:
+            if user_id in searchable:
+                trie.add(user_id, searchable[user_id])
+            else:
+                trie.remove(user_id)
+
+    def build(self):
+        """Scan the searchable users into a new trie and swap it in, in the calling thread."""
+        trie = self._build_trie()
+        while True:
+            with self._lock:
+                changed, self._changed_while_building = self._changed_while_building, set()
+                if not changed:
+                    self._trie = trie
+                    self._built_at = time.monotonic()
+                    return
+            # The scan may have read these rows before their change was committed.
+            self._refresh(trie, changed)
+
+    def _rebuild(self):
+        try:
+            self.build()
+        except Exception:
+            logger.exception("Rebuilding the player search index failed.")
+            with self._lock:
+                self._built_at = time.monotonic()
+        finally:
+            connections.close_all()
+            with self._lock:
+                self._builder = None
+                self._changed_while_building = set()
+
+    def _get_trie(self):
+        """Return the current trie, ``None`` before the first build, and start a rebuild when one is due."""
+        with self._lock:
+            expired = time.monotonic() - self._built_at > settings.PLAYER_SEARCH_REBUILD_SECONDS
+            if (self._trie is None or expired) and self._builder is None:
+                self._builder = threading.Thread(target=self._rebuild, name="player-search-builder", daemon=True)
+                self._builder.start()
+            return self._trie
+
+    def search(self, query, limit):
+        trie = self._get_trie()
+        if trie is None:
+            users = filter_username_prefix(_searchable_users(), query).order_by("username")
+            return list(users.values_list("id", "username")[:limit])
+        with self._lock:
+            results = trie.prefix(query, limit)
+            if len(results) < limit and len(query) >= FUZZY_MIN_LENGTH:
+                found = {user_id for user_id, _ in results}
+                fuzzy = trie.fuzzy(query, 1, limit + len(found))
+                results.extend(result for result in fuzzy if result[0] not in found)
+            return results[:limit]
+
+    def update(self, user_id, username, is_searchable):
+        with self._lock:
+            if self._trie is None:
+                return
+            if is_searchable:
+                self._trie.add(user_id, username)
+            else:
+                self._trie.remove(user_id)
+
+    def is_building(self):
+        with self._lock:
+            return self._builder is not None
+
+    def changed(self, user_id):
+        """Read ``user_id`` again if a build was scanning when its change committed, the scan may have missed it."""
+        with self._lock:
+            if self._builder is not None:
+                self._changed_while_building.add(user_id)
+                return
+            if self._trie is None:
+                return
+        # The build finished before the change committed and the signals saw no trie to update yet.
+        username = _searchable_users().filter(id=user_id).values_list("username", flat=True).first()
+        self.update(user_id, username, username is not None)
+
+    def is_built(self):
+        with self._lock:
+            return self._trie is not None
+
+    def contains(self, user_id):
+        with self._lock:
+            return self._trie is not None and user_id in self._trie.usernames
+
+    def reset(self):
+        with self._lock:
+            self._trie = None
+
+
+player_search_index = PlayerSearchIndex()
+
+
+def _searchable_users():
+    return get_user_model().objects.filter(is_active=True, profile__is_search_visible=True)
+
+
+def filter_username_prefix(queryset, prefix, field="username"):
+    """Keep rows whose ``field`` starts with ``prefix`` in any case, using the username prefix index on PostgreSQL."""
+    if connections[queryset.db].vendor != "postgresql":
+        return queryset.filter(**{f"{field}__istartswith": prefix})
+    return queryset.alias(search_name=Collate(Upper(field), "C")).filter(search_name__startswith=prefix.upper())
+
+
+def _search_postgresql(query, limit):
+    """Prefix matches from the ``C`` collated ``UPPER(username)`` index, then trigram matches from the GIN index."""
+    from django.contrib.postgres.search import TrigramSimilarity
+
+    users = _searchable_users()
+    results = list(filter_username_prefix(users, query).order_by("search_name").values_list("id", "username")[:limit])
+    if len(results) < limit and len(query) >= FUZZY_MIN_LENGTH:
+        results.extend(
+            users.alias(search_name=Upper("username"))
+            .filter(search_name__trigram_similar=query.upper())
+            .exclude(id__in=[user_id for user_id, _ in results])
+            .annotate(similarity=TrigramSimilarity("search_name", query.upper()))
+            .order_by("-similarity", "username")
+            .values_list("id", "username")[: limit - len(results)]
+        )
+    return results
+
+
+def search_players(query, limit):
+    """Return up to ``limit`` ``(user_id, username)`` pairs of active, search-visible players matching ``query``.
+
+    Usernames starting with ``query`` come first, then similar ones: trigram matches on PostgreSQL and usernames
+    one edit away in the in-process ``player_search_index`` on other databases.
+    """
+    if connection.vendor == "postgresql":
+        return _search_postgresql(query, limit)
+    return player_search_index.search(query, limit)
@@ -0,0 +1,169 @@
+import atexit
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections
+from django.db.models import Case, Q, Value, When
+
+from ..models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+WORKERS_KEY = "presence_workers"
+
+
+class PresenceTracker:
+    """Keeps the last heartbeat time of every online user in memory and writes ``is_online`` behind.
+
+    Users are kept in heartbeat order, so expired ones are dropped from the front and the online count is
+    the length of the mapping. A daemon thread flushes changes every ``PRESENCE_FLUSH_INTERVAL`` seconds with
+    one ``UPDATE`` which only touches rows whose ``is_online`` value differs from the tracked state.
+
+    Every heartbeat is also stored in the shared ``PRESENCE_CACHE`` with the id of the worker which received it.
+    A worker only marks a user offline when no other worker received a heartbeat of the user since, so users
+    whose heartbeats move between workers are not flipped offline. Every flush also publishes the number of users
+    whose last heartbeat this worker received and registers the worker in the cache, so the online count is the
+    sum over all live workers, at most one flush interval old. Counts of workers which stopped flushing expire.
+    """
+
+    def __init__(self, timeout, flush_interval, cache_alias):
+        self.timeout = timeout
+        self.flush_interval = flush_interval
+        self.cache_alias = cache_alias
+        self._last_seen = OrderedDict()
+        self._flushed_online = set()
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def _expire(self, now):
+        while self._last_seen:
+            user_id, last_seen = next(iter(self._last_seen.items()))
+            if now - last_seen <= self.timeout:
+                break
+            self._last_seen.popitem(last=False)
+
+    def heartbeat(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            self._last_seen[user_id] = now
+            self._last_seen.move_to_end(user_id)
+            self._expire(now)
+            self._start_flusher()
+        self.cache.set(self._key(user_id), self.worker_id, self.timeout)
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @property
+    def worker_id(self):
+        # Read on every call, the tracker is created before the server forks its workers.
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    @staticmethod
+    def _key(user_id):
+        return f"presence:{user_id}"
+
+    @staticmethod
+    def _count_key(worker_id):
+        return f"presence_count:{worker_id}"
+
+    def _seen_elsewhere(self, user_ids):
+        """Return the users whose last heartbeat was received by another worker and has not expired."""
+        if not user_ids:
+            return set()
+        last_seen_by = self.cache.get_many([self._key(user_id) for user_id in user_ids])
+        worker_id = self.worker_id
+        return {user_id for user_id in user_ids if last_seen_by.get(self._key(user_id), worker_id) != worker_id}
+
+    def online_count(self):
+        """Return the number of online users over all workers, as published by their last flush."""
+        workers = self.cache.get(WORKERS_KEY, [])
+        return sum(self.cache.get_many([self._count_key(worker_id) for worker_id in workers]).values())
+
+    def _publish(self, online):
+        worker_id = self.worker_id
+        count = len(online) - len(self._seen_elsewhere(online))
+        self.cache.set(self._count_key(worker_id), count, 3 * self.flush_interval)
+        # Workers register themselves and drop those whose count expired. The cache has no compare-and-set, so a
+        # registration lost to a concurrent one is repeated by the next flush.
+        workers = self.cache.get(WORKERS_KEY, [])
+        published = self.cache.get_many([self._count_key(worker) for worker in workers])
+        live_workers = [worker for worker in workers if self._count_key(worker) in published]
+        if worker_id not in live_workers:
+            live_workers.append(worker_id)
+        if live_workers != workers:
+            self.cache.set(WORKERS_KEY, live_workers, None)
+
+    def is_online(self, user_id):
+        with self._lock:
+            self._expire(time.monotonic())
+            return user_id in self._last_seen
+
+    def flush(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            online = set(self._last_seen)
+            went_offline = self._flushed_online - online
+            self._flushed_online = online
+        written = self._write(online, went_offline)
+        self._publish(online)
+        return written
+
+    def _write(self, online, went_offline):
+        try:
+            # Users who moved to another worker are written by that worker from now on.
+            went_offline -= self._seen_elsewhere(went_offline)
+            if not online and not went_offline:
+                return 0
+            # ``is_online`` is not part of any user representation, so ``updated_at`` stays untouched.
+            return UserProfile.objects.filter(
+                Q(user_id__in=online, is_online=False) | Q(user_id__in=went_offline, is_online=True)
+            ).update(is_online=Case(When(user_id__in=online, then=Value(True)), default=Value(False)))
+        except Exception:
+            with self._lock:
+                self._flushed_online |= went_offline
+            raise
+
+    def clear(self):
+        with self._lock:
+            self._last_seen.clear()
+
+    def _start_flusher(self):
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_periodically, name="presence-flusher", daemon=True)
+            self._flusher.start()
+            atexit.register(self._flush_on_exit)
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing online presence failed.")
+            finally:
+                close_old_connections()
+
+    def _flush_on_exit(self):
+        """Mark the users of this worker offline, but not those whose heartbeats went to other workers since."""
+        with self._lock:
+            self._last_seen.clear()
+            went_offline = self._flushed_online
+            self._flushed_online = set()
+        self.cache.delete(self._count_key(self.worker_id))
+        self._write(set(), went_offline)
+
+
+presence_tracker = PresenceTracker(
+    timeout=settings.PRESENCE_TIMEOUT,
+    flush_interval=settings.PRESENCE_FLUSH_INTERVAL,
+    cache_alias=settings.PRESENCE_CACHE,
+)
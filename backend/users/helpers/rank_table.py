@@ -0,0 +1,259 @@
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct("<8sQQQ")
+ENTRY = struct.Struct("<qq")
+MAGIC = b"DMURANK1"
+MIN_CAPACITY = 1024
+READ_RETRIES = 10000
+
+
+class RankTable:
+    """Leaderboard kept in a memory-mapped file which all worker processes on a host share.
+
+    The file holds a header (magic, sequence, count, capacity) followed by ``capacity`` ``(rank, user_id)`` pairs
+    of which the first ``count`` are in use, sorted by rank descending and user id descending.
+    Writers serialize on a ``flock`` of a sidecar lock file and bump the sequence number before and after every
+    change, so readers retry a read which overlapped a write (a seqlock) instead of taking the lock.
+    A table which runs out of capacity is copied to a bigger file that atomically replaces the old one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._mmap = None
+        self._inode = None
+
+    # File handling
+
+    def _write_file(self, entries, capacity):
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as table_file:
+            table_file.write(HEADER.pack(MAGIC, 0, len(entries), capacity))
+            table_file.write(b"".join(ENTRY.pack(rank, user_id) for rank, user_id in entries))
+            table_file.truncate(HEADER.size + capacity * ENTRY.size)
+        os.replace(temporary_path, self.path)
+
+    def _map(self):
+        """Return the mapping of the current table file, remapping it if the file was replaced."""
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return None
+        if self._mmap is None or inode != self._inode:
+            with open(self.path, "r+b") as table_file:
+                self._mmap = mmap.mmap(table_file.fileno(), 0)
+            self._inode = inode
+        return self._mmap
+
+    @contextmanager
+    def _locked(self):
+        with open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def build(self, entries):
+        """Replace the whole table with ``entries``, an iterable of ``(rank, user_id)`` pairs."""
+        entries = sorted(entries, key=lambda entry: (-entry[0], -entry[1]))
+        with self._locked():
+            self._write_file(entries, max(MIN_CAPACITY, len(entries) * 2))
+
+    # Reading
+
+    def _read(self, reader):
+        """Call ``reader(mapping, count)`` until it runs without a concurrent write."""
+        for _ in range(READ_RETRIES):
+            mapping = self._map()
+            if mapping is None:
+                return reader(None, 0)
+            _, sequence, count, _ = HEADER.unpack_from(mapping)
+            if sequence % 2:
+                continue
+            result = reader(mapping, count)
+            if HEADER.unpack_from(mapping)[1] == sequence:
+                return result
+
+        with self._locked():
+            mapping = self._map()
+            if mapping is not None and HEADER.unpack_from(mapping)[1] % 2:
+                # A writer died halfway through a change; drop the table so it is rebuilt from the database.
+                os.unlink(self.path)
+                return reader(None, 0)
+            return reader(mapping, HEADER.unpack_from(mapping)[2] if mapping is not None else 0)
+
+    def __len__(self):
+        return self._read(lambda mapping, count: count)
+
+    def top(self, limit):
+        def reader(mapping, count):
+            return [self._entry(mapping, i) for i in range(min(limit, count))]
+
+        return self._read(reader)
+
+    def entries(self):
+        return self.top(len(self))
+
+    def position(self, user_id, rank=None):
+        """Return the 1-based leaderboard position and the rank of ``user_id`` or ``None`` if it is not listed.
+
+        With the current ``rank`` of the user the entry is found by binary search. Without it, or when the table
+        lags behind it, the whole table is scanned, which takes tens of milliseconds for a million entries.
+        """
+
+        def reader(mapping, count):
+            index = self._find(mapping, count, user_id, rank)
+            if index is None:
+                return None
+            return index + 1, self._entry(mapping, index)[0]
+
+        return self._read(reader)
+
+    @staticmethod
+    def _entry(mapping, index):
+        return ENTRY.unpack_from(mapping, HEADER.size + index * ENTRY.size)
+
+    def _find(self, mapping, count, user_id, rank=None):
+        if rank is not None:
+            index = self._bisect(mapping, count, rank, user_id)
+            if index < count and self._entry(mapping, index) == (rank, user_id):
+                return index
+
+        # Unknown or stale rank: scan the user id column for the packed id at C speed.
+        needle = struct.pack("<q", user_id)
+        start, end = HEADER.size, HEADER.size + count * ENTRY.size
+        offset = mapping.find(needle, start, end)
+        while offset != -1:
+            if (offset - HEADER.size) % ENTRY.size == ENTRY.size // 2:
+                return (offset - HEADER.size) // ENTRY.size
+            offset = mapping.find(needle, offset + 1, end)
+        return None
+
+    def _bisect(self, mapping, count, rank, user_id):
+        key = (-rank, -user_id)
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            middle_rank, middle_user_id = self._entry(mapping, middle)
+            if (-middle_rank, -middle_user_id) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    # Writing
+
+    def _set_sequence(self, mapping, sequence):
+        struct.pack_into("<Q", mapping, 8, sequence)
+
+    def update(self, user_id, rank, previous_rank=None):
+        """Move ``user_id`` to ``rank``, or remove it when ``rank`` is ``None``.
+
+        ``previous_rank`` is only a hint which lets the old entry be found by binary search.
+        """
+        with self._locked():
+            mapping = self._map()
+            if mapping is None:
+                return
+            _, sequence, count, capacity = HEADER.unpack_from(mapping)
+
+            if rank is not None and count == capacity:
+                # The lock is held, so the entries can be copied without the retries of readers.
+                self._write_file([self._entry(mapping, i) for i in range(count)], capacity * 2)
+                mapping = self._map()
+                _, sequence, count, capacity = HEADER.unpack_from(mapping)
+
+            self._set_sequence(mapping, sequence + 1)
+            try:
+                index = self._find(mapping, count, user_id, previous_rank)
+                if index is not None:
+                    start = HEADER.size + index * ENTRY.size
+                    mapping.move(start, start + ENTRY.size, (count - index - 1) * ENTRY.size)
+                    count -= 1
+                if rank is not None:
+                    index = self._bisect(mapping, count, rank, user_id)
+                    start = HEADER.size + index * ENTRY.size
+                    mapping.move(start + ENTRY.size, start, (count - index) * ENTRY.size)
+                    ENTRY.pack_into(mapping, start, rank, user_id)
+                    count += 1
+                struct.pack_into("<Q", mapping, 16, count)
+            finally:
+                self._set_sequence(mapping, sequence + 2)
+
+    def remove(self, user_id, previous_rank=None):
+        self.update(user_id, None, previous_rank)
+
+
+def default_rank_table_path():
+    """A path of its own for every checkout and database, so deployments sharing a host do not share a table."""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    database = settings.DATABASES["default"]
+    deployment = "|".join(str(part) for part in (settings.BASE_DIR, database.get("HOST"), database.get("NAME")))
+    return os.path.join(directory, f"devmeup_rank_table_{hashlib.sha256(deployment.encode()).hexdigest()[:16]}")
+
+
+rank_table = RankTable(settings.RANK_TABLE_PATH or default_rank_table_path())
+
+
+def load_rank_entries():
+    from ..models import UserProfile
+
+    return (
+        UserProfile.objects.filter(is_rank_visible=True, is_bot=False)
+        .values_list("rank", "user_id")
+        .iterator(chunk_size=10000)
+    )
+
+
+def rebuild_rank_table():
+    rank_table.build(load_rank_entries())
+
+
+def get_rank_table():
+    """Return the shared rank table, building it from the database if no process has done it yet."""
+    if not rank_table.exists():
+        rebuild_rank_table()
+    return rank_table
+
+
+_serving_lock_file = None
+
+
+def rebuild_rank_table_on_start():
+    """Rebuild the table when a server starts, called by ``config.wsgi`` and ``config.asgi`` in every worker.
+
+    Workers hold a shared ``flock`` of ``<path>.serving`` for their lifetime. The first worker to find no other
+    worker holding it rebuilds the table before joining, so a deployment start or restart, which ends all workers
+    of the host, always serves a table matching the database, while a worker replaced by the server keeps the table
+    its siblings kept current. Writes which bypass the signals, like a database restore, still need
+    ``python manage.py rebuild_rank_table``.
+    """
+    global _serving_lock_file
+    if _serving_lock_file is not None:
+        return
+    _serving_lock_file = open(f"{rank_table.path}.serving", "a")
+    try:
+        fcntl.flock(_serving_lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        pass
+    else:
+        try:
+            rebuild_rank_table()
+        except Exception:
+            # The leaderboard then builds a missing table on demand.
+            logger.exception("Rebuilding the rank table on start failed.")
+    fcntl.flock(_serving_lock_file, fcntl.LOCK_SH)
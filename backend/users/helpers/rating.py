@@ -0,0 +1,30 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class RatingFormula:
+    """Computes new ranks of two players from their current ranks and the score of the first player.
+
+    The score is 1 for a win of the first player, 0 for a loss and 0.5 for a draw.
+    """
+
+    def rate(self, rank_one, rank_two, score_one):
+        raise NotImplementedError
+
+
+class EloRating(RatingFormula):
+    def __init__(self, k_factor=32):
+        self.k_factor = k_factor
+
+    def rate(self, rank_one, rank_two, score_one):
+        expected_one = 1 / (1 + 10 ** ((rank_two - rank_one) / 400))
+        change = round(self.k_factor * (score_one - expected_one))
+        return rank_one + change, rank_two - change
+
+
+@lru_cache(maxsize=None)
+def get_rating_formula():
+    """Return an instance of the ``RATING_FORMULA`` class, ``EloRating`` unless configured otherwise."""
+    return import_string(settings.RATING_FORMULA)()
@@ -0,0 +1,58 @@
+import heapq
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+current_timings = ContextVar("current_timings", default=None)
+
+
+class RequestTimings:
+    """Durations and executed SQL of one request, collected by ``users.middleware.ServerTimingMiddleware``."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.total = None
+        self.durations = defaultdict(float)
+        self.queries = []
+        self.view_name = None
+
+    def add(self, name, seconds):
+        self.durations[name] += seconds
+
+    def record_query(self, execute, sql, params, many, context):
+        """``connection.execute_wrapper`` hook which times every statement and remembers the view issuing it."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.durations["db"] += duration
+            self.queries.append((duration, sql, self.view_name))
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started_at
+
+    def slowest_queries(self, count):
+        return heapq.nlargest(count, self.queries, key=lambda query: query[0])
+
+    def header(self):
+        """``Server-Timing`` value; ``db`` and ``auth`` overlap when authentication queries the database."""
+        metrics = [f'db;dur={self.durations["db"] * 1000:.2f};desc="{len(self.queries)} queries"']
+        metrics.extend(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.durations.items() if name != "db")
+        metrics.append(f"total;dur={self.total * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+@contextmanager
+def timed(name):
+    """Add the duration of the block to the timings of the current request, a no-op outside instrumented ones."""
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
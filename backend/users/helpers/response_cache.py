@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+VIEWER_CLASSES = ("admin", "self")
+
+
+def viewer_class(user):
+    """Permission class of the requesting user; payloads are cached separately for each."""
+    return "admin" if user.is_staff or user.is_superuser else "self"
+
+
+class UserResponseCache:
+    """Cache of serialized user details, keyed per user and viewer class, in the ``cache_alias`` Django cache.
+
+    Entries carry the ``version`` they were computed for, the ``updated_at`` based timestamp of the user, so an
+    entry written before a change is never served even if its invalidation ran in another process.
+    A cold key is computed once: threads of this process wait on a per-key lock and other processes on a lease
+    stored next to the entry for up to ``lease_timeout`` seconds before computing it themselves.
+    """
+
+    POLL_INTERVAL = 0.01
+
+    def __init__(self, cache_alias, timeout, lease_timeout):
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self.lease_timeout = lease_timeout
+        self._key_locks = defaultdict(threading.Lock)
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(("hits", "misses", "coalesced", "invalidations"), 0)
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @staticmethod
+    def key(user_id, viewer):
+        return f"user-detail:{user_id}:{viewer}"
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def metrics(self):
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {**self._counters, "hit_ratio": round(self._counters["hits"] / lookups, 4) if lookups else None}
+
+    def _get(self, key, version):
+        entry = self.cache.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        return None
+
+    def get_or_set(self, user_id, viewer, version, compute):
+        key = self.key(user_id, viewer)
+        payload = self._get(key, version)
+        if payload is not None:
+            self._count("hits")
+            return payload
+
+        self._count("misses")
+        with self._lock:
+            key_lock = self._key_locks[key]
+        with key_lock:
+            try:
+                return self._compute_once(key, version, compute)
+            finally:
+                with self._lock:
+                    if self._key_locks.get(key) is key_lock:
+                        del self._key_locks[key]
+
+    def _compute_once(self, key, version, compute):
+        payload = self._get(key, version)
+        if payload is not None:
+            self._count("coalesced")
+            return payload
+
+        lease_key = f"{key}:lease"
+        if not self.cache.add(lease_key, True, self.lease_timeout):
+            payload = self._wait_for(key, version)
+            if payload is not None:
+                self._count("coalesced")
+                return payload
+        try:
+            payload = compute()
+            self.cache.set(key, (version, payload), self.timeout)
+        finally:
+            self.cache.delete(lease_key)
+        return payload
+
+    def _wait_for(self, key, version):
+        deadline = time.monotonic() + self.lease_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.POLL_INTERVAL)
+            payload = self._get(key, version)
+            if payload is not None:
+                return payload
+        return None
+
+    def invalidate(self, *user_ids):
+        self.cache.delete_many([self.key(user_id, viewer) for user_id in user_ids for viewer in VIEWER_CLASSES])
+        self._count("invalidations", len(user_ids))
+
+
+user_response_cache = UserResponseCache(
+    cache_alias=settings.USER_RESPONSE_CACHE,
+    timeout=settings.USER_RESPONSE_CACHE_TIMEOUT,
+    lease_timeout=settings.USER_RESPONSE_CACHE_LEASE_TIMEOUT,
+)
@@ -0,0 +1,119 @@
+import csv
+import json
+import os
+
+import django
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+
+USER_FIELDS = ("email", "username", "first_name", "last_name", "is_active", "is_staff")
+PROFILE_FIELDS = ("rank", "games_played", "games_won", "games_lost", "is_bot", "is_search_visible", "is_rank_visible")
+BOOLEAN_FIELDS = {"is_active", "is_staff", "is_bot", "is_search_visible", "is_rank_visible"}
+INTEGER_FIELDS = {"rank", "games_played", "games_won", "games_lost"}
+FORMATS = {".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv"}
+USERNAME_MAX_LENGTH = 50
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def detect_format(path):
+    return FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def _parse_lines(records_file):
+    for line in records_file:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                yield InvalidRecord(f"Invalid JSON: {error}")
+
+
+def read_records(path, file_format, on_invalid):
+    """Yield user records from a JSON array, a Django fixture, NDJSON or CSV file.
+
+    NDJSON and CSV are streamed line by line, a JSON array has to be parsed as a whole.
+    Fixture entries of other models than ``users.customuser`` are skipped. Records which cannot be imported are
+    passed to ``on_invalid(number, error)`` with their 1-based number in the file instead.
+    """
+    with open(path, newline="") as records_file:
+        if file_format == "csv":
+            records = csv.DictReader(records_file)
+        elif file_format == "ndjson":
+            records = _parse_lines(records_file)
+        else:
+            records = json.load(records_file)
+
+        for number, record in enumerate(records, start=1):
+            try:
+                if isinstance(record, InvalidRecord):
+                    raise record
+                if not isinstance(record, dict):
+                    raise InvalidRecord("Expected an object.")
+                if "model" in record:
+                    if record["model"] != "users.customuser":
+                        continue
+                    record = record.get("fields", {})
+                yield normalize_record(record)
+            except InvalidRecord as error:
+                on_invalid(number, error)
+
+
+def _convert(field, value):
+    if field in BOOLEAN_FIELDS and isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    if field in INTEGER_FIELDS:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise InvalidRecord(f"{field} is not an integer: {value!r}")
+    return value
+
+
+def normalize_record(record):
+    """Split a flat or ``profile`` nested record into user fields, profile fields and the password.
+
+    Raises :class:`InvalidRecord` when the email is missing or invalid, the username is missing or too long,
+    or a counter is not an integer.
+    """
+    profile_data = {**record, **(record.get("profile") or {})}
+    normalized = {
+        "user": {field: _convert(field, record[field]) for field in USER_FIELDS if record.get(field) not in (None, "")},
+        "profile": {
+            field: _convert(field, profile_data[field])
+            for field in PROFILE_FIELDS
+            if profile_data.get(field) not in (None, "")
+        },
+        "password": record.get("password") or None,
+    }
+
+    user = normalized["user"]
+    try:
+        validate_email(user.get("email"))
+    except ValidationError:
+        raise InvalidRecord(f"Missing or invalid email: {user.get('email')!r}")
+    if not user.get("username") or len(user["username"]) > USERNAME_MAX_LENGTH:
+        raise InvalidRecord(
+            f"Missing username or longer than {USERNAME_MAX_LENGTH} characters: {user.get('username')!r}"
+        )
+    return normalized
+
+
+def is_password_hashed(password):
+    try:
+        identify_hasher(password)
+    except ValueError:
+        return False
+    return True
+
+
+def init_hashing_worker(settings_module):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    django.setup()
+
+
+def hash_passwords(passwords):
+    return [make_password(password) for password in passwords]
@@ -0,0 +1,31 @@
+import os
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last_timestamp = 0
+_counter = 0
+
+
+def uuid7():
+    """Return a time-ordered UUID version 7 as described in RFC 9562.
+
+    The 48 most significant bits hold the Unix time in milliseconds and the next 12 bits a counter,
+    so keys generated by one process are strictly increasing and new rows land at the right edge of the index.
+    """
+    global _last_timestamp, _counter
+
+    with _lock:
+        timestamp = time.time_ns() // 1_000_000
+        if timestamp > _last_timestamp:
+            _last_timestamp, _counter = timestamp, 0
+        else:
+            _counter += 1
+            if _counter > 0xFFF:
+                # Counter overflow within one millisecond borrows the next one.
+                _last_timestamp, _counter = _last_timestamp + 1, 0
+        timestamp, counter = _last_timestamp, _counter
+
+    random_bits = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    return uuid.UUID(int=timestamp << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | random_bits)
@@ -0,0 +1,26 @@
+import json
+from importlib import import_module
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    help = (
+        "Run one of the performance benchmarks and print its results as JSON. "
+        "Fails when the benchmark reports violations, e.g. of the endpoint budgets."
+    )
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest="benchmark", required=True)
+        for name, module_path in BENCHMARKS.items():
+            module = import_module(module_path)
+            module.add_arguments(subparsers.add_parser(name, help=module.HELP))
+
+    def handle(self, *args, **options):
+        module = import_module(BENCHMARKS[options["benchmark"]])
+        result = module.run(options)
+        self.stdout.write(json.dumps({"benchmark": options["benchmark"], **result}, indent=2))
+        if result.get("violations"):
+            raise CommandError("\n".join(result["violations"]))
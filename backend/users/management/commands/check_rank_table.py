@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.helpers.rank_table import load_rank_entries, rank_table, rebuild_rank_table
+
+
+class Command(BaseCommand):
+    help = "Compare the shared-memory rank table with user profiles in the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Rebuild the table when it is inconsistent.")
+
+    def handle(self, *args, **options):
+        if not rank_table.exists():
+            raise CommandError(f"Rank table {rank_table.path} does not exist, run rebuild_rank_table.")
+
+        expected = dict((user_id, rank) for rank, user_id in load_rank_entries())
+        entries = rank_table.entries()
+        actual = dict((user_id, rank) for rank, user_id in entries)
+
+        missing = expected.keys() - actual.keys()
+        unexpected = actual.keys() - expected.keys()
+        wrong_rank = {user_id for user_id in expected.keys() & actual.keys() if expected[user_id] != actual[user_id]}
+        unordered = entries != sorted(entries, key=lambda entry: (-entry[0], -entry[1]))
+        duplicated = len(entries) - len(actual)
+
+        if not (missing or unexpected or wrong_rank or unordered or duplicated):
+            self.stdout.write(self.style.SUCCESS(f"Rank table is consistent ({len(entries)} entries)."))
+            return
+
+        report = (
+            f"Rank table is inconsistent: {len(missing)} missing, {len(unexpected)} unexpected, "
+            f"{len(wrong_rank)} with a wrong rank, {duplicated} duplicated, "
+            f"{'not ' if unordered else ''}ordered."
+        )
+        if not options["fix"]:
+            raise CommandError(report)
+        self.stdout.write(self.style.WARNING(report))
+        rebuild_rank_table()
+        self.stdout.write(self.style.SUCCESS(f"Rank table rebuilt with {len(rank_table)} entries."))
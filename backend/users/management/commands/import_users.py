@@ -0,0 +1,118 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from users.helpers import user_import
+from users.helpers.rank_table import rank_table, rebuild_rank_table
+from users.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Import users with their profiles from a JSON, NDJSON or CSV file. "
+        "Raw passwords are hashed in a process pool, already hashed ones are stored as they are."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File with the users to import.")
+        parser.add_argument("--format", choices=("json", "ndjson", "csv"), help="Defaults to the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Users inserted per transaction.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Password hashing processes.")
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or user_import.detect_format(options["path"])
+        if file_format is None:
+            raise CommandError("Unknown file format, pass it with --format.")
+
+        records = user_import.read_records(options["path"], file_format, self.report_invalid)
+        self.imported, self.skipped, self.invalid = 0, 0, 0
+        start = time.perf_counter()
+
+        # Forked workers must not inherit open database connections.
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=options["workers"],
+            initializer=user_import.init_hashing_worker,
+            initargs=(os.environ["DJANGO_SETTINGS_MODULE"],),
+        ) as executor:
+            # Passwords of the next chunk are hashed while the current one is inserted.
+            pending = None
+            while chunk := list(islice(records, options["chunk_size"])):
+                chunk = self.skip_existing(chunk)
+                hashing = self.submit_hashing(executor, chunk, options["workers"])
+                if pending:
+                    self.insert_chunk(*pending)
+                pending = chunk, hashing
+            if pending:
+                self.insert_chunk(*pending)
+
+        if rank_table.exists():
+            rebuild_rank_table()
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {self.imported} users, skipped {self.skipped} existing and {self.invalid} invalid, "
+                f"in {elapsed:.1f}s ({self.imported / elapsed if elapsed else 0:.0f} users/s)."
+            )
+        )
+
+    def report_invalid(self, number, error):
+        self.invalid += 1
+        self.stderr.write(f"Skipped record {number}: {error}")
+
+    def skip_existing(self, chunk):
+        """Drop records whose email is taken, so no time is spent hashing their passwords."""
+        emails = [record["user"]["email"] for record in chunk]
+        existing_emails = set(get_user_model().objects.filter(email__in=emails).values_list("email", flat=True))
+        new_records = []
+        for record in chunk:
+            if record["user"]["email"] in existing_emails:
+                self.skipped += 1
+                continue
+            existing_emails.add(record["user"]["email"])
+            new_records.append(record)
+        return new_records
+
+    def submit_hashing(self, executor, chunk, workers):
+        raw_passwords = [
+            record["password"]
+            for record in chunk
+            if record["password"] and not user_import.is_password_hashed(record["password"])
+        ]
+        slice_size = max(1, -(-len(raw_passwords) // workers))
+        futures = []
+        for start in range(0, len(raw_passwords), slice_size):
+            stop = start + slice_size
+            futures.append(executor.submit(user_import.hash_passwords, raw_passwords[start:stop]))
+        return futures
+
+    def insert_chunk(self, chunk, hashing):
+        hashed_passwords = iter([password for future in hashing for password in future.result()])
+        User = get_user_model()
+
+        users, profiles = [], []
+        for record in chunk:
+            password = record["password"]
+            if password and not user_import.is_password_hashed(password):
+                password = next(hashed_passwords)
+            elif not password:
+                password = make_password(None)
+            users.append(User(password=password, **record["user"]))
+            profiles.append(record["profile"])
+
+        with transaction.atomic():
+            users = User.objects.bulk_create(users)
+            UserProfile.objects.bulk_create(
+                UserProfile(user=user, **profile_data) for user, profile_data in zip(users, profiles)
+            )
+
+        # Web workers see the new usernames when their nick filters are next rebuilt.
+        self.imported += len(users)
+        self.stdout.write(f"Imported {self.imported} users...")
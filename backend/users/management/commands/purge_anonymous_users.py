@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.models import AnonymousUser
+
+
+class Command(BaseCommand):
+    help = "Delete anonymous users created more than --days ago, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.ANONYMOUS_USER_TTL_DAYS)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        abandoned = AnonymousUser.objects.filter(created_at__lt=cutoff).order_by("created_at")
+        deleted = 0
+
+        # Short batches keep each DELETE from holding locks on a large part of the table.
+        while batch := list(abandoned.values_list("pk", flat=True)[: options["batch_size"]]):
+            deleted += AnonymousUser.objects.filter(pk__in=batch).delete()[0]
+
+        self.stdout.write(f"Deleted {deleted} anonymous users created before {cutoff:%Y-%m-%d %H:%M}.")
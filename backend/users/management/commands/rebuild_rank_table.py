@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.helpers.rank_table import rank_table, rebuild_rank_table
+
+
+class Command(BaseCommand):
+    help = "Rebuild the shared-memory rank table from user profiles."
+
+    def handle(self, *args, **options):
+        rebuild_rank_table()
+        self.stdout.write(f"Rank table {rank_table.path} rebuilt with {len(rank_table)} entries.")
@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from users.helpers.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Send pending emails from the outbox over a single reused email backend connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.EMAIL_OUTBOX_BATCH_SIZE)
+        parser.add_argument("--max-attempts", type=int, default=settings.EMAIL_OUTBOX_MAX_ATTEMPTS)
+        parser.add_argument("--loop", action="store_true", help="Keep polling the outbox instead of exiting.")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds to sleep when the outbox is empty.")
+
+    def handle(self, *args, **options):
+        connection = get_connection()
+        try:
+            while True:
+                sent, failed = drain_outbox(connection, options["batch_size"], options["max_attempts"])
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent} emails, {failed} failed.")
+                if not options["loop"]:
+                    break
+                if sent + failed < options["batch_size"]:
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
@@ -0,0 +1,170 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+
+from .helpers.metrics import collect_process_metrics, http_request_duration, http_responses
+from .helpers.request_timing import RequestTimings, current_timings
+from .routers import PIN_COOKIE, RequestRouting, current_routing, pin_key, replica_aliases
+
+logger = logging.getLogger(__name__)
+
+# Cache backends whose entries only the process which wrote them can read.
+PROCESS_LOCAL_CACHES = {"django.core.cache.backends.locmem.LocMemCache", "django.core.cache.backends.dummy.DummyCache"}
+
+
+class ServerTimingMiddleware:
+    """Report database, authentication, render and total time of every request in a ``Server-Timing`` header.
+
+    Requests taking at least ``SERVER_TIMING_SLOW_MS`` are logged with their ``SERVER_TIMING_SLOW_QUERIES``
+    slowest statements and the view which issued them. Enabled by ``SERVER_TIMING_ENABLED``; when it is off the
+    middleware removes itself from the stack at startup, so it costs nothing.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings.record_query))
+                response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+
+        timings.finish()
+        response["Server-Timing"] = timings.header()
+        if timings.total * 1000 >= settings.SERVER_TIMING_SLOW_MS:
+            self.log_slow_request(request, response, timings)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = current_timings.get()
+        if timings is not None:
+            timings.view_name = request.resolver_match.view_name or view_func.__qualname__
+
+    def process_template_response(self, request, response):
+        timings = current_timings.get()
+        if timings is not None:
+            start = time.perf_counter()
+            response.add_post_render_callback(lambda response: timings.add("render", time.perf_counter() - start))
+        return response
+
+    def log_slow_request(self, request, response, timings):
+        queries = "".join(
+            f"\n  {duration * 1000:.2f} ms in {view_name}: {sql}"
+            for duration, sql, view_name in timings.slowest_queries(settings.SERVER_TIMING_SLOW_QUERIES)
+        )
+        logger.warning(
+            "Slow request %s %s (%s) took %.0f ms, status %s, %s; slowest queries:%s",
+            request.method,
+            request.path,
+            timings.view_name,
+            timings.total * 1000,
+            response.status_code,
+            response["Server-Timing"],
+            queries or " none",
+        )
+
+
+class MetricsMiddleware:
+    """Count responses and observe request latency per URL name, enabled by ``METRICS_ENABLED``.
+
+    URL names keep the number of label values bounded; requests which match no route share ``unmatched``.
+    Supports both sync and async requests, so it does not push the async views of ASGI workers into a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        return self.record(request, response, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        return self.record(request, response, time.perf_counter() - start)
+
+    def record(self, request, response, seconds):
+        view = request.resolver_match.view_name if request.resolver_match else "unmatched"
+        http_request_duration.observe(seconds, view=view, method=request.method)
+        http_responses.inc(view=view, status=response.status_code)
+        collect_process_metrics()
+        return response
+
+
+class ReplicaPinningMiddleware:
+    """Read-your-writes for the replica reads of ``users.routers.ReplicaRouter``.
+
+    A request which wrote to the primary pins the authenticated user in the shared ``DB_REPLICA_PIN_CACHE`` for
+    ``DB_REPLICA_PIN_SECONDS``, which has to outlast the replication lag, so the pin holds on every worker and
+    device; JWT authentication names the user before loading it, so that lookup honours the pin too. Its response
+    also sets a cookie for as long, which covers anonymous clients. While a client is pinned, all its reads go to
+    the primary. Removes itself when no replicas are configured and, like ``MetricsMiddleware``, supports both sync
+    and async requests.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        backend = settings.CACHES[settings.DB_REPLICA_PIN_CACHE]["BACKEND"]
+        if backend in PROCESS_LOCAL_CACHES:
+            raise ImproperlyConfigured(
+                f"DB_REPLICA_PIN_CACHE uses {backend}, whose pins other workers cannot see. "
+                "Set DB_REPLICA_PIN_CACHE_BACKEND to a shared cache when DB_REPLICA_URLS is set."
+            )
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = RequestRouting(pinned=PIN_COOKIE in request.COOKIES, request=request)
+        token = current_routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        return self.pin(request, response, routing)
+
+    async def __acall__(self, request):
+        routing = RequestRouting(pinned=PIN_COOKIE in request.COOKIES, request=request)
+        token = current_routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        return self.pin(request, response, routing)
+
+    def pin(self, request, response, routing):
+        if routing.wrote:
+            response.set_cookie(PIN_COOKIE, "1", max_age=settings.DB_REPLICA_PIN_SECONDS, httponly=True, samesite="Lax")
+            user_id = routing.authenticated_user_id()
+            if user_id is not None:
+                caches[settings.DB_REPLICA_PIN_CACHE].set(pin_key(user_id), True, settings.DB_REPLICA_PIN_SECONDS)
+        return response
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def remove_duplicate_profiles(apps, schema_editor):
+    """Keep only the oldest profile of every user, the one consumers used to read via ``profile.all()[0]``."""
+    UserProfile = apps.get_model("users", "UserProfile")
+
+    duplicated_users = (
+        UserProfile.objects.values("user_id")
+        .annotate(profiles_count=models.Count("id"), kept_id=models.Min("id"))
+        .filter(profiles_count__gt=1)
+    )
+    for row in duplicated_users.iterator():
+        UserProfile.objects.filter(user_id=row["user_id"]).exclude(id=row["kept_id"]).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0002_superuser"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_profiles, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="userprofile",
+            name="user",
+            field=models.OneToOneField(
+                on_delete=django.db.models.deletion.CASCADE, related_name="profile", to=settings.AUTH_USER_MODEL
+            ),
+        ),
+    ]
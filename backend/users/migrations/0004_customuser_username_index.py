@@ -0,0 +1,19 @@
+# Generated by Django 4.2.3 on 2026-10-18 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0003_userprofile_user_one_to_one"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="customuser",
+            name="username",
+            field=models.CharField(
+                db_index=True, help_text="Required. 50 characters or fewer.", max_length=50, verbose_name="username"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.3 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0005_outboxemail"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userprofile",
+            index=models.Index(
+                condition=models.Q(("is_rank_visible", True)), fields=["-rank", "-id"], name="leaderboard_idx"
+            ),
+        ),
+    ]
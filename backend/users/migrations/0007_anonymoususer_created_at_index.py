@@ -0,0 +1,17 @@
+# Generated by Django 4.2.3 on 2026-10-18 09:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0006_userprofile_leaderboard_idx"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="anonymoususer",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.3 on 2026-10-18 09:12
+
+from django.db import migrations, models
+import users.helpers.uuid7
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0007_anonymoususer_created_at_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="anonymoususer",
+            name="id",
+            field=models.UUIDField(
+                default=users.helpers.uuid7.uuid7, editable=False, primary_key=True, serialize=False
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+CREATE_INDEXES = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS users_customuser_username_prefix_idx "
+    'ON users_customuser ((UPPER("username") COLLATE "C"))',
+    "CREATE INDEX IF NOT EXISTS users_customuser_username_trgm_idx "
+    'ON users_customuser USING gin (UPPER("username") gin_trgm_ops)',
+)
+DROP_INDEXES = (
+    "DROP INDEX IF EXISTS users_customuser_username_trgm_idx",
+    "DROP INDEX IF EXISTS users_customuser_username_prefix_idx",
+)
+
+
+def _execute_on_postgresql(schema_editor, statements):
+    # Player search falls back to an in-process trie on other databases, so they get no search indexes.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_indexes(apps, schema_editor):
+    _execute_on_postgresql(schema_editor, CREATE_INDEXES)
+
+
+def drop_search_indexes(apps, schema_editor):
+    _execute_on_postgresql(schema_editor, DROP_INDEXES)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0009_matchresult"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
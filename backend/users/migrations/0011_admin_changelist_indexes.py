@@ -0,0 +1,20 @@
+# Generated by Django 4.2.3 on 2026-10-18 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0010_customuser_username_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(fields=["-last_login", "-id"], name="user_last_login_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="userprofile",
+            index=models.Index(fields=["-rank", "-id"], name="profile_rank_idx"),
+        ),
+    ]
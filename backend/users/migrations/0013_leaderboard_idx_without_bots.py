@@ -0,0 +1,24 @@
+# Generated by Django 4.2.3 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0012_updated_at"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="userprofile",
+            name="leaderboard_idx",
+        ),
+        migrations.AddIndex(
+            model_name="userprofile",
+            index=models.Index(
+                condition=models.Q(("is_bot", False), ("is_rank_visible", True)),
+                fields=["-rank", "-id"],
+                name="leaderboard_idx",
+            ),
+        ),
+    ]
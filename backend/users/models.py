@@ -1,10 +1,11 @@
-import uuid
-
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from .helpers.uuid7 import uuid7
+
 
 class CustomUser(AbstractUser):
     email = models.EmailField(_("email address"), unique=True)
@@ -12,6 +13,7 @@ class CustomUser(AbstractUser):
         _("username"),
         max_length=50,
         unique=False,
+        db_index=True,
         help_text=_("Required. 50 characters or fewer."),
     )
     is_active = models.BooleanField(
@@ -22,24 +24,28 @@ class CustomUser(AbstractUser):
         ),
     )
     date_joined = models.DateTimeField(auto_now_add=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
+    class Meta(AbstractUser.Meta):
+        indexes = [models.Index(fields=["-last_login", "-id"], name="user_last_login_idx")]
+
     def __str__(self):
         return self.username
 
 
 class AnonymousUser(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    created_at = models.DateTimeField(auto_now_add=True)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         return f"Anonymous user {self.id}"
 
 
 class UserProfile(models.Model):
-    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name="profile")
+    user = models.OneToOneField(get_user_model(), on_delete=models.CASCADE, related_name="profile")
     rank = models.IntegerField(default=0)
     games_played = models.IntegerField(default=0)
     games_won = models.IntegerField(default=0)
@@ -48,6 +54,75 @@ class UserProfile(models.Model):
     is_bot = models.BooleanField(default=False)
     is_search_visible = models.BooleanField(default=False)
     is_rank_visible = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # The public leaderboard; listings including bots use profile_rank_idx.
+            models.Index(
+                fields=["-rank", "-id"],
+                name="leaderboard_idx",
+                condition=models.Q(is_rank_visible=True, is_bot=False),
+            ),
+            models.Index(fields=["-rank", "-id"], name="profile_rank_idx"),
+        ]
 
     def __str__(self):
         return f"Profile of {self.user}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields() & {"rank", "is_rank_visible", "is_bot"}:
+            instance._saved_leaderboard_rank = instance.leaderboard_rank
+        return instance
+
+    @property
+    def leaderboard_rank(self):
+        """Rank under which the profile is listed on the public leaderboard, ``None`` if it is not listed."""
+        return self.rank if self.is_rank_visible and not self.is_bot else None
+
+
+class MatchResult(models.Model):
+    player_one = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name="+")
+    player_two = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name="+")
+    winner = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name="+",
+        null=True,
+        blank=True,
+        help_text=_("Empty for a draw."),
+    )
+    player_one_rank_change = models.IntegerField()
+    player_two_rank_change = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Match of {self.player_one_id} and {self.player_two_id}"
+
+
+class OutboxEmail(models.Model):
+    """Email waiting to be sent by the ``send_outbox_emails`` worker, written in the transaction that caused it."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("pending")
+        SENT = "sent", _("sent")
+        FAILED = "failed", _("failed")
+
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipient = models.EmailField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"], name="outbox_pending_idx")]
+
+    def __str__(self):
+        return f"{self.subject} to {self.recipient} ({self.status})"
@@ -0,0 +1,112 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class RankKeysetPagination(BasePagination):
+    """Seek pagination over ``(rank, id)`` in descending order.
+
+    Every page continues from the last ``(rank, id)`` pair of the previous one instead of using ``OFFSET``,
+    so the cost of a page does not depend on how deep it is. Backed by ``UserProfile`` ``leaderboard_idx``.
+    Malformed cursors are rejected with 400.
+    """
+
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor."
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def encode_cursor(self, rank, pk):
+        return urlsafe_b64encode(f"{rank}:{pk}".encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            rank, pk = urlsafe_b64decode(encoded.encode()).decode().split(":")
+            return int(rank), int(pk)
+        except (TypeError, ValueError):
+            raise ValidationError({self.cursor_query_param: [self.invalid_cursor_message]})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor is not None:
+            rank, pk = cursor
+            # ``rank__lte`` bounds the index range scan, the ``Q`` only filters rows sharing the cursor rank.
+            queryset = queryset.filter(rank__lte=rank).filter(Q(rank__lt=rank) | Q(pk__lt=pk))
+
+        rows = list(queryset.order_by("-rank", "-pk")[: page_size + 1])
+        page = rows[:page_size]
+        self.next_cursor = None
+        if len(rows) > page_size:
+            self.next_cursor = self.encode_cursor(page[-1].rank, page[-1].pk)
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_first_link(self):
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response({"first": self.get_first_link(), "next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "first": {"type": "string", "format": "uri"},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+def estimate_count(queryset, exact_limit):
+    """Return the planner's row estimate of ``queryset`` on PostgreSQL, or its exact count below ``exact_limit``.
+
+    Counting a large table is a full scan while ``EXPLAIN`` only reads statistics. Other databases always count.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimate = int(plan[0]["Plan"]["Plan Rows"])
+    return estimate if estimate >= exact_limit else queryset.count()
+
+
+class EstimatedCountPaginator(Paginator):
+    """Admin changelist paginator which counts with :func:`estimate_count` instead of ``COUNT(*)``."""
+
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list, settings.ADMIN_EXACT_COUNT_LIMIT)
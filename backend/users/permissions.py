@@ -1,3 +1,8 @@
+import hmac
+from collections.abc import Mapping
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
 from rest_framework.permissions import BasePermission
 
 
@@ -7,3 +12,23 @@ class IsAdminOrSelf(BasePermission):
             return True
 
         return obj == request.user
+
+
+class IsAdminOrMatchParticipant(BasePermission):
+    def has_permission(self, request, view):
+        if not isinstance(request.data, Mapping):
+            raise ParseError("Expected an object.")
+        if request.user.is_staff or request.user.is_superuser:
+            return True
+
+        players = (request.data.get("player_one_id"), request.data.get("player_two_id"))
+        return str(request.user.pk) in {str(player) for player in players}
+
+
+class HasMetricsToken(BasePermission):
+    """Allows everybody when ``METRICS_TOKEN`` is empty, otherwise requests with ``Authorization: Bearer <token>``."""
+
+    def has_permission(self, request, view):
+        if not settings.METRICS_TOKEN:
+            return True
+        return hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {settings.METRICS_TOKEN}")
@@ -0,0 +1,130 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import LazyObject
+
+# Set by ``users.middleware.ReplicaPinningMiddleware`` for every request
+current_routing = ContextVar("current_routing", default=None)
+
+REPLICA_PREFIX = "replica_"
+# Cookie of clients whose reads stay on the primary after a write
+PIN_COOKIE = "db_pinned"
+
+
+def pin_key(user_id):
+    return f"replica_pin:{user_id}"
+
+
+def authenticated_user_id(request):
+    """Return the id of the user a view authenticated ``request`` as, ``None`` before that or for anonymous users.
+
+    DRF sets the authenticated user on the Django request. The lazy session user of ``AuthenticationMiddleware``
+    is never evaluated here, that would query the session.
+    """
+    user = request.__dict__.get("user")
+    if user is None or isinstance(user, LazyObject) or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+class RequestRouting:
+    """Where the reads of one request may go. Shared by reference, so writes in a thread of the request count."""
+
+    def __init__(self, pinned=False, request=None):
+        # The client wrote within the last DB_REPLICA_PIN_SECONDS and must read its own writes.
+        self.pinned = pinned
+        # Once the user is known, their pin in the DB_REPLICA_PIN_CACHE counts as well.
+        self.request = request
+        self.user_id = None
+        self._user_pin_checked = False
+        # The view is read-only and accepts data as old as the replication lag.
+        self.replica_reads = False
+        self.wrote = False
+        # One replica per request, so its reads see a consistent snapshot.
+        self.replica = None
+
+    @property
+    def use_replicas(self):
+        return self.replica_reads and not self.wrote and not self.is_pinned()
+
+    def authenticated_user_id(self):
+        if self.user_id is None and self.request is not None:
+            self.user_id = authenticated_user_id(self.request)
+        return self.user_id
+
+    def is_pinned(self):
+        if not self.pinned and not self._user_pin_checked:
+            user_id = self.authenticated_user_id()
+            if user_id is not None:
+                self._user_pin_checked = True
+                self.pinned = caches[settings.DB_REPLICA_PIN_CACHE].get(pin_key(user_id), False)
+        return self.pinned
+
+
+def identify_user(user_id):
+    """Tell the routing of the current request which user it authenticates as, before the user is loaded.
+
+    Authentication calls this with the id from the token, so loading the user already honours the user's pin.
+    """
+    routing = current_routing.get()
+    if routing is not None and routing.user_id is None:
+        routing.user_id = user_id
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith(REPLICA_PREFIX)]
+
+
+class ReplicaRouter:
+    """Send the reads of views marked with :class:`ReplicaReadsMixin` to a random read replica.
+
+    Everything else, all writes and the reads of a request after its first write or of a client pinned by a
+    recent write, stays on the primary. Replicas are the ``replica_*`` aliases configured by ``DB_REPLICA_URLS``.
+    """
+
+    def __init__(self):
+        self.replicas = replica_aliases()
+
+    def db_for_read(self, model, **hints):
+        routing = current_routing.get()
+        if not self.replicas or routing is None or not routing.use_replicas:
+            return None
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        if routing.replica is None:
+            routing.replica = random.choice(self.replicas)
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = current_routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication.
+        return not db.startswith(REPLICA_PREFIX)
+
+
+class ReplicaReadsMixin:
+    """Serve the reads of a read-only view from the replicas, its responses may lag behind by the replication delay.
+
+    Clients which wrote recently keep reading from the primary, see ``users.middleware.ReplicaPinningMiddleware``.
+    """
+
+    def initialize_request(self, request, *args, **kwargs):
+        # The first step of DRF's sync and of the async dispatch, before authentication loads the user.
+        routing = current_routing.get()
+        if routing is not None:
+            routing.replica_reads = True
+        return super().initialize_request(request, *args, **kwargs)
@@ -1,6 +1,16 @@
 from django.contrib.auth import get_user_model
-from rest_framework import serializers
+from django.core import signing
+from django.core.exceptions import ObjectDoesNotExist
+from django.conf import settings
+from rest_framework import exceptions, serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+
 from . import models
+from .exceptions import ServiceUnavailable
+from .helpers.guest_tokens import read_guest_token
+from .helpers.match_results import record_match_result
+from .helpers.password_pool import PasswordPoolSaturated, password_pool
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
@@ -9,6 +19,23 @@ class UserProfileSerializer(serializers.ModelSerializer):
         exclude = ("user",)
 
 
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source="user.username", read_only=True)
+
+    class Meta:
+        model = models.UserProfile
+        fields = ("user_id", "username", "rank", "games_played", "games_won", "games_lost", "is_bot")
+
+
+class LeaderboardTopQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+class PlayerSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=50)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+
 class CustomUserCreateSerializer(serializers.ModelSerializer):
     profile = UserProfileSerializer(required=False)
 
@@ -32,7 +59,7 @@ class CustomUserCreateSerializer(serializers.ModelSerializer):
         if profile_data:
             custom_user = get_user_model().objects.create_user(password=password, **validated_data)
             models.UserProfile.objects.create(user=custom_user, **profile_data)
-            custom_user = get_user_model().objects.select_related("profile").get(user_id=custom_user.pk)
+            custom_user = get_user_model().objects.select_related("profile").get(pk=custom_user.pk)
         else:
             custom_user = get_user_model().objects.create_user(password=password, **validated_data)
 
@@ -71,58 +98,54 @@ class CustomUserSerializer(serializers.ModelSerializer):
         instance = self.Meta.model.objects.create_user(**validated_data)
         return instance
 
-    def get_rank(self, obj):
+    def _get_profile(self, obj):
+        """Return the profile of ``obj``; join it with ``select_related("profile")`` to avoid an extra query."""
         try:
-            profile = obj.profile.all()[0]
-            return profile.rank
-        except IndexError:
+            return obj.profile
+        except ObjectDoesNotExist:
             return None
 
-    def get_games_played(self, obj):
-        try:
-            profile = obj.profile.all()[0]
-            return profile.games_played
-        except IndexError:
+    def _get_profile_field(self, obj, field_name):
+        profile = self._get_profile(obj)
+        if profile is None:
             return None
+        return getattr(profile, field_name)
+
+    def get_rank(self, obj):
+        return self._get_profile_field(obj, "rank")
+
+    def get_games_played(self, obj):
+        return self._get_profile_field(obj, "games_played")
 
     def get_games_won(self, obj):
-        try:
-            profile = obj.profile.all()[0]
-            return profile.games_won
-        except IndexError:
-            return None
+        return self._get_profile_field(obj, "games_won")
 
     def get_games_lost(self, obj):
-        try:
-            profile = obj.profile.all()[0]
-            return profile.games_lost
-        except IndexError:
-            return None
+        return self._get_profile_field(obj, "games_lost")
 
     def get_is_search_visible(self, obj):
-        try:
-            profile = obj.profile.all()[0]
-            return profile.is_search_visible
-        except IndexError:
-            return None
+        return self._get_profile_field(obj, "is_search_visible")
 
     def get_is_rank_visible(self, obj):
-        try:
-            profile = obj.profile.all()[0]
-            return profile.is_rank_visible
-        except IndexError:
-            return None
+        return self._get_profile_field(obj, "is_rank_visible")
+
 
+class PasswordReminderEmailSerializer(serializers.Serializer):
+    """Email of a password reminder, the async view looks the user up itself."""
+
+    UNKNOWN_EMAIL = "User with this email does not exist."
 
-class PasswordReminderSerializer(serializers.Serializer):
     email = serializers.EmailField()
+
+
+class PasswordReminderSerializer(PasswordReminderEmailSerializer):
     User = get_user_model()
 
     def validate_email(self, value):
         try:
             self.User.objects.get(email=value)
         except self.User.DoesNotExist:
-            raise serializers.ValidationError("User with this email does not exist.")
+            raise serializers.ValidationError(self.UNKNOWN_EMAIL)
         return value
 
 
@@ -136,7 +159,126 @@ class PasswordResetSerializer(serializers.Serializer):
         return data
 
 
+class CustomNickQuerySerializer(serializers.Serializer):
+    MAX_COUNT = 50
+
+    count = serializers.IntegerField(min_value=1, max_value=MAX_COUNT, default=5)
+
+
 class AnonymousUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.AnonymousUser
         fields = "__all__"
+
+
+class PooledTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Token pair serializer which verifies the password in :data:`users.helpers.password_pool.password_pool`.
+
+    Passwords hashed with outdated hasher parameters are re-hashed on a successful login.
+    Tokens carry the claims :class:`users.authentication.ClaimsJWTAuthentication` authorizes from.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token["is_active"] = user.is_active
+        token["is_staff"] = user.is_staff
+        token["is_superuser"] = user.is_superuser
+        return token
+
+    def validate(self, attrs):
+        User = get_user_model()
+        user = User.objects.filter(**{self.username_field: attrs[self.username_field]}).first()
+
+        try:
+            if user is None:
+                # Hash anyway so response time does not reveal whether the account exists.
+                password_pool.hash(attrs["password"])
+                is_correct = False
+            else:
+                is_correct, rehashed = password_pool.verify(attrs["password"], user.password)
+        except (PasswordPoolSaturated, TimeoutError):
+            raise ServiceUnavailable(wait=settings.LOGIN_POOL_RETRY_AFTER)
+
+        if is_correct and rehashed:
+            user.password = rehashed
+            user.save(update_fields=["password"])
+
+        return self.issue_tokens(user if is_correct else None)
+
+    async def avalidate(self, attrs):
+        """:meth:`validate` for async views, awaiting the password check instead of blocking a thread on it."""
+        User = get_user_model()
+        user = await User.objects.filter(**{self.username_field: attrs[self.username_field]}).afirst()
+
+        try:
+            if user is None:
+                await password_pool.ahash(attrs["password"])
+                is_correct = False
+            else:
+                is_correct, rehashed = await password_pool.averify(attrs["password"], user.password)
+        except (PasswordPoolSaturated, TimeoutError):
+            raise ServiceUnavailable(wait=settings.LOGIN_POOL_RETRY_AFTER)
+
+        if is_correct and rehashed:
+            user.password = rehashed
+            await user.asave(update_fields=["password"])
+
+        return self.issue_tokens(user if is_correct else None)
+
+    def issue_tokens(self, user):
+        self.user = user
+        if not api_settings.USER_AUTHENTICATION_RULE(self.user):
+            raise exceptions.AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        refresh = self.get_token(self.user)
+        return {"refresh": str(refresh), "access": str(refresh.access_token)}
+
+
+class GuestSessionSerializer(serializers.Serializer):
+    id = serializers.UUIDField(read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+    token = serializers.CharField(read_only=True)
+
+
+class GuestTokenSerializer(serializers.Serializer):
+    token = serializers.CharField()
+
+    def validate_token(self, value):
+        try:
+            read_guest_token(value)
+        except signing.BadSignature:
+            raise serializers.ValidationError("Invalid or expired guest token.")
+        return value
+
+
+class MatchResultSerializer(serializers.ModelSerializer):
+    player_one_id = serializers.IntegerField()
+    player_two_id = serializers.IntegerField()
+    winner_id = serializers.IntegerField(allow_null=True, required=False, default=None)
+
+    class Meta:
+        model = models.MatchResult
+        fields = (
+            "id",
+            "player_one_id",
+            "player_two_id",
+            "winner_id",
+            "player_one_rank_change",
+            "player_two_rank_change",
+            "created_at",
+        )
+        read_only_fields = ("player_one_rank_change", "player_two_rank_change", "created_at")
+
+    def validate(self, data):
+        if data["player_one_id"] == data["player_two_id"]:
+            raise serializers.ValidationError("Players must be different.")
+        if data["winner_id"] not in (None, data["player_one_id"], data["player_two_id"]):
+            raise serializers.ValidationError("Winner must be one of the players.")
+        return data
+
+    def create(self, validated_data):
+        try:
+            return record_match_result(**validated_data)
+        except models.UserProfile.DoesNotExist:
+            raise serializers.ValidationError("Both players need a profile.")
@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_cache
+from .helpers.metrics import track_database_connection
+from .helpers.nick_allocator import nick_allocator
+from .helpers.player_search import player_search_index
+from .helpers.rank_table import rank_table
+from .helpers.response_cache import user_response_cache
+from .models import UserProfile
+
+LEADERBOARD_FIELDS = {"rank", "is_rank_visible", "is_bot"}
+
+
+@receiver(post_save, sender=get_user_model())
+def register_username(sender, instance, **kwargs):
+    nick_allocator.add(instance.username)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Deleting before the commit would let a concurrent request cache the old row again.
+    user_id = instance.pk
+    transaction.on_commit(lambda: user_cache.delete(user_id))
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_user_response(sender, instance, **kwargs):
+    user_id = instance.user_id if isinstance(instance, UserProfile) else instance.pk
+    transaction.on_commit(lambda: user_response_cache.invalidate(user_id))
+
+
+@receiver(post_save, sender=get_user_model())
+def update_player_search_user(sender, instance, created, update_fields=None, **kwargs):
+    # Renames and deactivations of indexed users are applied, reactivated users with a visible profile are added.
+    # New users enter the index through their profile.
+    if player_search_index.contains(instance.pk):
+        transaction.on_commit(lambda: player_search_index.update(instance.pk, instance.username, instance.is_active))
+        return
+    if created or not instance.is_active or not player_search_index.is_built():
+        return
+    if update_fields is not None and "is_active" not in update_fields:
+        return
+    profile = getattr(instance, "profile", None)
+    if profile is not None and profile.is_search_visible:
+        transaction.on_commit(lambda: player_search_index.update(instance.pk, instance.username, True))
+
+
+@receiver(post_delete, sender=get_user_model())
+@receiver(post_delete, sender=UserProfile)
+def remove_from_player_search(sender, instance, **kwargs):
+    user_id = instance.user_id if isinstance(instance, UserProfile) else instance.pk
+    transaction.on_commit(lambda: player_search_index.update(user_id, None, False))
+
+
+@receiver(post_save, sender=UserProfile)
+def update_player_search_visibility(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "is_search_visible" not in update_fields:
+        return
+    user_id = instance.user_id
+    if not instance.is_search_visible:
+        if player_search_index.contains(user_id):
+            transaction.on_commit(lambda: player_search_index.update(user_id, None, False))
+    elif player_search_index.is_built() and not player_search_index.contains(user_id):
+        # Only profiles turning visible need their user, which is loaded unless it is cached already.
+        user = instance.user
+        if user.is_active:
+            transaction.on_commit(lambda: player_search_index.update(user_id, user.username, True))
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def recheck_player_search(sender, instance, **kwargs):
+    # A build scanning the users meanwhile may read the row before this change commits.
+    if player_search_index.is_building():
+        user_id = instance.user_id if isinstance(instance, UserProfile) else instance.pk
+        transaction.on_commit(lambda: player_search_index.changed(user_id))
+
+
+@receiver(post_save, sender=UserProfile)
+def update_rank_table(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not LEADERBOARD_FIELDS & set(update_fields):
+        return
+
+    previous_rank = getattr(instance, "_saved_leaderboard_rank", None)
+    rank = instance.leaderboard_rank
+    if not created and hasattr(instance, "_saved_leaderboard_rank") and previous_rank == rank:
+        return
+
+    instance._saved_leaderboard_rank = rank
+    transaction.on_commit(lambda: rank_table.update(instance.user_id, rank, previous_rank))
+
+
+@receiver(post_delete, sender=UserProfile)
+def remove_from_rank_table(sender, instance, **kwargs):
+    transaction.on_commit(lambda: rank_table.remove(instance.user_id, instance.leaderboard_rank))
+
+
+@receiver(connection_created)
+def count_database_connection(sender, connection, **kwargs):
+    track_database_connection(connection)
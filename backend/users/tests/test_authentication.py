@@ -0,0 +1,43 @@
+import pytest
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.authentication import user_cache
+
+pytestmark = [pytest.mark.django_db, pytest.mark.unit]
+
+
+@pytest.fixture
+def claims_auth_for_reads(settings):
+    settings.JWT_CLAIMS_AUTH_FOR_READS = True
+
+
+def test_claims_only_reads_accept_tokens_with_user_claims(make_user, auth_client, claims_auth_for_reads):
+    user = make_user("alice")
+
+    response = auth_client(user).get(reverse("get_user", kwargs={"pk": user.pk}))
+
+    assert response.status_code == 200
+
+
+def test_claims_only_reads_reject_tokens_without_is_active(make_user, api_client, claims_auth_for_reads):
+    user = make_user("alice")
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+
+    response = api_client.get(reverse("get_user", kwargs={"pk": user.pk}))
+
+    assert response.status_code == 401
+
+
+def test_cached_user_is_dropped_only_after_the_commit(make_user, auth_client, django_capture_on_commit_callbacks):
+    user = make_user("alice")
+    auth_client(user).patch(reverse("update_user"), {"first_name": "Ada"}, format="json")
+    assert user_cache.get(user.pk) is not None
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        user.save()
+        assert user_cache.get(user.pk) is not None
+
+    for callback in callbacks:
+        callback()
+    assert user_cache.get(user.pk) is None
@@ -0,0 +1,22 @@
+import json
+import subprocess
+import sys
+
+import pytest
+from django.conf import settings
+
+
+@pytest.mark.slow
+def test_endpoint_benchmark_stays_within_query_and_allocation_budgets(tmp_path):
+    # A process of its own, the benchmark creates its own database and fills the per-process indexes from it.
+    output = tmp_path / "endpoints.json"
+    command = [sys.executable, "manage.py", "benchmark", "endpoints", "--profiles", "200", "--repeat", "3"]
+
+    finished = subprocess.run(
+        [*command, "--output", str(output)], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=600
+    )
+
+    assert finished.returncode == 0, finished.stderr[-2000:]
+    result = json.loads(output.read_text())
+    assert result["violations"] == []
+    assert all(not route["unexpected_statuses"] for route in result["routes"].values())
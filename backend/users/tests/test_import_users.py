@@ -0,0 +1,39 @@
+import json
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from users.models import UserProfile
+
+pytestmark = [pytest.mark.dbtest, pytest.mark.django_db(transaction=True, serialized_rollback=True)]
+
+
+def import_users(path):
+    stdout, stderr = StringIO(), StringIO()
+    call_command("import_users", str(path), "--workers", "1", stdout=stdout, stderr=stderr)
+    return stdout.getvalue(), stderr.getvalue()
+
+
+def test_invalid_records_are_reported_and_skipped(tmp_path):
+    path = tmp_path / "users.ndjson"
+    lines = [
+        json.dumps({"email": "ann@example.com", "username": "ann", "password": "secret-password-1", "rank": "1200"}),
+        json.dumps({"username": "no_email"}),
+        "{not json",
+        json.dumps({"email": "bob@example.com", "username": "bob", "profile": {"rank": "high"}}),
+        json.dumps(["not", "an", "object"]),
+        json.dumps({"email": "ann@example.com", "username": "ann_again"}),
+        json.dumps({"email": "cid@example.com", "username": "cid", "is_active": "true"}),
+    ]
+    path.write_text("\n".join(lines) + "\n")
+
+    stdout, stderr = import_users(path)
+
+    assert "Imported 2 users, skipped 1 existing and 4 invalid" in stdout
+    assert [line.split(":")[0] for line in stderr.splitlines()] == [f"Skipped record {n}" for n in (2, 3, 4, 5)]
+    users = get_user_model().objects.filter(email__in=["ann@example.com", "cid@example.com"])
+    assert sorted(users.values_list("username", flat=True)) == ["ann", "cid"]
+    assert users.get(username="ann").check_password("secret-password-1")
+    assert UserProfile.objects.get(user__username="ann").rank == 1200
@@ -0,0 +1,67 @@
+import pytest
+from django.urls import reverse
+
+pytestmark = [pytest.mark.django_db, pytest.mark.dbtest]
+
+
+@pytest.fixture
+def players(make_user):
+    """Seven listed players, five of them sharing rank 1000, one hidden player and one bot."""
+    listed = [make_user("top", rank=1500, is_rank_visible=True)]
+    listed += [make_user(f"tied{i}", rank=1000, is_rank_visible=True) for i in range(5)]
+    listed += [make_user("bottom", rank=500, is_rank_visible=True)]
+    make_user("hidden", rank=1200)
+    make_user("bot", rank=1300, is_rank_visible=True, is_bot=True)
+    return listed
+
+
+def usernames(response):
+    return [entry["username"] for entry in response.json()["results"]]
+
+
+def walk(client, url):
+    """Follow the ``next`` links from ``url`` and return the usernames of every page."""
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        pages.append(usernames(response))
+        url = response.json()["next"]
+    return pages
+
+
+def test_pages_list_each_tied_player_once_in_rank_and_id_order(players, api_client):
+    pages = walk(api_client, reverse("leaderboard") + "?page_size=2")
+
+    expected = [players[0]] + sorted(players[1:6], key=lambda user: -user.profile.pk) + [players[6]]
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert sum(pages, []) == [user.username for user in expected]
+
+
+def test_cursors_stay_valid_when_players_before_them_change(players, api_client):
+    first = api_client.get(reverse("leaderboard") + "?page_size=3").json()
+    top = players[0].profile
+    top.rank = 100
+    top.save()
+
+    rest = walk(api_client, first["next"])
+
+    tied = sorted(players[1:6], key=lambda user: -user.profile.pk)
+    assert sum(rest, []) == [user.username for user in tied[2:]] + ["bottom", "top"]
+
+
+def test_hidden_players_are_never_listed_and_bots_only_on_request(players, api_client):
+    default = sum(walk(api_client, reverse("leaderboard")), [])
+    with_bots = sum(walk(api_client, reverse("leaderboard") + "?include_bots=true"), [])
+
+    assert "hidden" not in default + with_bots
+    assert "bot" not in default
+    assert with_bots[:2] == ["top", "bot"]
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "bm90LWEtY3Vyc29y", "MTAwMDp4"])
+def test_malformed_cursors_are_rejected(players, api_client, cursor):
+    response = api_client.get(reverse("leaderboard"), {"cursor": cursor})
+
+    assert response.status_code == 400
+    assert "cursor" in response.json()
@@ -0,0 +1,100 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.test import AsyncRequestFactory
+from django.urls import reverse
+
+from users import async_views
+from users.helpers.password_pool import password_pool
+
+pytestmark = [pytest.mark.django_db, pytest.mark.unit]
+
+PASSWORD = "test-password-1"
+
+
+class FastPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = 1000
+
+
+@pytest.fixture
+def inline_password_pool(monkeypatch):
+    """Check passwords in threads of the test process, so the test's password hasher settings apply."""
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(password_pool, "_get_executor", lambda: executor)
+    yield
+    executor.shutdown()
+
+
+@pytest.fixture
+def saturated_password_pool(monkeypatch):
+    monkeypatch.setattr(password_pool, "_slots", threading.BoundedSemaphore(1))
+    password_pool._slots.acquire()
+
+
+def login(api_client, user):
+    return api_client.post(reverse("token_obtain_pair"), {"email": user.email, "password": PASSWORD}, format="json")
+
+
+def async_login(user):
+    request = AsyncRequestFactory().post(
+        reverse("token_obtain_pair"), {"email": user.email, "password": PASSWORD}, content_type="application/json"
+    )
+    response = async_to_sync(async_views.PooledTokenObtainPairView.as_view())(request)
+    response.render()
+    return response
+
+
+def test_login_issues_tokens(make_user, api_client, inline_password_pool):
+    response = login(api_client, make_user("alice"))
+
+    assert response.status_code == 200
+    assert {"access", "refresh"} <= set(response.data)
+
+
+def test_async_login_issues_tokens(make_user, inline_password_pool):
+    response = async_login(make_user("alice"))
+
+    assert response.status_code == 200
+    assert {"access", "refresh"} <= set(response.data)
+
+
+def test_async_login_rejects_wrong_passwords(make_user, inline_password_pool):
+    user = make_user("alice")
+    user.set_password("another-password-1")
+    user.save()
+
+    assert async_login(user).status_code == 401
+
+
+def test_saturated_login_answers_503_with_retry_after(make_user, api_client, saturated_password_pool, settings):
+    response = login(api_client, make_user("alice"))
+
+    assert response.status_code == 503
+    assert response["Retry-After"] == str(settings.LOGIN_POOL_RETRY_AFTER)
+
+
+def test_saturated_async_login_answers_503_with_retry_after(make_user, saturated_password_pool, settings):
+    response = async_login(make_user("alice"))
+
+    assert response.status_code == 503
+    assert response["Retry-After"] == str(settings.LOGIN_POOL_RETRY_AFTER)
+
+
+@pytest.mark.parametrize("login_with", ["sync", "async"])
+def test_login_rehashes_passwords_with_outdated_parameters(
+    make_user, api_client, inline_password_pool, settings, login_with
+):
+    user = make_user("alice")
+    user.password = FastPBKDF2PasswordHasher().encode(PASSWORD, "saltsaltsalt", iterations=500)
+    user.save(update_fields=["password"])
+    settings.PASSWORD_HASHERS = ["users.tests.test_login.FastPBKDF2PasswordHasher"]
+
+    response = login(api_client, user) if login_with == "sync" else async_login(user)
+
+    assert response.status_code == 200
+    password = get_user_model().objects.get(pk=user.pk).password
+    assert password.startswith("pbkdf2_sha256$1000$")
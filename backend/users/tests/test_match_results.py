@@ -0,0 +1,137 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.helpers.match_results import claim_issued_match, issue_match, record_match_result
+from users.helpers.matchmaking import MatchmakingQueue
+from users.models import MatchResult, UserProfile
+
+pytestmark = pytest.mark.dbtest
+
+
+@pytest.fixture
+def players(make_user):
+    return make_user("alice", rank=1000), make_user("bob", rank=1000)
+
+
+def submit(client, one, two, winner=None):
+    return client.post(
+        reverse("submit_match_result"),
+        {"player_one_id": one.pk, "player_two_id": two.pk, "winner_id": winner and winner.pk},
+        format="json",
+    )
+
+
+@pytest.mark.django_db
+def test_players_can_submit_each_issued_match_once(players, auth_client):
+    alice, bob = players
+    client = auth_client(alice)
+    issue_match(bob.pk, alice.pk)
+
+    assert submit(client, alice, bob, winner=alice).status_code == 201
+    assert submit(client, alice, bob, winner=alice).status_code == 403
+    assert UserProfile.objects.get(user=alice).games_won == 1
+
+
+@pytest.mark.django_db
+def test_players_cannot_submit_matches_matchmaking_did_not_issue(players, make_user, auth_client):
+    alice, bob = players
+
+    assert submit(auth_client(alice), alice, bob, winner=alice).status_code == 403
+
+    issue_match(alice.pk, bob.pk)
+    assert submit(auth_client(make_user("eve")), alice, bob, winner=bob).status_code == 403
+    assert not MatchResult.objects.exists()
+
+
+@pytest.mark.django_db
+def test_failed_submissions_keep_the_issued_match(players, make_user, auth_client):
+    alice, bob = players
+    carol = make_user("carol")
+    UserProfile.objects.filter(user=carol).delete()
+    issue_match(alice.pk, carol.pk)
+
+    assert submit(auth_client(alice), alice, carol).status_code == 400
+    assert claim_issued_match(alice.pk, carol.pk)
+
+
+@pytest.mark.django_db
+def test_staff_can_submit_any_match(players, make_user, auth_client):
+    alice, bob = players
+    referee = make_user("referee")
+    referee.is_staff = True
+    referee.save()
+
+    assert submit(auth_client(referee), alice, bob).status_code == 201
+
+
+@pytest.mark.django_db
+def test_non_object_bodies_are_rejected(players, auth_client):
+    response = auth_client(players[0]).post(reverse("submit_match_result"), [1, 2], format="json")
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_counters_are_written_with_the_rank(players, django_capture_on_commit_callbacks):
+    alice, bob = players
+
+    with CaptureQueriesContext(connection) as queries, django_capture_on_commit_callbacks(execute=True):
+        record_match_result(alice.pk, bob.pk, winner_id=alice.pk)
+
+    profile_updates = [query for query in queries if query["sql"].startswith('UPDATE "users_userprofile"')]
+    assert len(profile_updates) == 2
+    profile = UserProfile.objects.get(user=alice)
+    assert (profile.rank, profile.games_played, profile.games_won, profile.games_lost) == (1016, 1, 1, 0)
+
+
+def test_matchmaking_issues_the_matches_it_makes():
+    issued = []
+    queue = MatchmakingQueue(
+        bucket_size=50,
+        base_window=100,
+        window_growth=0,
+        max_window=100,
+        bot_timeout=30,
+        match_ttl=60,
+        match_issuer=lambda player_id, opponent_id: issued.append({player_id, opponent_id}),
+        clock=lambda: 0,
+    )
+    queue.enqueue(1, 1000)
+    queue.enqueue(2, 1010)
+
+    assert issued == [{1, 2}]
+
+
+@pytest.mark.slow
+@pytest.mark.django_db(transaction=True, serialized_rollback=True)
+def test_concurrent_submissions_lose_no_updates(make_user):
+    if connection.vendor == "sqlite":
+        pytest.skip("SQLite ignores select_for_update, so concurrent submissions are not serialized")
+
+    player_ids = [make_user(f"player{index}", rank=1000 + 10 * index).pk for index in range(10)]
+    submissions = 400
+    rank_total = UserProfile.objects.filter(user_id__in=player_ids).aggregate(total=Sum("rank"))["total"]
+
+    def submit_random_match(seed):
+        rng = random.Random(seed)
+        one, two = rng.sample(player_ids, 2)
+        try:
+            record_match_result(one, two, rng.choice((one, two, None)))
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        list(executor.map(submit_random_match, range(submissions)))
+
+    decided = MatchResult.objects.filter(winner__isnull=False).count()
+    totals = UserProfile.objects.filter(user_id__in=player_ids).aggregate(
+        played=Sum("games_played"), won=Sum("games_won"), lost=Sum("games_lost"), rank=Sum("rank")
+    )
+    assert MatchResult.objects.count() == submissions
+    assert totals == {"played": 2 * submissions, "won": decided, "lost": decided, "rank": rank_total}
@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from users.helpers.matchmaking import MatchmakingQueue
+
+pytestmark = pytest.mark.unit
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_queue(clock, bot_finder=lambda rank: -1):
+    return MatchmakingQueue(
+        bucket_size=50,
+        base_window=100,
+        window_growth=0,
+        max_window=100,
+        bot_timeout=30,
+        match_ttl=60,
+        bot_finder=bot_finder,
+        match_issuer=lambda player_id, opponent_id: None,
+        clock=clock,
+    )
+
+
+def test_bots_are_looked_up_outside_the_queue_lock():
+    clock = Clock()
+    joined = []
+
+    def bot_finder(rank):
+        # Another request joins the queue meanwhile; it would block if the lock was still held.
+        thread = threading.Thread(target=lambda: joined.append(queue.enqueue(2, 5000)))
+        thread.start()
+        thread.join(5)
+        assert not thread.is_alive()
+        return -1
+
+    queue = make_queue(clock, bot_finder)
+    queue.enqueue(1, 1000)
+    clock.now = 30
+
+    [match] = queue.tick()
+
+    assert (match.player_id, match.opponent_id, match.is_bot) == (1, -1, True)
+    assert joined == [None]
+    assert queue.status(2) is True
+
+
+def test_players_paired_during_the_bot_lookup_are_not_matched_again():
+    clock = Clock()
+
+    def bot_finder(rank):
+        queue.enqueue(2, 1000)
+        return -1
+
+    queue = make_queue(clock, bot_finder)
+    queue.enqueue(1, 1000)
+    clock.now = 30
+
+    assert queue.tick() == []
+    assert queue.pop_match(1).opponent_id == 2
+
+
+def test_unclaimed_matches_expire():
+    clock = Clock()
+    queue = make_queue(clock)
+    queue.enqueue(1, 1000)
+    queue.enqueue(2, 1000)
+    clock.now = 59
+    queue.tick()
+    assert queue.status(1).opponent_id == 2
+
+    clock.now = 60
+    queue.tick()
+
+    assert queue.status(1) is None
+    assert queue.status(2) is None
+    assert not queue._matches
@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+from django.urls import reverse
+
+from users.helpers import nick_allocator as nick_allocator_module
+from users.helpers.bloom_filter import BloomFilter
+from users.helpers.nick_allocator import NickAllocator, NicksExhausted
+
+pytestmark = [pytest.mark.django_db, pytest.mark.unit]
+
+
+def test_requests_keep_the_old_filter_while_a_new_one_builds(monkeypatch, settings):
+    settings.NICK_FILTER_REBUILD_SECONDS = 0
+    allocator = NickAllocator()
+    old_filter, new_filter = BloomFilter(capacity=1024), BloomFilter(capacity=1024)
+    allocator._filter = old_filter
+    release = threading.Event()
+
+    def build_filter():
+        release.wait(5)
+        return new_filter
+
+    monkeypatch.setattr(allocator, "_build_filter", build_filter)
+
+    assert len(allocator.allocate(3)) == 3
+    builder = allocator._builder
+    assert builder.is_alive()
+    assert allocator._filter is old_filter
+
+    allocator.add("registered-meanwhile")
+    release.set()
+    builder.join(5)
+    assert allocator._filter is new_filter
+    assert "registered-meanwhile" in new_filter
+
+
+def test_first_requests_verify_all_candidates_before_the_filter_exists(monkeypatch, make_user):
+    make_user("TakenNick1")
+    allocator = NickAllocator()
+    monkeypatch.setattr(allocator, "_get_filter", lambda: None)
+    candidates = iter([["TakenNick1", "FreeNick2"], ["FreeNick3", "FreeNick4"]])
+    monkeypatch.setattr(nick_allocator_module, "generate_nicks", lambda count: next(candidates))
+
+    assert allocator.allocate(1) == ["FreeNick2"]
+
+
+def test_allocate_raises_instead_of_returning_fewer_nicks(monkeypatch, make_user):
+    make_user("TakenNick1")
+    allocator = NickAllocator()
+    monkeypatch.setattr(allocator, "_get_filter", lambda: None)
+    monkeypatch.setattr(nick_allocator_module, "generate_nicks", lambda count: ["TakenNick1"] * count * 2)
+
+    with pytest.raises(NicksExhausted):
+        allocator.allocate(2)
+
+
+def test_nick_endpoint_answers_503_when_nicks_are_exhausted(monkeypatch, api_client):
+    def exhausted(count):
+        raise NicksExhausted
+
+    monkeypatch.setattr(nick_allocator_module.nick_allocator, "allocate", exhausted)
+
+    response = api_client.get(reverse("generate_nick"), {"count": 5})
+
+    assert response.status_code == 503
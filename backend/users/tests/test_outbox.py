@@ -0,0 +1,187 @@
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.mail import get_connection
+from django.db import connection as db_connection
+from django.db import transaction
+from django.utils import timezone
+
+from users.helpers.outbox import drain_outbox, enqueue_mail
+from users.models import OutboxEmail
+
+pytestmark = [pytest.mark.dbtest, pytest.mark.django_db]
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for ``smtplib``: every command is accepted, every message is kept by the server."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 localhost fake SMTP")
+        while line := self.rfile.readline():
+            command = line.decode().strip().upper()
+            if command.startswith("EHLO"):
+                self.reply("250 localhost")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = b"".join(iter(lambda: self.rfile.readline(), b".\r\n"))
+                self.server.messages.append(data.decode())
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+@pytest.fixture
+def smtp_server(settings):
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), FakeSMTPHandler)
+    server.daemon_threads = True
+    server.connections, server.messages = 0, []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings.EMAIL_HOST, settings.EMAIL_PORT = server.server_address
+    settings.EMAIL_USE_TLS = False
+    settings.EMAIL_HOST_USER = settings.EMAIL_HOST_PASSWORD = ""
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class FailingConnection:
+    def open(self):
+        raise ConnectionRefusedError("relay down")
+
+    def close(self):
+        pass
+
+
+def enqueue(count=1):
+    return [enqueue_mail(f"Subject {i}", "Body", "noreply@example.com", f"user{i}@example.com") for i in range(count)]
+
+
+def test_emails_are_sent_and_marked_sent():
+    [email] = enqueue()
+
+    assert drain_outbox(get_connection("django.core.mail.backends.locmem.EmailBackend")) == (1, 0)
+
+    assert [message.to for message in mail.outbox] == [["user0@example.com"]]
+    email.refresh_from_db()
+    assert (email.status, email.attempts) == (OutboxEmail.Status.SENT, 1)
+    assert drain_outbox(get_connection("django.core.mail.backends.locmem.EmailBackend")) == (0, 0)
+
+
+def test_emails_are_sent_over_one_smtp_connection(smtp_server):
+    enqueue(3)
+    connection = get_connection("django.core.mail.backends.smtp.EmailBackend")
+
+    try:
+        assert drain_outbox(connection) == (3, 0)
+    finally:
+        connection.close()
+
+    assert smtp_server.connections == 1
+    assert len(smtp_server.messages) == 3
+    assert not OutboxEmail.objects.exclude(status=OutboxEmail.Status.SENT).exists()
+
+
+def test_failed_emails_are_retried_with_backoff(settings):
+    settings.EMAIL_OUTBOX_RETRY_BACKOFF_SECONDS = 30
+    [email] = enqueue()
+
+    assert drain_outbox(FailingConnection(), max_attempts=3) == (0, 1)
+    email.refresh_from_db()
+    assert (email.status, email.attempts) == (OutboxEmail.Status.PENDING, 1)
+    assert "relay down" in email.last_error
+    assert email.next_attempt_at > timezone.now() + timedelta(seconds=25)
+    assert drain_outbox(FailingConnection(), max_attempts=3) == (0, 0)
+
+    OutboxEmail.objects.update(next_attempt_at=timezone.now())
+    assert drain_outbox(FailingConnection(), max_attempts=3) == (0, 1)
+    email.refresh_from_db()
+    assert email.next_attempt_at > timezone.now() + timedelta(seconds=55)
+
+
+def test_emails_fail_after_max_attempts():
+    [email] = enqueue()
+
+    for _ in range(3):
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        drain_outbox(FailingConnection(), max_attempts=3)
+
+    email.refresh_from_db()
+    assert (email.status, email.attempts) == (OutboxEmail.Status.FAILED, 3)
+    OutboxEmail.objects.update(next_attempt_at=timezone.now())
+    assert drain_outbox(FailingConnection(), max_attempts=3) == (0, 0)
+
+
+def test_emails_of_a_dead_worker_are_sent_after_its_lease(settings):
+    settings.EMAIL_OUTBOX_LEASE_SECONDS = 300
+    sent, unsent = enqueue(2)
+
+    class DyingConnection:
+        messages = 0
+
+        def open(self):
+            pass
+
+        def close(self):
+            pass
+
+        def send_messages(self, messages):
+            if self.messages:
+                raise SystemExit
+            self.messages += 1
+            return 1
+
+    with pytest.raises(SystemExit):
+        drain_outbox(DyingConnection())
+
+    sent.refresh_from_db()
+    unsent.refresh_from_db()
+    assert sent.status == OutboxEmail.Status.SENT
+    assert unsent.status == OutboxEmail.Status.PENDING
+    assert unsent.next_attempt_at > timezone.now() + timedelta(seconds=295)
+    assert drain_outbox(get_connection("django.core.mail.backends.locmem.EmailBackend")) == (0, 0)
+
+    OutboxEmail.objects.filter(pk=unsent.pk).update(next_attempt_at=timezone.now())
+    assert drain_outbox(get_connection("django.core.mail.backends.locmem.EmailBackend")) == (1, 0)
+
+
+@pytest.mark.django_db(transaction=True, serialized_rollback=True)
+def test_drainers_skip_emails_locked_by_another_drainer():
+    if db_connection.vendor == "sqlite":
+        pytest.skip("SQLite has no SKIP LOCKED, a second drainer waits for the first")
+    locked, free = enqueue(2)
+    claimed, release = threading.Event(), threading.Event()
+
+    def hold_lock():
+        try:
+            with transaction.atomic():
+                OutboxEmail.objects.select_for_update().get(pk=locked.pk)
+                claimed.set()
+                release.wait(10)
+        finally:
+            db_connection.close()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        holder = executor.submit(hold_lock)
+        assert claimed.wait(5)
+        start = time.monotonic()
+        try:
+            assert drain_outbox(get_connection("django.core.mail.backends.locmem.EmailBackend")) == (1, 0)
+        finally:
+            release.set()
+        assert time.monotonic() - start < 5
+        holder.result()
+
+    assert [message.to for message in mail.outbox] == [[free.recipient]]
+    assert drain_outbox(get_connection("django.core.mail.backends.locmem.EmailBackend")) == (1, 0)
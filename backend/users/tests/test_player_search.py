@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+from users.helpers.player_search import PlayerSearchIndex, UsernameTrie, player_search_index, search_players
+from users.models import UserProfile
+
+pytestmark = [pytest.mark.django_db, pytest.mark.dbtest]
+
+
+@pytest.fixture(autouse=True)
+def player_search(make_user):
+    """Build the in-process index, used on SQLite, with two visible players."""
+    player_search_index.reset()
+    players = make_user("searchable_ann", is_search_visible=True), make_user("searchable_bob", is_search_visible=True)
+    player_search_index.build()
+    yield players
+    player_search_index.reset()
+
+
+def found(query="searchable"):
+    return {username for _, username in search_players(query, 10)}
+
+
+def test_deactivated_users_leave_and_reactivated_users_reenter_the_index(
+    player_search, django_capture_on_commit_callbacks
+):
+    ann, _ = player_search
+
+    ann.is_active = False
+    with django_capture_on_commit_callbacks(execute=True):
+        ann.save()
+    assert found() == {"searchable_bob"}
+
+    ann.is_active = True
+    with django_capture_on_commit_callbacks(execute=True):
+        ann.save()
+    assert found() == {"searchable_ann", "searchable_bob"}
+
+
+def test_visibility_changes_are_applied(player_search, django_capture_on_commit_callbacks):
+    ann, _ = player_search
+    profile = UserProfile.objects.get(user=ann)
+
+    profile.is_search_visible = False
+    with django_capture_on_commit_callbacks(execute=True):
+        profile.save()
+    assert found() == {"searchable_bob"}
+
+    profile = UserProfile.objects.get(user=ann)
+    profile.is_search_visible = True
+    with django_capture_on_commit_callbacks(execute=True):
+        profile.save()
+    assert found() == {"searchable_ann", "searchable_bob"}
+
+
+def test_saving_an_indexed_profile_does_not_load_its_user(player_search, django_assert_num_queries):
+    profile = UserProfile.objects.get(user=player_search[0])
+    profile.rank += 1
+
+    with django_assert_num_queries(1):
+        profile.save()
+
+
+def test_searches_fall_back_to_a_prefix_query_until_the_first_build(monkeypatch, player_search):
+    index = PlayerSearchIndex()
+    monkeypatch.setattr(index, "_get_trie", lambda: None)
+
+    assert index.search("SEARCHABLE_", 10) == [(user.pk, user.username) for user in player_search]
+
+
+@pytest.mark.django_db(transaction=True, serialized_rollback=True)
+def test_searches_keep_the_old_trie_while_a_new_one_builds(monkeypatch, settings, player_search):
+    settings.PLAYER_SEARCH_REBUILD_SECONDS = 0
+    ann, bob = player_search
+    index = PlayerSearchIndex()
+    index._trie = old_trie = UsernameTrie()
+    old_trie.add(bob.pk, bob.username)
+    release = threading.Event()
+
+    def build_trie():
+        # A scan which read ann before she turned invisible.
+        release.wait(5)
+        trie = UsernameTrie()
+        trie.add(ann.pk, ann.username)
+        trie.add(bob.pk, bob.username)
+        return trie
+
+    monkeypatch.setattr(index, "_build_trie", build_trie)
+
+    assert index.search("searchable", 10) == [(bob.pk, bob.username)]
+    builder = index._builder
+    assert builder.is_alive()
+
+    UserProfile.objects.filter(user=ann).update(is_search_visible=False)
+    index.changed(ann.pk)
+    release.set()
+    builder.join(5)
+    assert index._trie is not old_trie
+    assert index.search("searchable", 10) == [(bob.pk, bob.username)]
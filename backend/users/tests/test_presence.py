@@ -0,0 +1,121 @@
+import pytest
+
+from users.helpers.presence import PresenceTracker
+from users.models import UserProfile
+
+pytestmark = [pytest.mark.django_db, pytest.mark.unit]
+
+
+@pytest.fixture
+def make_tracker(settings):
+    """Create the tracker of another worker process, without the background flusher."""
+
+    def make(worker_id="this-host:1"):
+        class WorkerPresenceTracker(PresenceTracker):
+            def _start_flusher(self):
+                pass
+
+        WorkerPresenceTracker.worker_id = worker_id
+        return WorkerPresenceTracker(timeout=30, flush_interval=10, cache_alias=settings.PRESENCE_CACHE)
+
+    return make
+
+
+@pytest.fixture
+def tracker(make_tracker):
+    return make_tracker()
+
+
+def expire(tracker, *users):
+    """Age the heartbeats of ``users`` past the timeout, in memory and in the shared cache."""
+    for user in users:
+        tracker._last_seen[user.pk] -= tracker.timeout + 1
+        tracker.cache.delete(tracker._key(user.pk))
+
+
+def online_ids():
+    return set(UserProfile.objects.filter(is_online=True).values_list("user_id", flat=True))
+
+
+def test_heartbeats_expire_after_the_timeout(tracker, make_user):
+    alice, bob = make_user("alice"), make_user("bob")
+    tracker.heartbeat(alice.pk)
+    tracker.heartbeat(bob.pk)
+    tracker.flush()
+    assert tracker.online_count() == 2
+
+    expire(tracker, alice)
+    tracker.flush()
+
+    assert tracker.online_count() == 1
+    assert not tracker.is_online(alice.pk)
+    assert tracker.is_online(bob.pk)
+
+
+def test_flush_writes_only_changed_users(tracker, make_user):
+    alice, bob = make_user("alice"), make_user("bob")
+    tracker.heartbeat(alice.pk)
+    tracker.heartbeat(bob.pk)
+
+    assert tracker.flush() == 2
+    assert online_ids() == {alice.pk, bob.pk}
+    assert tracker.flush() == 0
+
+    expire(tracker, alice, bob)
+    tracker.heartbeat(bob.pk)
+
+    assert tracker.flush() == 1
+    assert online_ids() == {bob.pk}
+
+
+def test_flush_keeps_users_online_whose_heartbeats_moved_to_another_worker(tracker, make_user):
+    alice = make_user("alice")
+    tracker.heartbeat(alice.pk)
+    tracker.flush()
+
+    tracker._last_seen[alice.pk] -= tracker.timeout + 1
+    tracker.cache.set(tracker._key(alice.pk), "other-host:1", tracker.timeout)
+
+    assert tracker.flush() == 0
+    assert online_ids() == {alice.pk}
+
+
+def test_exit_flush_marks_only_users_of_this_worker_offline(tracker, make_user):
+    alice, bob = make_user("alice"), make_user("bob")
+    tracker.heartbeat(alice.pk)
+    tracker.heartbeat(bob.pk)
+    tracker.flush()
+    tracker.cache.set(tracker._key(bob.pk), "other-host:1", tracker.timeout)
+
+    tracker._flush_on_exit()
+
+    assert online_ids() == {bob.pk}
+    assert tracker.online_count() == 0
+
+
+def test_online_count_sums_the_workers_and_counts_moved_users_once(make_tracker, make_user):
+    alice, bob, carol = make_user("alice"), make_user("bob"), make_user("carol")
+    first, second = make_tracker("host-a:1"), make_tracker("host-b:1")
+    first.heartbeat(alice.pk)
+    first.heartbeat(bob.pk)
+    second.heartbeat(carol.pk)
+    # Bob's heartbeats move to the second worker before the first one expired him.
+    second.heartbeat(bob.pk)
+
+    first.flush()
+    second.flush()
+
+    assert first.online_count() == second.online_count() == 3
+
+
+def test_workers_which_stopped_leave_the_online_count(make_tracker, make_user):
+    alice, bob = make_user("alice"), make_user("bob")
+    first, second = make_tracker("host-a:1"), make_tracker("host-b:1")
+    first.heartbeat(alice.pk)
+    second.heartbeat(bob.pk)
+    first.flush()
+    second.flush()
+
+    second._flush_on_exit()
+
+    assert first.online_count() == 1
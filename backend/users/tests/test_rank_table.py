@@ -0,0 +1,65 @@
+import fcntl
+
+import pytest
+from django.urls import reverse
+
+from users.helpers import rank_table as rank_table_module
+from users.helpers.rank_table import MIN_CAPACITY, RankTable, rank_table, rebuild_rank_table_on_start
+
+pytestmark = pytest.mark.dbtest
+
+
+@pytest.fixture
+def table_path(tmp_path, monkeypatch):
+    """Point the shared rank table to a fresh file, the workers of a new server find none serving it."""
+    path = tmp_path / "rank_table"
+    monkeypatch.setattr(rank_table, "path", str(path))
+    monkeypatch.setattr(rank_table, "_mmap", None)
+    monkeypatch.setattr(rank_table_module, "_serving_lock_file", None)
+    yield path
+    if rank_table_module._serving_lock_file is not None:
+        rank_table_module._serving_lock_file.close()
+
+
+def test_full_tables_grow_and_keep_their_order(tmp_path):
+    table = RankTable(str(tmp_path / "rank_table"))
+    table.build((rank, user_id) for user_id, rank in enumerate(range(MIN_CAPACITY), start=1))
+
+    table.update(MIN_CAPACITY + 1, 10_000)
+
+    assert len(table) == MIN_CAPACITY + 1
+    assert table.top(2) == [(10_000, MIN_CAPACITY + 1), (MIN_CAPACITY - 1, MIN_CAPACITY)]
+    assert table.position(1, 0) == (MIN_CAPACITY + 1, 0)
+
+
+@pytest.mark.django_db
+def test_the_first_worker_of_a_server_rebuilds_the_table(table_path, make_user):
+    rank_table.build([(1, 999)])
+    alice = make_user("alice", rank=1200, is_rank_visible=True)
+
+    rebuild_rank_table_on_start()
+
+    assert rank_table.entries() == [(1200, alice.pk)]
+
+
+@pytest.mark.django_db
+def test_workers_joining_a_serving_table_keep_it(table_path, make_user):
+    rank_table.build([(1, 999)])
+    make_user("alice", rank=1200, is_rank_visible=True)
+
+    with open(f"{table_path}.serving", "a") as sibling:
+        fcntl.flock(sibling, fcntl.LOCK_SH)
+        rebuild_rank_table_on_start()
+
+    assert rank_table.entries() == [(1, 999)]
+
+
+@pytest.mark.django_db
+def test_positions_are_found_by_the_rank_from_the_database(table_path, make_user, api_client):
+    alice, bob = make_user("alice", rank=1200, is_rank_visible=True), make_user("bob", rank=1100)
+    rank_table_module.rebuild_rank_table()
+
+    response = api_client.get(reverse("leaderboard_position", kwargs={"user_id": alice.pk}))
+    assert response.status_code == 200
+    assert response.json() == {"position": 1, "user_id": alice.pk, "rank": 1200}
+    assert api_client.get(reverse("leaderboard_position", kwargs={"user_id": bob.pk})).status_code == 404
@@ -0,0 +1,83 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, router
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.middleware import ReplicaPinningMiddleware
+from users.routers import PIN_COOKIE, ReplicaRouter
+
+REPLICA = "replica_0"
+
+pytestmark = [pytest.mark.dbtest, pytest.mark.django_db(transaction=True, serialized_rollback=True)]
+
+
+@pytest.fixture
+def shared_pin_cache(settings, tmp_path):
+    """Keep pins in files, a cache every worker process of a host can read."""
+    pin_cache = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": str(tmp_path)}
+    settings.CACHES = {**settings.CACHES, settings.DB_REPLICA_PIN_CACHE: pin_cache}
+
+
+@pytest.fixture
+def mirror_replica(transactional_db, settings, monkeypatch, shared_pin_cache):
+    """A replica mirroring the test database, like ``TEST["MIRROR"]`` does for the aliases of ``DB_REPLICA_URLS``.
+
+    The test commits its rows, the replica reads them through a connection of its own.
+    """
+    monkeypatch.setitem(settings.DATABASES, REPLICA, connections["default"].settings_dict)
+    [replica_router] = [route for route in router.routers if isinstance(route, ReplicaRouter)]
+    monkeypatch.setattr(replica_router, "replicas", [REPLICA])
+    yield connections[REPLICA]
+    connections[REPLICA].close()
+    del connections[REPLICA]
+
+
+@pytest.fixture
+def player(make_user):
+    return make_user("player", is_search_visible=True)
+
+
+def get_user(client, user):
+    with CaptureQueriesContext(connections["default"]) as primary, CaptureQueriesContext(
+        connections[REPLICA]
+    ) as replica:
+        assert client.get(reverse("get_user", kwargs={"pk": user.pk})).status_code == 200
+    return len(primary), len(replica)
+
+
+def test_reads_go_to_the_replica(mirror_replica, player, auth_client):
+    primary, replica = get_user(auth_client(player), player)
+
+    assert primary == 0
+    assert replica > 0
+
+
+def test_reads_after_a_write_go_to_the_primary(mirror_replica, player, auth_client):
+    client = auth_client(player)
+
+    response = client.patch(reverse("update_user"), {"first_name": "Ada"}, format="json")
+    assert response.status_code == 200
+    assert PIN_COOKIE in response.cookies
+
+    primary, replica = get_user(client, player)
+    assert primary > 0
+    assert replica == 0
+
+
+def test_pins_follow_the_user_to_clients_without_the_cookie(mirror_replica, player, auth_client):
+    writer = auth_client(player)
+    assert writer.patch(reverse("update_user"), {"first_name": "Ada"}, format="json").status_code == 200
+    writer.cookies.clear()
+
+    primary, replica = get_user(writer, player)
+
+    assert primary > 0
+    assert replica == 0
+
+
+def test_replicas_refuse_a_pin_cache_of_one_process(settings, monkeypatch):
+    monkeypatch.setitem(settings.DATABASES, REPLICA, connections["default"].settings_dict)
+
+    with pytest.raises(ImproperlyConfigured):
+        ReplicaPinningMiddleware(lambda request: None)
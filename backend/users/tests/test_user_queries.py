@@ -0,0 +1,78 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.serializers import CustomUserSerializer
+
+pytestmark = [pytest.mark.django_db, pytest.mark.dbtest]
+
+
+@pytest.fixture
+def players(make_user):
+    return [make_user(f"player{index}", rank=1000 + index) for index in range(20)]
+
+
+def first_players(count):
+    return get_user_model().objects.filter(username__startswith="player").order_by("pk")[:count]
+
+
+@pytest.mark.parametrize("count", [1, 20])
+def test_serializing_users_with_joined_profiles_takes_one_query(players, count, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        data = CustomUserSerializer(list(first_players(count).select_related("profile")), many=True).data
+
+    assert [user["rank"] for user in data] == [1000 + index for index in range(count)]
+
+
+@pytest.mark.parametrize("count", [1, 20])
+def test_serializing_users_without_join_takes_a_query_per_profile(players, count, django_assert_num_queries):
+    # Before the one-to-one relation every profile field queried the profiles, six queries per user; now the
+    # profile is loaded once per user and reused by all six fields.
+    with django_assert_num_queries(1 + count):
+        CustomUserSerializer(list(first_players(count)), many=True).data
+
+
+def test_admin_user_changelist_query_count_does_not_grow_with_users(make_user, client):
+    client.force_login(get_user_model().objects.get(is_superuser=True))
+    url = reverse("admin:users_customuser_changelist")
+
+    def changelist_queries():
+        with CaptureQueriesContext(connection) as queries:
+            assert client.get(url).status_code == 200
+        return len(queries)
+
+    make_user("player0")
+    one_user = changelist_queries()
+    for index in range(1, 20):
+        make_user(f"player{index}")
+    assert changelist_queries() == one_user
+
+
+def test_get_user_query_count(players, auth_client, django_assert_num_queries):
+    user = players[0]
+    client = auth_client(user)
+    url = reverse("get_user", kwargs={"pk": user.pk})
+
+    # Authentication, the updated_at check and the user joined with its profile.
+    with django_assert_num_queries(3):
+        response = client.get(url)
+    assert response.status_code == 200
+    assert response.data["rank"] == 1000
+
+    # The payload comes from the response cache and the authenticated user from the user cache.
+    with django_assert_num_queries(1):
+        assert client.get(url).status_code == 200
+
+
+def test_update_user_query_count(players, auth_client, django_assert_num_queries):
+    user = players[0]
+    client = auth_client(user)
+
+    # Authentication, the user joined with its profile and the update.
+    with django_assert_num_queries(3):
+        response = client.patch(reverse("update_user"), {"first_name": "Ada"}, format="json")
+    assert response.status_code == 200
+    assert response.data["first_name"] == "Ada"
+    assert response.data["rank"] == 1000
@@ -1,11 +1,12 @@
+from django.conf import settings
 from django.urls import path
 
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenRefreshView
 
-from . import views
+from . import async_views, views
+
+# With ASYNC_VIEWS, which only config.asgi enables, the I/O bound endpoints are served by users/async_views.py
+endpoints = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     path("users/", views.CreateUserAPIView.as_view(), name="create_user"),
@@ -13,13 +14,19 @@ urlpatterns = [
     path("register/", views.RegisterUserAPIView.as_view(), name="register_user"),
     path(
         "activate/<str:uid>/<str:token>/",
-        views.UserActivationView.as_view(),
+        endpoints.UserActivationView.as_view(),
         name="activate_user",
     ),
-    path("users/create_anonymous_user/", views.CreateAnonymousUserAPIView.as_view(), name="create_anonymous_user"),
-    path("users/<int:pk>", views.GetUserAPIView.as_view(), name="get_user"),
+    path("users/create_anonymous_user/", endpoints.CreateAnonymousUserAPIView.as_view(), name="create_anonymous_user"),
+    path(
+        "users/persist_anonymous_user/",
+        views.PersistAnonymousUserAPIView.as_view(),
+        name="persist_anonymous_user",
+    ),
+    path("users/<int:pk>", endpoints.GetUserAPIView.as_view(), name="get_user"),
+    path("users/search/", views.PlayerSearchAPIView.as_view(), name="search_players"),
     path("users/update/", views.UserUpdateAPIView.as_view(), name="update_user"),
-    path("users/custom-nick/", views.CustomNickAPIView.as_view(), name="generate_nick"),
+    path("users/custom-nick/", endpoints.CustomNickAPIView.as_view(), name="generate_nick"),
     path("users/delete/<int:pk>", views.DeleteUserAPIView.as_view(), name="delete_user"),
     path(
         "users/deactivate/<int:pk>/",
@@ -28,14 +35,26 @@ urlpatterns = [
     ),
     path(
         "users/password-reset/",
-        views.PasswordReminderView.as_view(),
+        endpoints.PasswordReminderView.as_view(),
         name="password_reminder",
     ),
     path(
         "users/password-reset/<str:uid>/<str:token>/",
-        views.PasswordResetView.as_view(),
+        endpoints.PasswordResetView.as_view(),
         name="password_reset",
     ),
-    path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
+    path("users/heartbeat/", views.HeartbeatAPIView.as_view(), name="heartbeat"),
+    path("users/online/count/", views.OnlineCountAPIView.as_view(), name="online_count"),
+    path("users/stats/response-cache/", views.UserResponseCacheAPIView.as_view(), name="user_response_cache"),
+    path("matchmaking/", views.MatchmakingAPIView.as_view(), name="matchmaking"),
+    path("matches/", views.MatchResultCreateAPIView.as_view(), name="submit_match_result"),
+    path("leaderboard/", views.LeaderboardAPIView.as_view(), name="leaderboard"),
+    path("leaderboard/top/", views.LeaderboardTopAPIView.as_view(), name="leaderboard_top"),
+    path(
+        "leaderboard/position/<int:user_id>/",
+        views.LeaderboardPositionAPIView.as_view(),
+        name="leaderboard_position",
+    ),
+    path("token/", endpoints.PooledTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
 ]
@@ -1,10 +1,14 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
+from django.db import transaction
+from django.http import Http404, HttpResponse
 from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.utils.encoding import force_bytes, force_str
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from django.utils.http import http_date, urlsafe_base64_encode, urlsafe_base64_decode
 from rest_framework import status
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.generics import (
     UpdateAPIView,
     ListAPIView,
@@ -12,14 +16,29 @@ from rest_framework.generics import (
     RetrieveAPIView,
     DestroyAPIView,
 )
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.views import TokenObtainPairView
 
 from . import serializers
+from .authentication import ClaimsJWTAuthentication
+from .exceptions import ServiceUnavailable
 from . import models
-from .helpers.nick_generator import generate_nick
-from .permissions import IsAdminOrSelf
+from .helpers.conditional import user_etag, user_last_modified
+from .helpers.guest_tokens import issue_guest_token, persist_guest
+from .helpers.match_results import claim_issued_match, issue_match
+from .helpers.matchmaking import matchmaking_queue
+from .helpers.metrics import render_metrics
+from .helpers.nick_allocator import NicksExhausted, nick_allocator
+from .helpers.outbox import enqueue_mail
+from .helpers.player_search import search_players
+from .helpers.presence import presence_tracker
+from .helpers.rank_table import get_rank_table
+from .helpers.response_cache import user_response_cache, viewer_class
+from .pagination import RankKeysetPagination
+from .permissions import HasMetricsToken, IsAdminOrMatchParticipant, IsAdminOrSelf
+from .routers import ReplicaReadsMixin
 from .serializers import PasswordReminderSerializer, PasswordResetSerializer, CustomUserCreateSerializer
 
 
@@ -47,13 +66,29 @@ class CustomUserWithProfileCreateAPIView(CreateAPIView):
 
 
 class CreateAnonymousUserAPIView(APIView):
+    """Issue a signed guest token. No row is written until the guest is persisted."""
+
     def post(self, request):
-        anonymous_user = models.AnonymousUser.objects.create()
-        serializer = serializers.AnonymousUserSerializer(anonymous_user)
+        guest_id, issued_at, token = issue_guest_token()
+        serializer = serializers.GuestSessionSerializer({"id": guest_id, "created_at": issued_at, "token": token})
 
         return Response(serializer.data, status=201)
 
 
+class PersistAnonymousUserAPIView(APIView):
+    """Store the guest of a signed token, called the first time the guest does something that needs a row."""
+
+    def post(self, request):
+        serializer = serializers.GuestTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        anonymous_user, created = persist_guest(serializer.validated_data["token"])
+
+        return Response(
+            serializers.AnonymousUserSerializer(anonymous_user).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
 class RegisterUserAPIView(CreateAPIView):
     serializer_class = serializers.CustomUserSerializer
     queryset = get_user_model().objects.all()
@@ -61,20 +96,21 @@ class RegisterUserAPIView(CreateAPIView):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user = serializer.save()
 
-        uid = urlsafe_base64_encode(force_bytes(user.pk))
-        token = default_token_generator.make_token(user)
-        activation_link = reverse("activate_user", kwargs={"uid": uid, "token": token})
-        activation_link = f"http://0.0.0.0:8000{activation_link}"
-
-        send_mail(
-            subject="Account Activation",
-            message=f"Please click the following link to activate your account: {activation_link}",
-            from_email="noreply@your-domain.com",
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
+        with transaction.atomic():
+            user = serializer.save()
+
+            uid = urlsafe_base64_encode(force_bytes(user.pk))
+            token = default_token_generator.make_token(user)
+            activation_link = reverse("activate_user", kwargs={"uid": uid, "token": token})
+            activation_link = f"http://0.0.0.0:8000{activation_link}"
+
+            enqueue_mail(
+                subject="Account Activation",
+                message=f"Please click the following link to activate your account: {activation_link}",
+                from_email="noreply@your-domain.com",
+                recipient=user.email,
+            )
 
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
@@ -106,25 +142,77 @@ class UserActivationView(APIView):
             )
 
 
+NICKS_EXHAUSTED = "Could not find enough unused nicks, try again."
+
+
 class CustomNickAPIView(APIView):
     def get(self, request):
-        nick = generate_nick()
+        serializer = serializers.CustomNickQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        try:
+            nick = nick_allocator.allocate(serializer.validated_data["count"])
+        except NicksExhausted:
+            raise ServiceUnavailable(NICKS_EXHAUSTED)
         return Response(nick, status=status.HTTP_200_OK)
 
 
-class GetUserAPIView(RetrieveAPIView):
+class GetUserAPIView(ReplicaReadsMixin, RetrieveAPIView):
+    """User with its profile, answered with ``304 Not Modified`` when the client's ``ETag`` or date is current.
+
+    The freshness check reads only the ``updated_at`` columns; clients holding a stale or no copy get the payload
+    from ``user_response_cache``, which serializes the rows only when its entry is missing or outdated.
+    """
+
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsAuthenticated, IsAdminOrSelf]
-    queryset = get_user_model().objects.all()
+    queryset = get_user_model().objects.select_related("profile")
     serializer_class = serializers.CustomUserSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        last_modified = user_last_modified(kwargs["pk"])
+        if last_modified is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag, response = self.conditional_response(request, kwargs["pk"], last_modified)
+        if response is None:
+            response = Response(self.cached_payload(request, kwargs["pk"], last_modified))
+        return self.add_validators(response, etag, last_modified)
+
+    def conditional_response(self, request, pk, last_modified):
+        """Return the ``ETag`` and the ``304``/``412`` response, ``None`` when the payload has to be sent."""
+        # Object permissions only compare the primary key, so an unsaved instance is enough to check them.
+        self.check_object_permissions(request, get_user_model()(pk=pk))
+        etag = user_etag(pk, last_modified, request.accepted_renderer.format)
+        return etag, get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+
+    def cached_payload(self, request, pk, last_modified):
+        return user_response_cache.get_or_set(
+            pk,
+            viewer_class(request.user),
+            last_modified.timestamp(),
+            lambda: dict(self.get_serializer(self.get_object()).data),
+        )
+
+    @staticmethod
+    def add_validators(response, etag, last_modified):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
 
 class UserUpdateAPIView(UpdateAPIView):
     serializer_class = serializers.CustomUserSerializer
-    queryset = get_user_model().objects.all()
+    queryset = get_user_model().objects.select_related("profile")
     permission_classes = [IsAuthenticated, IsAdminOrSelf]
 
     def get_object(self):
-        return self.request.user
+        return self.get_queryset().get(pk=self.request.user.pk)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        user_id = serializer.instance.pk
+        transaction.on_commit(lambda: user_response_cache.invalidate(user_id))
 
 
 class DeleteUserAPIView(DestroyAPIView):
@@ -132,6 +220,11 @@ class DeleteUserAPIView(DestroyAPIView):
     queryset = get_user_model().objects.all()
     serializer_class = serializers.CustomUserSerializer
 
+    def perform_destroy(self, instance):
+        user_id = instance.pk
+        super().perform_destroy(instance)
+        transaction.on_commit(lambda: user_response_cache.invalidate(user_id))
+
 
 class UserDeactivationAPIView(APIView):
     permission_classes = [IsAuthenticated, IsAdminOrSelf]
@@ -145,6 +238,7 @@ class UserDeactivationAPIView(APIView):
         if user.is_active:
             user.is_active = False
             user.save()
+            transaction.on_commit(lambda: user_response_cache.invalidate(user.pk))
             return Response(
                 {"message": f"{user.username} has been deactivated."},
                 status=status.HTTP_200_OK,
@@ -166,12 +260,11 @@ class PasswordReminderView(APIView):
         token = default_token_generator.make_token(user)
         reset_link = f"http://0.0.0.0:8000/api/v1/users/password-reset/{uid}/{token}/"
 
-        send_mail(
+        enqueue_mail(
             subject="Password Reset",
             message=f"Please click the following link to reset your password: {reset_link}",
             from_email="noreply@email.com",
-            recipient_list=[user.email],
-            fail_silently=False,
+            recipient=user.email,
         )
 
         return Response(
@@ -202,9 +295,181 @@ class PasswordResetView(APIView):
             )
 
         user.set_password(serializer.validated_data["password"])
-        user.save()
+        user.save(update_fields=["password"])
 
         return Response(
             {"detail": "Password has been successfully reset."},
             status=status.HTTP_200_OK,
         )
+
+
+class PlayerSearchAPIView(ReplicaReadsMixin, APIView):
+    """Active players with search visibility on whose username starts with or resembles ``q``."""
+
+    def get(self, request):
+        serializer = serializers.PlayerSearchQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        players = search_players(serializer.validated_data["q"], serializer.validated_data["limit"])
+        return Response(
+            [{"user_id": user_id, "username": username} for user_id, username in players], status=status.HTTP_200_OK
+        )
+
+
+class LeaderboardAPIView(ReplicaReadsMixin, ListAPIView):
+    """Players with a visible rank, best first. Bots are listed only with ``?include_bots=true``."""
+
+    serializer_class = serializers.LeaderboardEntrySerializer
+    pagination_class = RankKeysetPagination
+
+    def get_queryset(self):
+        queryset = models.UserProfile.objects.filter(is_rank_visible=True).select_related("user")
+        if self.request.query_params.get("include_bots", "").lower() not in ("1", "true", "yes"):
+            queryset = queryset.filter(is_bot=False)
+        return queryset
+
+
+class LeaderboardTopAPIView(ReplicaReadsMixin, APIView):
+    """Best players served from the shared-memory rank table without a database query."""
+
+    def get(self, request):
+        serializer = serializers.LeaderboardTopQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        entries = get_rank_table().top(serializer.validated_data["limit"])
+        return Response(
+            [
+                {"position": position, "user_id": user_id, "rank": rank}
+                for position, (rank, user_id) in enumerate(entries, start=1)
+            ],
+            status=status.HTTP_200_OK,
+        )
+
+
+class LeaderboardPositionAPIView(ReplicaReadsMixin, APIView):
+    """Leaderboard position of a single player served from the shared-memory rank table.
+
+    The player's rank is read by primary key first, so the table is searched by bisection instead of a full scan.
+    """
+
+    def get(self, request, user_id):
+        profile = models.UserProfile.objects.filter(user_id=user_id).only("rank", "is_bot", "is_rank_visible").first()
+        position = None
+        if profile is not None and profile.leaderboard_rank is not None:
+            position = get_rank_table().position(user_id, profile.leaderboard_rank)
+        if position is None:
+            return Response({"detail": "User is not on the leaderboard."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(
+            {"position": position[0], "user_id": user_id, "rank": position[1]},
+            status=status.HTTP_200_OK,
+        )
+
+
+class PooledTokenObtainPairView(TokenObtainPairView):
+    serializer_class = serializers.PooledTokenObtainPairSerializer
+
+
+class HeartbeatAPIView(APIView):
+    """Mark the requesting user as online for the next ``PRESENCE_TIMEOUT`` seconds."""
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        presence_tracker.heartbeat(request.user.pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class OnlineCountAPIView(APIView):
+    """Number of online users over all workers, updated every ``PRESENCE_FLUSH_INTERVAL`` seconds."""
+
+    def get(self, request):
+        return Response({"online": presence_tracker.online_count()}, status=status.HTTP_200_OK)
+
+
+NO_ISSUED_MATCH = "Matchmaking issued no unreported match between these players."
+
+
+class MatchmakingAPIView(APIView):
+    """Join (POST), poll (GET) or leave (DELETE) the matchmaking queue.
+
+    The queue is kept in the memory of the process: deploy with a single worker, or route every matchmaking request
+    to one dedicated worker. Otherwise players queued on different workers never meet and polls reaching another
+    worker answer 404 for a queued player; see the ``MATCHMAKING_*`` settings.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def _match_response(self, match):
+        return Response(
+            {"status": "matched", "opponent_id": match.opponent_id, "is_bot": match.is_bot},
+            status=status.HTTP_200_OK,
+        )
+
+    def post(self, request):
+        profile = models.UserProfile.objects.filter(user_id=request.user.pk).only("rank").first()
+        if profile is None:
+            return Response({"detail": "User has no profile."}, status=status.HTTP_400_BAD_REQUEST)
+
+        matchmaking_queue.tick()
+        match = matchmaking_queue.enqueue(request.user.pk, profile.rank)
+        if match is not None:
+            matchmaking_queue.pop_match(request.user.pk)
+            return self._match_response(match)
+        return Response({"status": "queued"}, status=status.HTTP_202_ACCEPTED)
+
+    def get(self, request):
+        matchmaking_queue.tick()
+        match = matchmaking_queue.pop_match(request.user.pk)
+        if match is not None:
+            return self._match_response(match)
+        if matchmaking_queue.status(request.user.pk):
+            return Response({"status": "queued"}, status=status.HTTP_200_OK)
+        return Response({"detail": "User is not in the queue."}, status=status.HTTP_404_NOT_FOUND)
+
+    def delete(self, request):
+        if not matchmaking_queue.dequeue(request.user.pk):
+            return Response({"detail": "User is not in the queue."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class MatchResultCreateAPIView(CreateAPIView):
+    """Submit the result of a match. Both players are updated atomically with the configured rating formula.
+
+    Players can only report matches issued by matchmaking, each one once; staff can report any match.
+    """
+
+    serializer_class = serializers.MatchResultSerializer
+    permission_classes = [IsAuthenticated, IsAdminOrMatchParticipant]
+
+    def perform_create(self, serializer):
+        if self.request.user.is_staff or self.request.user.is_superuser:
+            serializer.save()
+            return
+
+        players = serializer.validated_data["player_one_id"], serializer.validated_data["player_two_id"]
+        if not claim_issued_match(*players):
+            raise PermissionDenied(NO_ISSUED_MATCH)
+        try:
+            serializer.save()
+        except Exception:
+            issue_match(*players)
+            raise
+
+
+class UserResponseCacheAPIView(APIView):
+    """Hit and miss counters of the user detail response cache of the process serving the request."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(user_response_cache.metrics(), status=status.HTTP_200_OK)
+
+
+class MetricsAPIView(APIView):
+    """Metrics of all worker processes in the Prometheus text exposition format."""
+
+    authentication_classes = []
+    permission_classes = [HasMetricsToken]
+
+    def get(self, request):
+        if not settings.METRICS_ENABLED:
+            raise Http404
+        return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")